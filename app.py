@@ -52,15 +52,13 @@ def get_avalaible_dates(collection="profiles"):
     -------
     A list of strings whose each item is a date in which there are downloaded data.
     """
-    # Set the collection to recover the dates
-    mongodb_attr.set_collection(collection)
     # Get the avalaible dates to perform an analysis. Default analysis is Profiles Evolution
-    avalaible_dates = mongodb_attr.get_records("get_dates")
+    avalaible_dates = mongodb_attr.get_available_dates(collection)
     # Format them from datetime to string
     avalaible_string_dates = []
     for date in avalaible_dates:
-        avalaible_string_dates.append({"label":datetime.strftime(date["date"], "%d-%m-%Y"), 
-                                "value":datetime.strftime(date["date"], "%d-%m-%Y")})
+        avalaible_string_dates.append({"label":datetime.strftime(date, "%d-%m-%Y"), 
+                                "value":datetime.strftime(date, "%d-%m-%Y")})
     
     return avalaible_string_dates
 
@@ -540,6 +538,8 @@ def set_user_to_study(clicks, user):
     if (clicks != None):
         if (clicks > 0):
             set_user = mainops_attr.set_user_to_study(user)
+            # Register the user to download their data periodically
+            mainops_attr.track_user(user, mainops_attr.social_media_source, "real")
             color = "green"
             message = "El usuario a analizar ha sido actualizado correctamente." 
             if (set_user != user):
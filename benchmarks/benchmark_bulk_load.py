@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to measure the throughput, in rows per second, of the different ways of
+inserting records in the Postgres database: one by one with a check query per
+record (insert_data), in batches with a single statement (insert_batch) and
+through a staging table with COPY (bulk_load). The records are synthetic
+profiles inserted in the test table of profiles, which is emptied before each run.
+
+Usage (from the root of the project):
+    python3 benchmarks/benchmark_bulk_load.py [--rows 10000] [--batch-size 5000]
+        [--methods insert_data insert_batch bulk_load]
+
+@author: Lidia Sánchez Mérida
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+sys.path.append("src")
+from postgredb import PostgreDB
+
+def get_profiles(n_rows):
+    """
+    Function to generate synthetic profiles, one per day for each user, with the
+    fields of the insert query of the test profiles.
+    """
+    first_date = datetime(2020, 1, 1)
+    for i in range(0, n_rows):
+        yield {"biography":"Biography "+str(i), "birthday":"None",
+               "date":first_date+timedelta(days=i%365), "date_joined":"None",
+               "gender":"None", "location":"None", "n_followers":str(1000+i),
+               "n_followings":str(100+i%50), "n_medias":str(10+i%20), "name":"Benchmark user",
+               "profile_pic":"None", "social_media":"Instagram", "userid":str(i//365),
+               "username":"benchmark_user_"+str(i//365)}
+
+def run_insert_data(postgres_object, args):
+    """
+    Function to insert the profiles one by one checking if each one of them is
+    already in the table.
+    """
+    n_inserted = 0
+    for item in get_profiles(args.rows):
+        check_values = {"username":item["username"], "social_media":item["social_media"], "date":item["date"]}
+        n_inserted += len(postgres_object.insert_data("insert_test_profile", [item], [check_values]))
+    return n_inserted
+
+def run_insert_batch(postgres_object, args):
+    """
+    Function to insert the profiles in batches with a single statement per batch.
+    """
+    profiles = list(get_profiles(args.rows))
+    n_inserted = 0
+    for i in range(0, len(profiles), args.batch_size):
+        n_inserted += len(postgres_object.insert_batch("insert_test_profile", profiles[i:i+args.batch_size]))
+    return n_inserted
+
+def run_bulk_load(postgres_object, args):
+    """
+    Function to load the profiles through a staging table with COPY, showing
+    the progress after each batch.
+    """
+    def show_progress(n_read, n_inserted, elapsed):
+        print("    ", n_read, "read,", n_inserted, "inserted,", round(n_read/elapsed, 1), "rows/s")
+    result = postgres_object.bulk_load("insert_test_profile", get_profiles(args.rows),
+                                       args.batch_size, show_progress)
+    return result["inserted"]
+
+if __name__ == "__main__":
+    methods = {"insert_data":run_insert_data, "insert_batch":run_insert_batch, "bulk_load":run_bulk_load}
+    parser = argparse.ArgumentParser(description="Benchmark of the insertion of records in Postgres.")
+    parser.add_argument("--rows", type=int, default=10000, help="Number of synthetic profiles.")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Number of records per batch.")
+    parser.add_argument("--methods", nargs="+", choices=list(methods.keys()),
+                        default=list(methods.keys()), help="Methods to measure.")
+    args = parser.parse_args()
+
+    postgres_object = PostgreDB()
+    for method in args.methods:
+        postgres_object.empty_table("testprofiles")
+        start = time.perf_counter()
+        n_inserted = methods[method](postgres_object, args)
+        elapsed = time.perf_counter()-start
+        print(method, "-", n_inserted, "rows in", round(elapsed, 3), "s ("+str(round(n_inserted/elapsed, 1))+" rows/s)")
+    postgres_object.empty_table("testprofiles")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to measure the throughput of the download and storage of the Instagram
+data of a user replaying the responses previously recorded from the LevPasha
+Instagram API. The data are stored in the test collections of the Mongo database.
+
+Usage (from the root of the project):
+    python3 benchmarks/benchmark_crawl.py --record-dir records --username user
+        [--latency 0.2] [--max-requests 150] [--error-rate 0.05] [--runs 3]
+        [--store]
+
+In order to record the responses of a user, wrap the connection of an Api object
+with a RecordingInstagramAPI object before downloading their data:
+    api.connection = RecordingInstagramAPI(api.connect_levpasha_instagram_api(), "records")
+
+@author: Lidia Sánchez Mérida
+"""
+import argparse
+import sys
+import time
+sys.path.append("src")
+sys.path.append("src/data")
+from api import Api
+from api_replay import ReplayInstagramAPI
+from exceptions import MaxRequestsExceed
+
+def get_replay_api(args):
+    """
+    Function to create an Api object which replays the recorded responses
+    without waiting between the requests.
+    """
+    api = Api()
+    api.connection = ReplayInstagramAPI(args.record_dir, args.latency, args.max_requests,
+                                        error_rate=args.error_rate, seed=args.seed)
+    api.request_delay = 0
+    api.section_delay = 0
+    return api
+
+def run_download(args):
+    """
+    Function to download the data of the user replaying the recorded responses.
+    It returns the number of downloaded medias and comments.
+    """
+    user_data = get_replay_api(args).get_levpasha_instagram_data(args.username)
+    n_comments = sum(len(item['texts']) for item in user_data['comments'])
+    return len(user_data['medias']), n_comments
+
+def run_pipeline(args):
+    """
+    Function to download, preprocess and store the data of the user in the test
+    collections replaying the recorded responses. It returns the number of
+    stored medias and comments.
+    """
+    import main_ops
+    mainops_object = main_ops.MainOperations()
+    stored_data = mainops_object.download_and_store_instagram_data(get_replay_api(args),
+                                                                   args.username, "test")
+    return stored_data['media'], stored_data['comments']
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of the Instagram crawl replaying recorded responses.")
+    parser.add_argument("--record-dir", required=True, help="Directory with the recorded responses.")
+    parser.add_argument("--username", required=True, help="Username of the recorded user.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each response.")
+    parser.add_argument("--max-requests", type=int, default=0, help="Maximum number of requests per hour (0 = no limit).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of failing each request.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the injected errors.")
+    parser.add_argument("--runs", type=int, default=3, help="Number of executions.")
+    parser.add_argument("--store", action="store_true", help="Preprocess and store the data in Mongo.")
+    args = parser.parse_args()
+
+    run = run_pipeline if args.store else run_download
+    for i in range(0, args.runs):
+        start = time.perf_counter()
+        try:
+            n_medias, n_comments = run(args)
+        except MaxRequestsExceed:
+            print("Run", i+1, "- max requests exceed after", round(time.perf_counter()-start, 3), "s")
+            continue
+        elapsed = time.perf_counter()-start
+        print("Run", i+1, "-", n_medias, "medias and", n_comments, "comments in", round(elapsed, 3),
+              "s ("+str(round((n_medias+n_comments)/elapsed, 1))+" items/s)")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to measure the latency of the hot check queries of the Postgres database,
+which are made before inserting each record, sending their SQL text in every
+call and executing them as prepared statements. The queries of the test tables
+are made with the provided values, in the same connection of the pool, after
+some calls to warm up the connection and the plans.
+
+Usage (from the root of the project):
+    python3 benchmarks/benchmark_prepared_queries.py [--calls 2000] [--warmup 50]
+        [--username USER] [--date 31-10-2020] [--text TEXT]
+
+@author: Lidia Sánchez Mérida
+"""
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime
+sys.path.append("src")
+from postgredb import PostgreDB
+
+def get_check_queries(args):
+    """
+    Function to get the hot check queries along with the values to make them.
+    """
+    date = datetime.strptime(args.date, "%d-%m-%Y").date()
+    return {"check_test_profile":{"username":args.username, "social_media":"Instagram", "date":date},
+            "check_test_media":{"id_media":args.id_media, "date":date},
+            "check_test_media_comment":{"original_text":args.text, "author":args.username,
+                                        "id_media_aut":args.id_media_aut},
+            "check_test_comment_sentiment":{"original_text":args.text},
+            "test_get_comment_sentiment":{"original_text":args.text}}
+
+def measure_query(postgres_object, query, values, args):
+    """
+    Function to measure the latency, in milliseconds, of each call to a query.
+    """
+    for i in range(0, args.warmup):
+        postgres_object.get_data(query, values)
+    latencies = []
+    for i in range(0, args.calls):
+        start = time.perf_counter()
+        postgres_object.get_data(query, values)
+        latencies.append((time.perf_counter()-start)*1000)
+    return latencies
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of the prepared check queries.")
+    parser.add_argument("--calls", type=int, default=2000, help="Number of measured calls per query.")
+    parser.add_argument("--warmup", type=int, default=50, help="Number of calls before measuring.")
+    parser.add_argument("--username", default="audispain", help="User of the checked records.")
+    parser.add_argument("--date", default="31-10-2020", help="Date of the checked records (dd-mm-YYYY).")
+    parser.add_argument("--text", default="A comment to check", help="Text of the checked comment.")
+    parser.add_argument("--id-media", default="0", help="Id of the checked post in its social media.")
+    parser.add_argument("--id-media-aut", type=int, default=0, help="Id of the checked post in the database.")
+    args = parser.parse_args()
+
+    postgres_object = PostgreDB()
+    for query, values in get_check_queries(args).items():
+        results = []
+        for prepared in [False, True]:
+            postgres_object.prepare_queries = prepared
+            latencies = sorted(measure_query(postgres_object, query, values, args))
+            results.append((statistics.median(latencies), latencies[int(len(latencies)*0.95)-1]))
+        print(query, "- median", round(results[0][0], 3), "->", round(results[1][0], 3), "ms,",
+              "p95", round(results[0][1], 3), "->", round(results[1][1], 3), "ms",
+              "("+str(round(100*(1-results[1][0]/results[0][0]), 1))+"% faster)")
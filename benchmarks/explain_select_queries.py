@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to check the indexes used by the predefined select queries of the Postgres
+database. Each query is run with EXPLAIN (ANALYZE, BUFFERS) using the values of
+a real user and period of time, so it should be run on a database with
+realistic volumes of data. For each query, it shows the execution time, the
+blocks read from the cache and from disk and the scans of each table, marking
+the sequential ones.
+
+Usage (from the root of the project):
+    python3 benchmarks/explain_select_queries.py --username USER [--social-media Instagram]
+        [--date-ini 01-01-2021] [--date-fin 31-01-2021] [--text TEXT] [--author AUTHOR]
+        [--id-media ID] [--id-media-aut ID] [--test] [--queries QUERY ...] [--show-plans]
+
+@author: Lidia Sánchez Mérida
+"""
+import argparse
+import json
+import sys
+from datetime import datetime
+sys.path.append("src")
+from postgredb import PostgreDB
+
+def get_query_values(fields, args):
+    """
+    Function to get the values of the fields of a query from the provided
+    arguments. It returns None if one of the fields has not got a sample value.
+    """
+    date_ini = datetime.strptime(args.date_ini, "%d-%m-%Y").date()
+    date_fin = datetime.strptime(args.date_fin, "%d-%m-%Y").date()
+    sample_values = {"username":args.username, "social_media":args.social_media,
+                     "id_user":args.username+"_"+args.social_media,
+                     "date_ini":date_ini, "date_fin":date_fin, "date":date_fin,
+                     "comment_date_ini":date_ini, "comment_date_fin":date_fin,
+                     "media_date_ini":date_ini, "media_date_fin":date_fin,
+                     "time":args.date_fin, "type":"comments", "original_text":args.text,
+                     "author":args.author, "id_media":args.id_media, "id_media_aut":args.id_media_aut,
+                     "enqueue_timeout":6, "n_users":100}
+    if (any(field not in sample_values for field in fields)):
+        return None
+    return {field:sample_values[field] for field in fields}
+
+def get_scans(plan):
+    """
+    Function to get the scans of the tables of a plan and of all its subplans.
+    """
+    scans = []
+    if ("Relation Name" in plan):
+        scans.append((plan["Node Type"], plan["Relation Name"], plan.get("Index Name")))
+    for subplan in plan.get("Plans", []):
+        scans.extend(get_scans(subplan))
+    return scans
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Execution plans of the predefined select queries.")
+    parser.add_argument("--username", required=True, help="User whose data are queried.")
+    parser.add_argument("--social-media", default="Instagram", help="Social media source of the user.")
+    parser.add_argument("--date-ini", default="01-01-2021", help="Initial date of the period (dd-mm-YYYY).")
+    parser.add_argument("--date-fin", default="31-01-2021", help="Final date of the period (dd-mm-YYYY).")
+    parser.add_argument("--text", default="", help="Text of a comment to search.")
+    parser.add_argument("--author", default="", help="Author of the comment to search.")
+    parser.add_argument("--id-media", default="", help="Id of a post in its social media.")
+    parser.add_argument("--id-media-aut", type=int, default=0, help="Id of a post in the database.")
+    parser.add_argument("--test", action="store_true", help="Explain the queries of the test tables.")
+    parser.add_argument("--queries", nargs="+", help="Queries to explain. All of them by default.")
+    parser.add_argument("--show-plans", action="store_true", help="Show the full execution plans.")
+    args = parser.parse_args()
+
+    postgres_object = PostgreDB()
+    queries = args.queries if args.queries != None else [query for query in postgres_object.select_queries
+                                                          if ("test" in query) == args.test]
+    for query in queries:
+        values = get_query_values(postgres_object.select_queries[query]["fields"], args)
+        if (values == None):
+            print(query, "- skipped, there are not sample values for its fields")
+            continue
+        plan = postgres_object.explain_data(query, values)
+        print(query, "-", round(plan["Execution Time"], 3), "ms,",
+              plan["Plan"].get("Shared Hit Blocks", 0), "blocks from cache,",
+              plan["Plan"].get("Shared Read Blocks", 0), "blocks from disk")
+        for node_type, table, index in get_scans(plan["Plan"]):
+            print("    ", "SEQUENTIAL" if node_type == "Seq Scan" else "", node_type, "on", table,
+                  "using "+index if index != None else "")
+        if (args.show_plans):
+            print(json.dumps(plan, indent=2, default=str))
@@ -0,0 +1,120 @@
+--
+-- Migration 001. Adds a unique index to each table with the fields of its
+-- check query, so the records could be inserted in batches skipping the
+-- repeated ones (INSERT ... ON CONFLICT DO NOTHING). The texts are indexed by
+-- their md5 hash because they could be longer than the maximum size of an index
+-- entry. The repeated records are deleted before creating each index, keeping
+-- the first inserted one. The comments of the deleted medias are also
+-- deleted because of their foreign key.
+--
+-- Usage: psql --dbname=socialnetworksdb --file=migrations/001_unique_check_keys.sql
+--
+BEGIN;
+
+-- Tables of the platform
+DELETE FROM ONLY public.profiles a USING ONLY public.profiles b
+    WHERE a.id_profile > b.id_profile AND a.username = b.username AND a.social_media = b.social_media AND a.date = b.date;
+CREATE UNIQUE INDEX IF NOT EXISTS profiles_check_key ON public.profiles (username, social_media, date);
+
+DELETE FROM ONLY public.profilesevolution a USING ONLY public.profilesevolution b
+    WHERE a.id_profile_evolution > b.id_profile_evolution AND a.date_ini = b.date_ini AND a.date_fin = b.date_fin AND a.id_user = b.id_user AND a.time = b.time;
+CREATE UNIQUE INDEX IF NOT EXISTS profilesevolution_check_key ON public.profilesevolution (date_ini, date_fin, id_user, time);
+
+DELETE FROM ONLY public.profilesactivity a USING ONLY public.profilesactivity b
+    WHERE a.id_profile_activity > b.id_profile_activity AND a.date_ini = b.date_ini AND a.date_fin = b.date_fin AND a.id_user = b.id_user AND a.time = b.time;
+CREATE UNIQUE INDEX IF NOT EXISTS profilesactivity_check_key ON public.profilesactivity (date_ini, date_fin, id_user, time);
+
+DELETE FROM ONLY public.medias a USING ONLY public.medias b
+    WHERE a.id_media_aut > b.id_media_aut AND a.id_media = b.id_media AND a.date = b.date;
+CREATE UNIQUE INDEX IF NOT EXISTS medias_check_key ON public.medias (id_media, date);
+
+DELETE FROM ONLY public.mediasevolution a USING ONLY public.mediasevolution b
+    WHERE a.id_media_evolution > b.id_media_evolution AND a.date_ini = b.date_ini AND a.date_fin = b.date_fin AND a.id_user = b.id_user AND a.time = b.time;
+CREATE UNIQUE INDEX IF NOT EXISTS mediasevolution_check_key ON public.mediasevolution (date_ini, date_fin, id_user, time);
+
+DELETE FROM ONLY public.mediacomments a USING ONLY public.mediacomments b
+    WHERE a.id_text > b.id_text AND md5(a.original_text) = md5(b.original_text) AND a.author = b.author AND a.id_media_aut = b.id_media_aut;
+CREATE UNIQUE INDEX IF NOT EXISTS mediacomments_check_key ON public.mediacomments (md5(original_text), author, id_media_aut);
+
+DELETE FROM ONLY public.mediatitles a USING ONLY public.mediatitles b
+    WHERE a.id_text > b.id_text AND a.id_media_aut = b.id_media_aut AND md5(a.original_text) = md5(b.original_text) AND a.author = b.author;
+CREATE UNIQUE INDEX IF NOT EXISTS mediatitles_check_key ON public.mediatitles (id_media_aut, md5(original_text), author);
+
+DELETE FROM ONLY public.mediaspopularity a USING ONLY public.mediaspopularity b
+    WHERE a.id_media_popularity > b.id_media_popularity AND a.date_ini = b.date_ini AND a.date_fin = b.date_fin AND a.id_user = b.id_user AND a.id_media = b.id_media;
+CREATE UNIQUE INDEX IF NOT EXISTS mediaspopularity_check_key ON public.mediaspopularity (date_ini, date_fin, id_user, id_media);
+
+DELETE FROM ONLY public.textsentiments a USING ONLY public.textsentiments b
+    WHERE a.id_text_sentiment > b.id_text_sentiment AND a.date_ini = b.date_ini AND a.date_fin = b.date_fin AND a.id_user = b.id_user AND a.type = b.type;
+CREATE UNIQUE INDEX IF NOT EXISTS textsentiments_check_key ON public.textsentiments (date_ini, date_fin, id_user, type);
+
+DELETE FROM ONLY public.commentsentiments a USING ONLY public.commentsentiments b
+    WHERE a.id_comment_sentiment > b.id_comment_sentiment AND md5(a.original_text) = md5(b.original_text);
+CREATE UNIQUE INDEX IF NOT EXISTS commentsentiments_check_key ON public.commentsentiments (md5(original_text));
+
+DELETE FROM ONLY public.userbehaviours a USING ONLY public.userbehaviours b
+    WHERE a.id_user_behaviour > b.id_user_behaviour AND a.date_ini = b.date_ini AND a.date_fin = b.date_fin AND a.id_user = b.id_user AND a.time = b.time;
+CREATE UNIQUE INDEX IF NOT EXISTS userbehaviours_check_key ON public.userbehaviours (date_ini, date_fin, id_user, time);
+
+DELETE FROM ONLY public.trackedusers a USING ONLY public.trackedusers b
+    WHERE a.id_tracked_user > b.id_tracked_user AND a.username = b.username AND a.social_media = b.social_media;
+CREATE UNIQUE INDEX IF NOT EXISTS trackedusers_check_key ON public.trackedusers (username, social_media);
+
+-- Tables of the tests
+DELETE FROM ONLY public.testchild a USING ONLY public.testchild b
+    WHERE a.id > b.id AND a.name = b.name;
+CREATE UNIQUE INDEX IF NOT EXISTS testchild_check_key ON public.testchild (name);
+
+DELETE FROM ONLY public.testfk a USING ONLY public.testfk b
+    WHERE a.id_test_fk > b.id_test_fk AND a.id = b.id AND a.field_one = b.field_one;
+CREATE UNIQUE INDEX IF NOT EXISTS testfk_check_key ON public.testfk (id, field_one);
+
+DELETE FROM ONLY public.testprofiles a USING ONLY public.testprofiles b
+    WHERE a.id_profile > b.id_profile AND a.username = b.username AND a.social_media = b.social_media AND a.date = b.date;
+CREATE UNIQUE INDEX IF NOT EXISTS testprofiles_check_key ON public.testprofiles (username, social_media, date);
+
+DELETE FROM ONLY public.testprofilesevolution a USING ONLY public.testprofilesevolution b
+    WHERE a.id_profile_evolution > b.id_profile_evolution AND a.date_ini = b.date_ini AND a.date_fin = b.date_fin AND a.id_user = b.id_user AND a.time = b.time;
+CREATE UNIQUE INDEX IF NOT EXISTS testprofilesevolution_check_key ON public.testprofilesevolution (date_ini, date_fin, id_user, time);
+
+DELETE FROM ONLY public.testprofilesactivity a USING ONLY public.testprofilesactivity b
+    WHERE a.id_profile_activity > b.id_profile_activity AND a.date_ini = b.date_ini AND a.date_fin = b.date_fin AND a.id_user = b.id_user AND a.time = b.time;
+CREATE UNIQUE INDEX IF NOT EXISTS testprofilesactivity_check_key ON public.testprofilesactivity (date_ini, date_fin, id_user, time);
+
+DELETE FROM ONLY public.testmedias a USING ONLY public.testmedias b
+    WHERE a.id_media_aut > b.id_media_aut AND a.id_media = b.id_media AND a.date = b.date;
+CREATE UNIQUE INDEX IF NOT EXISTS testmedias_check_key ON public.testmedias (id_media, date);
+
+DELETE FROM ONLY public.testmediasevolution a USING ONLY public.testmediasevolution b
+    WHERE a.id_media_evolution > b.id_media_evolution AND a.date_ini = b.date_ini AND a.date_fin = b.date_fin AND a.id_user = b.id_user AND a.time = b.time;
+CREATE UNIQUE INDEX IF NOT EXISTS testmediasevolution_check_key ON public.testmediasevolution (date_ini, date_fin, id_user, time);
+
+DELETE FROM ONLY public.testmediacomments a USING ONLY public.testmediacomments b
+    WHERE a.id_text > b.id_text AND md5(a.original_text) = md5(b.original_text) AND a.author = b.author AND a.id_media_aut = b.id_media_aut;
+CREATE UNIQUE INDEX IF NOT EXISTS testmediacomments_check_key ON public.testmediacomments (md5(original_text), author, id_media_aut);
+
+DELETE FROM ONLY public.testmediatitles a USING ONLY public.testmediatitles b
+    WHERE a.id_text > b.id_text AND a.id_media_aut = b.id_media_aut AND md5(a.original_text) = md5(b.original_text) AND a.author = b.author;
+CREATE UNIQUE INDEX IF NOT EXISTS testmediatitles_check_key ON public.testmediatitles (id_media_aut, md5(original_text), author);
+
+DELETE FROM ONLY public.testmediaspopularity a USING ONLY public.testmediaspopularity b
+    WHERE a.id_media_popularity > b.id_media_popularity AND a.date_ini = b.date_ini AND a.date_fin = b.date_fin AND a.id_user = b.id_user AND a.id_media = b.id_media;
+CREATE UNIQUE INDEX IF NOT EXISTS testmediaspopularity_check_key ON public.testmediaspopularity (date_ini, date_fin, id_user, id_media);
+
+DELETE FROM ONLY public.testtextsentiments a USING ONLY public.testtextsentiments b
+    WHERE a.id_text_sentiment > b.id_text_sentiment AND a.date_ini = b.date_ini AND a.date_fin = b.date_fin AND a.id_user = b.id_user AND a.type = b.type;
+CREATE UNIQUE INDEX IF NOT EXISTS testtextsentiments_check_key ON public.testtextsentiments (date_ini, date_fin, id_user, type);
+
+DELETE FROM ONLY public.testcommentsentiments a USING ONLY public.testcommentsentiments b
+    WHERE a.id_comment_sentiment > b.id_comment_sentiment AND md5(a.original_text) = md5(b.original_text);
+CREATE UNIQUE INDEX IF NOT EXISTS testcommentsentiments_check_key ON public.testcommentsentiments (md5(original_text));
+
+DELETE FROM ONLY public.testuserbehaviours a USING ONLY public.testuserbehaviours b
+    WHERE a.id_user_behaviour > b.id_user_behaviour AND a.date_ini = b.date_ini AND a.date_fin = b.date_fin AND a.id_user = b.id_user AND a.time = b.time;
+CREATE UNIQUE INDEX IF NOT EXISTS testuserbehaviours_check_key ON public.testuserbehaviours (date_ini, date_fin, id_user, time);
+
+DELETE FROM ONLY public.testtrackedusers a USING ONLY public.testtrackedusers b
+    WHERE a.id_tracked_user > b.id_tracked_user AND a.username = b.username AND a.social_media = b.social_media;
+CREATE UNIQUE INDEX IF NOT EXISTS testtrackedusers_check_key ON public.testtrackedusers (username, social_media);
+
+COMMIT;
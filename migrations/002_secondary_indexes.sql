@@ -0,0 +1,36 @@
+--
+-- Migration 002. Adds the secondary indexes of the hot queries of the
+-- analyses. The fields of the check queries of the profiles and of the tables
+-- of analysis results, which start with (date_ini, date_fin, id_user), are
+-- already indexed by the unique indexes of the migration 001.
+--    - Partial indexes of the posts, comments and titles by their parent and
+--      date, restricted to the type of record which is always queried.
+--    - A hash index of the analysed comments, which are searched by their
+--      full text (the unique index of the migration 001 uses their md5 hash).
+--    - A partial index of the active tracked users sorted by priority.
+--
+-- The indexes are created concurrently in order to not block the insertions,
+-- so this file can't be run inside a transaction. If a creation fails, the
+-- invalid index should be dropped before running the migration again.
+-- The usage of the indexes could be checked with benchmarks/explain_select_queries.py.
+--
+-- Usage: psql --dbname=socialnetworksdb --file=migrations/002_secondary_indexes.sql
+--
+
+-- Tables of the platform
+CREATE INDEX CONCURRENTLY IF NOT EXISTS medias_profile_date_idx ON public.medias (id_profile, date) WHERE type = 'common';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS mediacomments_media_date_idx ON public.mediacomments (id_media_aut, date) WHERE type = 'comment';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS mediatitles_media_date_idx ON public.mediatitles (id_media_aut, date) WHERE type = 'title';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS commentsentiments_text_idx ON public.commentsentiments USING hash (original_text);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS trackedusers_due_idx ON public.trackedusers (priority DESC, last_crawl ASC NULLS FIRST) WHERE active;
+
+-- Tables of the tests
+CREATE INDEX CONCURRENTLY IF NOT EXISTS testmedias_profile_date_idx ON public.testmedias (id_profile, date) WHERE type = 'common';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS testmediacomments_media_date_idx ON public.testmediacomments (id_media_aut, date) WHERE type = 'comment';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS testmediatitles_media_date_idx ON public.testmediatitles (id_media_aut, date) WHERE type = 'title';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS testcommentsentiments_text_idx ON public.testcommentsentiments USING hash (original_text);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS testtrackedusers_due_idx ON public.testtrackedusers (priority DESC, last_crawl ASC NULLS FIRST) WHERE active;
+
+-- Update the statistics of the planner
+ANALYZE public.medias, public.mediacomments, public.mediatitles, public.commentsentiments, public.trackedusers;
+ANALYZE public.testmedias, public.testmediacomments, public.testmediatitles, public.testcommentsentiments, public.testtrackedusers;
@@ -0,0 +1,116 @@
+--
+-- Migration 003. Adds a column with the md5 hash of the texts to the comments,
+-- the titles and the analysed comments, which is filled by a trigger before
+-- storing each record. The checks and the searches of the texts compare their
+-- hashes instead of their full texts.
+--    1. The column and the triggers are added. The column is inherited by
+--       the titles, but each table needs its own trigger.
+--    2. The hashes of the stored texts are computed in batches of records,
+--       committing each batch in order to not lock the whole tables.
+--    3. The unique indexes of the migration 001 are replaced by indexes of
+--       the hashes, which are created concurrently. The hash index of the
+--       analysed comments of the migration 002 is not required anymore.
+--
+-- This file can't be run inside a transaction because of the batches and the
+-- concurrent indexes. It requires PostgreSQL 11 or later, which supports the
+-- triggers declared with EXECUTE FUNCTION and the procedures that commit.
+--
+-- Usage: psql --dbname=socialnetworksdb --file=migrations/003_text_hash_keys.sql
+--
+
+-- 1. Hash columns and triggers
+BEGIN;
+CREATE OR REPLACE FUNCTION public.set_text_hash() RETURNS trigger AS $$
+BEGIN
+    NEW.text_hash := md5(NEW.original_text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE public.mediacomments ADD COLUMN IF NOT EXISTS text_hash CHAR(32);
+ALTER TABLE public.commentsentiments ADD COLUMN IF NOT EXISTS text_hash CHAR(32);
+ALTER TABLE public.testmediacomments ADD COLUMN IF NOT EXISTS text_hash CHAR(32);
+ALTER TABLE public.testcommentsentiments ADD COLUMN IF NOT EXISTS text_hash CHAR(32);
+
+DROP TRIGGER IF EXISTS mediacomments_text_hash ON public.mediacomments;
+CREATE TRIGGER mediacomments_text_hash BEFORE INSERT OR UPDATE OF original_text ON public.mediacomments
+    FOR EACH ROW EXECUTE FUNCTION public.set_text_hash();
+DROP TRIGGER IF EXISTS mediatitles_text_hash ON public.mediatitles;
+CREATE TRIGGER mediatitles_text_hash BEFORE INSERT OR UPDATE OF original_text ON public.mediatitles
+    FOR EACH ROW EXECUTE FUNCTION public.set_text_hash();
+DROP TRIGGER IF EXISTS commentsentiments_text_hash ON public.commentsentiments;
+CREATE TRIGGER commentsentiments_text_hash BEFORE INSERT OR UPDATE OF original_text ON public.commentsentiments
+    FOR EACH ROW EXECUTE FUNCTION public.set_text_hash();
+DROP TRIGGER IF EXISTS testmediacomments_text_hash ON public.testmediacomments;
+CREATE TRIGGER testmediacomments_text_hash BEFORE INSERT OR UPDATE OF original_text ON public.testmediacomments
+    FOR EACH ROW EXECUTE FUNCTION public.set_text_hash();
+DROP TRIGGER IF EXISTS testmediatitles_text_hash ON public.testmediatitles;
+CREATE TRIGGER testmediatitles_text_hash BEFORE INSERT OR UPDATE OF original_text ON public.testmediatitles
+    FOR EACH ROW EXECUTE FUNCTION public.set_text_hash();
+DROP TRIGGER IF EXISTS testcommentsentiments_text_hash ON public.testcommentsentiments;
+CREATE TRIGGER testcommentsentiments_text_hash BEFORE INSERT OR UPDATE OF original_text ON public.testcommentsentiments
+    FOR EACH ROW EXECUTE FUNCTION public.set_text_hash();
+COMMIT;
+
+-- 2. Hashes of the stored texts, computed in batches of consecutive ids
+CREATE OR REPLACE PROCEDURE public.backfill_text_hash(table_name TEXT, id_column TEXT, batch_size INTEGER)
+LANGUAGE plpgsql AS $$
+DECLARE
+    last_id INTEGER;
+    max_id INTEGER;
+BEGIN
+    EXECUTE format('SELECT coalesce(min(%I), 1) - 1, coalesce(max(%I), 0) FROM ONLY public.%I',
+                   id_column, id_column, table_name) INTO last_id, max_id;
+    WHILE last_id < max_id LOOP
+        EXECUTE format('UPDATE ONLY public.%I SET text_hash = md5(original_text) '||
+                       'WHERE %I > $1 AND %I <= $2 AND text_hash IS NULL',
+                       table_name, id_column, id_column) USING last_id, last_id + batch_size;
+        last_id := last_id + batch_size;
+        COMMIT;
+    END LOOP;
+END;
+$$;
+
+CALL public.backfill_text_hash('mediacomments', 'id_text', 10000);
+CALL public.backfill_text_hash('mediatitles', 'id_text', 10000);
+CALL public.backfill_text_hash('commentsentiments', 'id_comment_sentiment', 10000);
+CALL public.backfill_text_hash('testmediacomments', 'id_text', 10000);
+CALL public.backfill_text_hash('testmediatitles', 'id_text', 10000);
+CALL public.backfill_text_hash('testcommentsentiments', 'id_comment_sentiment', 10000);
+DROP PROCEDURE public.backfill_text_hash(TEXT, TEXT, INTEGER);
+
+-- Every record has got its hash (the titles inherit the constraint)
+ALTER TABLE public.mediacomments ALTER COLUMN text_hash SET NOT NULL;
+ALTER TABLE public.commentsentiments ALTER COLUMN text_hash SET NOT NULL;
+ALTER TABLE public.testmediacomments ALTER COLUMN text_hash SET NOT NULL;
+ALTER TABLE public.testcommentsentiments ALTER COLUMN text_hash SET NOT NULL;
+
+-- 3. Unique indexes of the hashes, which replace the ones of the md5 expressions
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS mediacomments_check_hash_key ON public.mediacomments (text_hash, author, id_media_aut);
+DROP INDEX CONCURRENTLY IF EXISTS public.mediacomments_check_key;
+ALTER INDEX public.mediacomments_check_hash_key RENAME TO mediacomments_check_key;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS mediatitles_check_hash_key ON public.mediatitles (id_media_aut, text_hash, author);
+DROP INDEX CONCURRENTLY IF EXISTS public.mediatitles_check_key;
+ALTER INDEX public.mediatitles_check_hash_key RENAME TO mediatitles_check_key;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS commentsentiments_check_hash_key ON public.commentsentiments (text_hash);
+DROP INDEX CONCURRENTLY IF EXISTS public.commentsentiments_check_key;
+ALTER INDEX public.commentsentiments_check_hash_key RENAME TO commentsentiments_check_key;
+DROP INDEX CONCURRENTLY IF EXISTS public.commentsentiments_text_idx;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS testmediacomments_check_hash_key ON public.testmediacomments (text_hash, author, id_media_aut);
+DROP INDEX CONCURRENTLY IF EXISTS public.testmediacomments_check_key;
+ALTER INDEX public.testmediacomments_check_hash_key RENAME TO testmediacomments_check_key;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS testmediatitles_check_hash_key ON public.testmediatitles (id_media_aut, text_hash, author);
+DROP INDEX CONCURRENTLY IF EXISTS public.testmediatitles_check_key;
+ALTER INDEX public.testmediatitles_check_hash_key RENAME TO testmediatitles_check_key;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS testcommentsentiments_check_hash_key ON public.testcommentsentiments (text_hash);
+DROP INDEX CONCURRENTLY IF EXISTS public.testcommentsentiments_check_key;
+ALTER INDEX public.testcommentsentiments_check_hash_key RENAME TO testcommentsentiments_check_key;
+DROP INDEX CONCURRENTLY IF EXISTS public.testcommentsentiments_text_idx;
+
+ANALYZE public.mediacomments, public.mediatitles, public.commentsentiments;
+ANALYZE public.testmediacomments, public.testmediatitles, public.testcommentsentiments;
@@ -0,0 +1,102 @@
+--
+-- Migration 004. Adds the materialized views of the daily metrics of each user,
+-- ProfilesDaily and MediasDaily, which the profile analyses and the Medias
+-- Evolution analysis read when the env variable ANALYSIS_METRIC_VIEWS is true.
+-- They're refreshed concurrently by the task server after each download, so
+-- they need a unique index.
+--
+-- Usage: psql --dbname=socialnetworksdb --file=migrations/004_daily_metric_views.sql
+--
+BEGIN;
+
+--
+-- Materialized view ProfilesDaily. It contains the metrics of the profiles of
+-- each user per day, so the profile analyses of any period of time are
+-- performed from these rows. It's refreshed after each download.
+--
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.profilesdaily AS
+    SELECT username, social_media, date, CAST(n_medias AS BIGINT) AS n_medias,
+        CAST(n_followers AS BIGINT) AS n_followers, CAST(n_followings AS BIGINT) AS n_followings
+    FROM public.profiles
+    WHERE n_medias ~ '^[0-9]+$' AND n_followers ~ '^[0-9]+$' AND n_followings ~ '^[0-9]+$';
+-- 
+-- Assign an owner to the view in order to operate with it.
+--
+ALTER MATERIALIZED VIEW public.profilesdaily OWNER TO lidia;
+--
+-- Unique index of each user and day, which is required to refresh the view
+-- concurrently.
+--
+CREATE UNIQUE INDEX IF NOT EXISTS profilesdaily_key ON public.profilesdaily (username, social_media, date);
+
+--
+-- Materialized view MediasDaily. It contains the number of posts of each user
+-- per day as well as their average number of likes and comments, so the
+-- analyses of the posts of any period of time are performed from these rows.
+-- The averages are not rounded because the DataAnalyzer rounds them, as the
+-- ones computed from the posts. It's refreshed after each download.
+--
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.mediasdaily AS
+    SELECT p.username, p.social_media, m.date, COUNT(*) AS n_medias,
+        AVG(CAST(m.like_count AS BIGINT)) AS mean_likes,
+        AVG(CAST(m.comment_count AS BIGINT)) AS mean_comments
+    FROM public.medias m JOIN public.profiles p ON p.id_profile = m.id_profile
+    WHERE m.type = 'common' AND m.date IS NOT NULL
+        AND m.like_count ~ '^[0-9]+$' AND m.comment_count ~ '^[0-9]+$'
+    GROUP BY p.username, p.social_media, m.date;
+-- 
+-- Assign an owner to the view in order to operate with it.
+--
+ALTER MATERIALIZED VIEW public.mediasdaily OWNER TO lidia;
+--
+-- Unique index of each user and day, which is required to refresh the view
+-- concurrently.
+--
+CREATE UNIQUE INDEX IF NOT EXISTS mediasdaily_key ON public.mediasdaily (username, social_media, date);
+
+--
+-- Materialized view TestProfilesDaily. It contains the metrics of the profiles of
+-- each user per day, so the profile analyses of any period of time are
+-- performed from these rows. It's refreshed after each download.
+--
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.testprofilesdaily AS
+    SELECT username, social_media, date, CAST(n_medias AS BIGINT) AS n_medias,
+        CAST(n_followers AS BIGINT) AS n_followers, CAST(n_followings AS BIGINT) AS n_followings
+    FROM public.testprofiles
+    WHERE n_medias ~ '^[0-9]+$' AND n_followers ~ '^[0-9]+$' AND n_followings ~ '^[0-9]+$';
+-- 
+-- Assign an owner to the view in order to operate with it.
+--
+ALTER MATERIALIZED VIEW public.testprofilesdaily OWNER TO lidia;
+--
+-- Unique index of each user and day, which is required to refresh the view
+-- concurrently.
+--
+CREATE UNIQUE INDEX IF NOT EXISTS testprofilesdaily_key ON public.testprofilesdaily (username, social_media, date);
+
+--
+-- Materialized view TestMediasDaily. It contains the number of posts of each user
+-- per day as well as their average number of likes and comments, so the
+-- analyses of the posts of any period of time are performed from these rows.
+-- The averages are not rounded because the DataAnalyzer rounds them, as the
+-- ones computed from the posts. It's refreshed after each download.
+--
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.testmediasdaily AS
+    SELECT p.username, p.social_media, m.date, COUNT(*) AS n_medias,
+        AVG(CAST(m.like_count AS BIGINT)) AS mean_likes,
+        AVG(CAST(m.comment_count AS BIGINT)) AS mean_comments
+    FROM public.testmedias m JOIN public.testprofiles p ON p.id_profile = m.id_profile
+    WHERE m.type = 'common' AND m.date IS NOT NULL
+        AND m.like_count ~ '^[0-9]+$' AND m.comment_count ~ '^[0-9]+$'
+    GROUP BY p.username, p.social_media, m.date;
+-- 
+-- Assign an owner to the view in order to operate with it.
+--
+ALTER MATERIALIZED VIEW public.testmediasdaily OWNER TO lidia;
+--
+-- Unique index of each user and day, which is required to refresh the view
+-- concurrently.
+--
+CREATE UNIQUE INDEX IF NOT EXISTS testmediasdaily_key ON public.testmediasdaily (username, social_media, date);
+
+COMMIT;
@@ -0,0 +1,267 @@
+--
+-- Migration 005. Partitions the posts and the comments by month of download,
+-- so the queries of a period of time only read the partitions of its months.
+--    1. The functions to create the monthly partitions and to detach the old
+--       ones are created. The task server calls them every day.
+--    2. The titles stop inheriting the comments, because a partitioned table
+--       can't have children which are not partitions. They keep their columns.
+--    3. The tables are renamed, their partitioned versions are created with the
+--       same sequences, a partition per month from the first stored date and a
+--       default partition, and their records are copied. The primary keys and
+--       the key of the posts referenced by the comments include the date.
+--    4. The daily views of the posts, which depend on the old table, are
+--       created again.
+--
+-- The records are copied inside a single transaction, so the task server and
+-- the app must be stopped while running it. It fails without changing anything
+-- if a post or comment has not got a date.
+--
+-- It requires PostgreSQL 13 or later, which supports the foreign keys that
+-- reference partitioned tables and the BEFORE row triggers of the comments.
+--
+-- Usage: psql --dbname=socialnetworksdb --file=migrations/005_monthly_partitions.sql
+--
+BEGIN;
+
+-- 1. Partition functions
+--
+-- Function to create the monthly partitions of a table from the month of the
+-- provided date to some months ahead of the current one. The months whose
+-- records are already in the default partition are skipped, because they
+-- can't be moved to a new partition.
+--
+CREATE OR REPLACE FUNCTION public.create_month_partitions(table_name TEXT, first_date DATE,
+                                                          months_ahead INTEGER) RETURNS SETOF TEXT AS $$
+DECLARE
+    month_start DATE := date_trunc('month', first_date);
+    month_end DATE;
+    last_month DATE := date_trunc('month', now()) + months_ahead * INTERVAL '1 month';
+    partition_name TEXT;
+    default_rows BOOLEAN;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        month_end := month_start + INTERVAL '1 month';
+        partition_name := table_name || '_' || to_char(month_start, 'YYYYMM');
+        IF to_regclass('public.' || partition_name) IS NULL THEN
+            EXECUTE format('SELECT EXISTS (SELECT 1 FROM public.%I WHERE date >= %L AND date < %L)',
+                           table_name || '_default', month_start, month_end) INTO default_rows;
+            IF default_rows THEN
+                RAISE NOTICE 'The records of % are kept in %', to_char(month_start, 'YYYY-MM'), table_name || '_default';
+            ELSE
+                EXECUTE format('CREATE TABLE public.%I PARTITION OF public.%I FOR VALUES FROM (%L) TO (%L)',
+                               partition_name, table_name, month_start, month_end);
+                RETURN NEXT partition_name;
+            END IF;
+        END IF;
+        month_start := month_end;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+--
+-- Function to detach the monthly partitions of a table which are older than
+-- the provided number of months. The detached partitions are kept as tables,
+-- without foreign keys, in order to archive or drop them. The partitions of
+-- the comments should be detached before the ones of the posts.
+--
+CREATE OR REPLACE FUNCTION public.detach_old_partitions(table_name TEXT, retention_months INTEGER)
+                                                        RETURNS SETOF TEXT AS $$
+DECLARE
+    first_kept DATE := date_trunc('month', now()) - retention_months * INTERVAL '1 month';
+    partition_name TEXT;
+    constraint_name TEXT;
+BEGIN
+    FOR partition_name IN
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = ('public.' || table_name)::regclass
+            AND c.relname ~ ('^' || table_name || '_[0-9]{6}$')
+            AND to_date(right(c.relname, 6), 'YYYYMM') < first_kept
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('ALTER TABLE public.%I DETACH PARTITION public.%I', table_name, partition_name);
+        -- The detached partition keeps the foreign keys of its table, so the
+        -- partition of the posts of the same month couldn't be detached
+        FOR constraint_name IN
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = ('public.' || partition_name)::regclass AND contype = 'f'
+        LOOP
+            EXECUTE format('ALTER TABLE public.%I DROP CONSTRAINT %I', partition_name, constraint_name);
+        END LOOP;
+        RETURN NEXT partition_name;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 2, 3. Partitioned tables
+-- Real tables
+ALTER TABLE public.mediatitles NO INHERIT public.mediacomments;
+DROP MATERIALIZED VIEW public.mediasdaily;
+ALTER TABLE public.mediacomments RENAME TO mediacomments_old;
+ALTER INDEX public.mediacomments_pkey RENAME TO mediacomments_old_pkey;
+ALTER INDEX public.mediacomments_check_key RENAME TO mediacomments_old_check_key;
+ALTER INDEX public.mediacomments_media_date_idx RENAME TO mediacomments_old_media_date_idx;
+ALTER TABLE public.medias RENAME TO medias_old;
+ALTER INDEX public.medias_pkey RENAME TO medias_old_pkey;
+ALTER INDEX public.medias_check_key RENAME TO medias_old_check_key;
+ALTER INDEX public.medias_profile_date_idx RENAME TO medias_old_profile_date_idx;
+
+CREATE TABLE public.medias(
+    id_media_aut INTEGER NOT NULL DEFAULT nextval('public.medias_id_media_aut_seq'),
+    id_profile INTEGER NOT NULL,
+    uploaded_date VARCHAR(15),
+    id_media VARCHAR(100),
+    like_count VARCHAR(20),
+    comment_count VARCHAR(20),
+    date DATE NOT NULL,
+    type VARCHAR(10),
+    PRIMARY KEY (id_media_aut, date),
+    FOREIGN KEY (id_profile) REFERENCES profiles(id_profile) ON UPDATE CASCADE ON DELETE CASCADE
+) PARTITION BY RANGE (date);
+ALTER TABLE public.medias OWNER TO lidia;
+ALTER SEQUENCE public.medias_id_media_aut_seq OWNED BY public.medias.id_media_aut;
+CREATE TABLE public.medias_default PARTITION OF public.medias DEFAULT;
+SELECT public.create_month_partitions('medias', (SELECT coalesce(min(date), CURRENT_DATE) FROM public.medias_old), 3);
+INSERT INTO public.medias SELECT id_media_aut, id_profile, uploaded_date, id_media, like_count,
+    comment_count, date, type FROM public.medias_old;
+CREATE UNIQUE INDEX medias_check_key ON public.medias (id_media, date);
+CREATE INDEX medias_profile_date_idx ON public.medias (id_profile, date) WHERE type = 'common';
+
+CREATE TABLE public.mediacomments(
+    id_text INTEGER NOT NULL DEFAULT nextval('public.mediacomments_id_text_seq'),
+    id_media_aut INTEGER NOT NULL,
+    date DATE NOT NULL,
+    original_text TEXT NOT NULL,
+    text_hash CHAR(32) NOT NULL,
+    preprocessed_text TEXT NOT NULL,
+    author VARCHAR(50) NOT NULL,
+    type VARCHAR(10) NOT NULL,
+    PRIMARY KEY (id_text, date),
+    FOREIGN KEY (id_media_aut, date) REFERENCES medias(id_media_aut, date) ON UPDATE CASCADE ON DELETE CASCADE
+) PARTITION BY RANGE (date);
+ALTER TABLE public.mediacomments OWNER TO lidia;
+ALTER SEQUENCE public.mediacomments_id_text_seq OWNED BY public.mediacomments.id_text;
+CREATE TABLE public.mediacomments_default PARTITION OF public.mediacomments DEFAULT;
+SELECT public.create_month_partitions('mediacomments', (SELECT coalesce(min(date), CURRENT_DATE) FROM public.mediacomments_old), 3);
+INSERT INTO public.mediacomments SELECT id_text, id_media_aut, date, original_text, text_hash,
+    preprocessed_text, author, type FROM ONLY public.mediacomments_old;
+CREATE UNIQUE INDEX mediacomments_check_key ON public.mediacomments (text_hash, author, id_media_aut, date);
+CREATE INDEX mediacomments_media_date_idx ON public.mediacomments (id_media_aut, date) WHERE type = 'comment';
+CREATE TRIGGER mediacomments_text_hash BEFORE INSERT OR UPDATE OF original_text ON public.mediacomments
+    FOR EACH ROW EXECUTE FUNCTION public.set_text_hash();
+
+DROP TABLE public.mediacomments_old;
+DROP TABLE public.medias_old;
+
+-- test tables
+ALTER TABLE public.testmediatitles NO INHERIT public.testmediacomments;
+DROP MATERIALIZED VIEW public.testmediasdaily;
+ALTER TABLE public.testmediacomments RENAME TO testmediacomments_old;
+ALTER INDEX public.testmediacomments_pkey RENAME TO testmediacomments_old_pkey;
+ALTER INDEX public.testmediacomments_check_key RENAME TO testmediacomments_old_check_key;
+ALTER INDEX public.testmediacomments_media_date_idx RENAME TO testmediacomments_old_media_date_idx;
+ALTER TABLE public.testmedias RENAME TO testmedias_old;
+ALTER INDEX public.testmedias_pkey RENAME TO testmedias_old_pkey;
+ALTER INDEX public.testmedias_check_key RENAME TO testmedias_old_check_key;
+ALTER INDEX public.testmedias_profile_date_idx RENAME TO testmedias_old_profile_date_idx;
+
+CREATE TABLE public.testmedias(
+    id_media_aut INTEGER NOT NULL DEFAULT nextval('public.testmedias_id_media_aut_seq'),
+    id_profile INTEGER NOT NULL,
+    uploaded_date VARCHAR(15),
+    id_media VARCHAR(100),
+    like_count VARCHAR(20),
+    comment_count VARCHAR(20),
+    date DATE NOT NULL,
+    type VARCHAR(10),
+    PRIMARY KEY (id_media_aut, date),
+    FOREIGN KEY (id_profile) REFERENCES testprofiles(id_profile) ON UPDATE CASCADE ON DELETE CASCADE
+) PARTITION BY RANGE (date);
+ALTER TABLE public.testmedias OWNER TO lidia;
+ALTER SEQUENCE public.testmedias_id_media_aut_seq OWNED BY public.testmedias.id_media_aut;
+CREATE TABLE public.testmedias_default PARTITION OF public.testmedias DEFAULT;
+SELECT public.create_month_partitions('testmedias', (SELECT coalesce(min(date), CURRENT_DATE) FROM public.testmedias_old), 3);
+INSERT INTO public.testmedias SELECT id_media_aut, id_profile, uploaded_date, id_media, like_count,
+    comment_count, date, type FROM public.testmedias_old;
+CREATE UNIQUE INDEX testmedias_check_key ON public.testmedias (id_media, date);
+CREATE INDEX testmedias_profile_date_idx ON public.testmedias (id_profile, date) WHERE type = 'common';
+
+CREATE TABLE public.testmediacomments(
+    id_text INTEGER NOT NULL DEFAULT nextval('public.testmediacomments_id_text_seq'),
+    id_media_aut INTEGER NOT NULL,
+    date DATE NOT NULL,
+    original_text TEXT NOT NULL,
+    text_hash CHAR(32) NOT NULL,
+    preprocessed_text TEXT NOT NULL,
+    author VARCHAR(50) NOT NULL,
+    type VARCHAR(10) NOT NULL,
+    PRIMARY KEY (id_text, date),
+    FOREIGN KEY (id_media_aut, date) REFERENCES testmedias(id_media_aut, date) ON UPDATE CASCADE ON DELETE CASCADE
+) PARTITION BY RANGE (date);
+ALTER TABLE public.testmediacomments OWNER TO lidia;
+ALTER SEQUENCE public.testmediacomments_id_text_seq OWNED BY public.testmediacomments.id_text;
+CREATE TABLE public.testmediacomments_default PARTITION OF public.testmediacomments DEFAULT;
+SELECT public.create_month_partitions('testmediacomments', (SELECT coalesce(min(date), CURRENT_DATE) FROM public.testmediacomments_old), 3);
+INSERT INTO public.testmediacomments SELECT id_text, id_media_aut, date, original_text, text_hash,
+    preprocessed_text, author, type FROM ONLY public.testmediacomments_old;
+CREATE UNIQUE INDEX testmediacomments_check_key ON public.testmediacomments (text_hash, author, id_media_aut, date);
+CREATE INDEX testmediacomments_media_date_idx ON public.testmediacomments (id_media_aut, date) WHERE type = 'comment';
+CREATE TRIGGER testmediacomments_text_hash BEFORE INSERT OR UPDATE OF original_text ON public.testmediacomments
+    FOR EACH ROW EXECUTE FUNCTION public.set_text_hash();
+
+DROP TABLE public.testmediacomments_old;
+DROP TABLE public.testmedias_old;
+
+-- 4. Daily views of the posts
+--
+-- Materialized view MediasDaily. It contains the number of posts of each user
+-- per day as well as their average number of likes and comments, so the
+-- analyses of the posts of any period of time are performed from these rows.
+-- The averages are not rounded because the DataAnalyzer rounds them, as the
+-- ones computed from the posts. It's refreshed after each download.
+--
+CREATE MATERIALIZED VIEW public.mediasdaily AS
+    SELECT p.username, p.social_media, m.date, COUNT(*) AS n_medias,
+        AVG(CAST(m.like_count AS BIGINT)) AS mean_likes,
+        AVG(CAST(m.comment_count AS BIGINT)) AS mean_comments
+    FROM public.medias m JOIN public.profiles p ON p.id_profile = m.id_profile
+    WHERE m.type = 'common' AND m.date IS NOT NULL
+        AND m.like_count ~ '^[0-9]+$' AND m.comment_count ~ '^[0-9]+$'
+    GROUP BY p.username, p.social_media, m.date;
+-- 
+-- Assign an owner to the view in order to operate with it.
+--
+ALTER MATERIALIZED VIEW public.mediasdaily OWNER TO lidia;
+--
+-- Unique index of each user and day, which is required to refresh the view
+-- concurrently.
+--
+CREATE UNIQUE INDEX mediasdaily_key ON public.mediasdaily (username, social_media, date);
+
+--
+-- Materialized view TestMediasDaily. It contains the number of posts of each user
+-- per day as well as their average number of likes and comments, so the
+-- analyses of the posts of any period of time are performed from these rows.
+-- The averages are not rounded because the DataAnalyzer rounds them, as the
+-- ones computed from the posts. It's refreshed after each download.
+--
+CREATE MATERIALIZED VIEW public.testmediasdaily AS
+    SELECT p.username, p.social_media, m.date, COUNT(*) AS n_medias,
+        AVG(CAST(m.like_count AS BIGINT)) AS mean_likes,
+        AVG(CAST(m.comment_count AS BIGINT)) AS mean_comments
+    FROM public.testmedias m JOIN public.testprofiles p ON p.id_profile = m.id_profile
+    WHERE m.type = 'common' AND m.date IS NOT NULL
+        AND m.like_count ~ '^[0-9]+$' AND m.comment_count ~ '^[0-9]+$'
+    GROUP BY p.username, p.social_media, m.date;
+-- 
+-- Assign an owner to the view in order to operate with it.
+--
+ALTER MATERIALIZED VIEW public.testmediasdaily OWNER TO lidia;
+--
+-- Unique index of each user and day, which is required to refresh the view
+-- concurrently.
+--
+CREATE UNIQUE INDEX testmediasdaily_key ON public.testmediasdaily (username, social_media, date);
+
+COMMIT;
+
+ANALYZE public.medias, public.mediacomments, public.testmedias, public.testmediacomments;
@@ -1,2 +1,10 @@
-# Run the Huey consumer with the scheduler to execute the periodic tasks
-huey_consumer.py huey_server.huey
\ No newline at end of file
+# Run the Huey consumer with the scheduler to execute the periodic tasks.
+# The number of workers which download the user data can be set through the
+# env variable HUEY_WORKERS.
+# If ANALYSIS_WATCHER is true, the watcher of the Mongo collections performs the
+# analyses of the new user data in advance (see change_watcher.py). The analysed
+# windows, in days, can be set through the env variable ANALYSIS_WATCHER_WINDOWS.
+if [ "${ANALYSIS_WATCHER:-false}" = "true" ]; then
+    python3 change_watcher.py --window-days ${ANALYSIS_WATCHER_WINDOWS:-7} &
+fi
+huey_consumer.py huey_server.huey --workers=${HUEY_WORKERS:-4} --worker-type=thread
@@ -1,5 +1,6 @@
 --
--- PostgreSQL database: socialnetworksdb.
+-- PostgreSQL database: socialnetworksdb. It requires PostgreSQL 13 or later
+-- because of the partitioned tables of the posts and the comments.
 --
 -- Table Profiles. It contains downloaded user data from the APIs.
 -- The primary key will be the id_profile, which is a combination between the user
@@ -28,6 +29,11 @@ CREATE TABLE public.profiles(
 -- Assign an owner to the table in order to operate with it.
 --
 ALTER TABLE public.profiles OWNER TO lidia;
+--
+-- Unique index with the fields which identify each record, so the repeated
+-- records are skipped when they are inserted in batches.
+--
+CREATE UNIQUE INDEX profiles_check_key ON public.profiles (username, social_media, date);
 
 --
 -- Table ProfilesEvolution. It will store the results of the analysis which
@@ -50,6 +56,11 @@ CREATE TABLE public.profilesevolution(
 -- Assign an owner to the table in order to operate with it.
 --
 ALTER TABLE public.profilesevolution OWNER TO lidia;
+--
+-- Unique index with the fields which identify each record, so the repeated
+-- records are skipped when they are inserted in batches.
+--
+CREATE UNIQUE INDEX profilesevolution_check_key ON public.profilesevolution (date_ini, date_fin, id_user, time);
 
 --
 -- Table ProfilesActivity. It will store the results of the analysis which
@@ -69,26 +80,111 @@ CREATE TABLE public.profilesactivity(
 -- Assign an owner to the table in order to operate with it.
 --
 ALTER TABLE public.profilesactivity OWNER TO lidia;
+--
+-- Unique index with the fields which identify each record, so the repeated
+-- records are skipped when they are inserted in batches.
+--
+CREATE UNIQUE INDEX profilesactivity_check_key ON public.profilesactivity (date_ini, date_fin, id_user, time);
+
+--
+-- Function to create the monthly partitions of a table from the month of the
+-- provided date to some months ahead of the current one. The months whose
+-- records are already in the default partition are skipped, because they
+-- can't be moved to a new partition.
+--
+CREATE OR REPLACE FUNCTION public.create_month_partitions(table_name TEXT, first_date DATE,
+                                                          months_ahead INTEGER) RETURNS SETOF TEXT AS $$
+DECLARE
+    month_start DATE := date_trunc('month', first_date);
+    month_end DATE;
+    last_month DATE := date_trunc('month', now()) + months_ahead * INTERVAL '1 month';
+    partition_name TEXT;
+    default_rows BOOLEAN;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        month_end := month_start + INTERVAL '1 month';
+        partition_name := table_name || '_' || to_char(month_start, 'YYYYMM');
+        IF to_regclass('public.' || partition_name) IS NULL THEN
+            EXECUTE format('SELECT EXISTS (SELECT 1 FROM public.%I WHERE date >= %L AND date < %L)',
+                           table_name || '_default', month_start, month_end) INTO default_rows;
+            IF default_rows THEN
+                RAISE NOTICE 'The records of % are kept in %', to_char(month_start, 'YYYY-MM'), table_name || '_default';
+            ELSE
+                EXECUTE format('CREATE TABLE public.%I PARTITION OF public.%I FOR VALUES FROM (%L) TO (%L)',
+                               partition_name, table_name, month_start, month_end);
+                RETURN NEXT partition_name;
+            END IF;
+        END IF;
+        month_start := month_end;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+--
+-- Function to detach the monthly partitions of a table which are older than
+-- the provided number of months. The detached partitions are kept as tables,
+-- without foreign keys, in order to archive or drop them. The partitions of
+-- the comments should be detached before the ones of the posts.
+--
+CREATE OR REPLACE FUNCTION public.detach_old_partitions(table_name TEXT, retention_months INTEGER)
+                                                        RETURNS SETOF TEXT AS $$
+DECLARE
+    first_kept DATE := date_trunc('month', now()) - retention_months * INTERVAL '1 month';
+    partition_name TEXT;
+    constraint_name TEXT;
+BEGIN
+    FOR partition_name IN
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = ('public.' || table_name)::regclass
+            AND c.relname ~ ('^' || table_name || '_[0-9]{6}$')
+            AND to_date(right(c.relname, 6), 'YYYYMM') < first_kept
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('ALTER TABLE public.%I DETACH PARTITION public.%I', table_name, partition_name);
+        -- The detached partition keeps the foreign keys of its table, so the
+        -- partition of the posts of the same month couldn't be detached
+        FOR constraint_name IN
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = ('public.' || partition_name)::regclass AND contype = 'f'
+        LOOP
+            EXECUTE format('ALTER TABLE public.%I DROP CONSTRAINT %I', partition_name, constraint_name);
+        END LOOP;
+        RETURN NEXT partition_name;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
 
 --
 -- Table Medias. It will contain the common data about the posts which have been
--- uploaded by an user in a specific social media.
+-- uploaded by an user in a specific social media. It's partitioned by month
+-- of download, so the primary key includes the date.
 --
 CREATE TABLE public.medias(
-    id_media_aut SERIAL PRIMARY KEY,
+    id_media_aut SERIAL,
     id_profile INTEGER NOT NULL,
     uploaded_date VARCHAR(15),
     id_media VARCHAR(100),
     like_count VARCHAR(20),
     comment_count VARCHAR(20),
-    date DATE,
+    date DATE NOT NULL,
     type VARCHAR(10),
+    PRIMARY KEY (id_media_aut, date),
     FOREIGN KEY (id_profile) REFERENCES profiles(id_profile) ON UPDATE CASCADE ON DELETE CASCADE
-);
+) PARTITION BY RANGE (date);
 -- 
 -- Assign an owner to the table in order to operate with it.
 --
 ALTER TABLE public.medias OWNER TO lidia;
+--
+-- Unique index with the fields which identify each record, so the repeated
+-- records are skipped when they are inserted in batches.
+--
+CREATE UNIQUE INDEX medias_check_key ON public.medias (id_media, date);
+--
+-- Partial index of the common posts of each profile sorted by date, used
+-- by the analyses of the posts and to get the posts of a period of time.
+--
+CREATE INDEX medias_profile_date_idx ON public.medias (id_profile, date) WHERE type = 'common';
 
 --
 -- Table MediasEvolution. It will contain the analysis result from studying the 
@@ -107,39 +203,99 @@ CREATE TABLE public.mediasevolution(
 -- Assign an owner to the table in order to operate with it.
 --
 ALTER TABLE public.mediasevolution OWNER TO lidia;
+--
+-- Unique index with the fields which identify each record, so the repeated
+-- records are skipped when they are inserted in batches.
+--
+CREATE UNIQUE INDEX mediasevolution_check_key ON public.mediasevolution (date_ini, date_fin, id_user, time);
+
+--
+-- Function to fill the md5 hash of the texts of the comments, titles and
+-- analysed comments, which is used to search them instead of their full texts.
+--
+CREATE OR REPLACE FUNCTION public.set_text_hash() RETURNS trigger AS $$
+BEGIN
+    NEW.text_hash := md5(NEW.original_text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
 
 --
 -- Table MediaComments. It will contain the comments wrote on the posts of the
--- owner user. 
+-- owner user. It's partitioned by month like the posts, whose date is the same
+-- as the date of their comments.
 --
 CREATE TABLE public.mediacomments(
-    id_text SERIAL PRIMARY KEY,
+    id_text SERIAL,
     id_media_aut INTEGER NOT NULL,
     date DATE NOT NULL,
     original_text TEXT NOT NULL,
+    text_hash CHAR(32) NOT NULL,
     preprocessed_text TEXT NOT NULL,
     author VARCHAR(50) NOT NULL,
     type VARCHAR(10) NOT NULL,
-    FOREIGN KEY (id_media_aut) REFERENCES medias(id_media_aut) ON UPDATE CASCADE ON DELETE CASCADE
-);
+    PRIMARY KEY (id_text, date),
+    FOREIGN KEY (id_media_aut, date) REFERENCES medias(id_media_aut, date) ON UPDATE CASCADE ON DELETE CASCADE
+) PARTITION BY RANGE (date);
 -- 
 -- Assign an owner to the table in order to operate with it.
 --
 ALTER TABLE public.mediacomments OWNER TO lidia;
+--
+-- Unique index with the fields which identify each record, so the repeated
+-- records are skipped when they are inserted in batches.
+--
+CREATE UNIQUE INDEX mediacomments_check_key ON public.mediacomments (text_hash, author, id_media_aut, date);
+--
+-- Partial index of the comments of each post sorted by date, used by the
+-- sentiment analyses and the user behaviours.
+--
+CREATE INDEX mediacomments_media_date_idx ON public.mediacomments (id_media_aut, date) WHERE type = 'comment';
+--
+-- Trigger to fill the hash of the texts before storing them.
+--
+CREATE TRIGGER mediacomments_text_hash BEFORE INSERT OR UPDATE OF original_text ON public.mediacomments
+    FOR EACH ROW EXECUTE FUNCTION public.set_text_hash();
+
+--
+-- Default partitions of the posts and comments, which contain the records of
+-- the months without their own partition, and the partitions of the current
+-- month and the next three ones. The task server creates the following ones.
+--
+CREATE TABLE public.medias_default PARTITION OF public.medias DEFAULT;
+CREATE TABLE public.mediacomments_default PARTITION OF public.mediacomments DEFAULT;
+SELECT public.create_month_partitions('medias', CURRENT_DATE, 3);
+SELECT public.create_month_partitions('mediacomments', CURRENT_DATE, 3);
 
 --
 -- Table MediaTitles. It will contain the titles of the posts which could have one,
--- like Instagram posts. This table will be the child of the MediaComments because
+-- like Instagram posts. It has the same fields as the MediaComments because
 -- it's a specialization of this one.
 --
 CREATE TABLE public.mediatitles(
+    LIKE public.mediacomments INCLUDING DEFAULTS,
     CONSTRAINT mediatitles_pkey PRIMARY KEY (id_text)
-) INHERITS (mediacomments);
+);
 
 -- 
 -- Assign an owner to the table in order to operate with it.
 --
 ALTER TABLE public.mediatitles OWNER TO lidia;
+--
+-- Unique index with the fields which identify each record, so the repeated
+-- records are skipped when they are inserted in batches.
+--
+CREATE UNIQUE INDEX mediatitles_check_key ON public.mediatitles (id_media_aut, text_hash, author);
+--
+-- Partial index of the titles of each post sorted by date, used by the
+-- sentiment analysis of the titles.
+--
+CREATE INDEX mediatitles_media_date_idx ON public.mediatitles (id_media_aut, date) WHERE type = 'title';
+--
+-- Trigger to fill the hash of the texts before storing them.
+--
+CREATE TRIGGER mediatitles_text_hash BEFORE INSERT OR UPDATE OF original_text ON public.mediatitles
+    FOR EACH ROW EXECUTE FUNCTION public.set_text_hash();
 
 --
 -- Table MediasPopularity. It will contain the analysis result from studying the 
@@ -158,6 +314,11 @@ CREATE TABLE public.mediaspopularity(
 -- Assign an owner to the table in order to operate with it.
 --
 ALTER TABLE public.mediaspopularity OWNER TO lidia;
+--
+-- Unique index with the fields which identify each record, so the repeated
+-- records are skipped when they are inserted in batches.
+--
+CREATE UNIQUE INDEX mediaspopularity_check_key ON public.mediaspopularity (date_ini, date_fin, id_user, id_media);
 
 --
 -- Table UserBehaviours. It will save the number of likers and haters in a 
@@ -176,6 +337,11 @@ CREATE TABLE public.userbehaviours(
 -- Assign an owner to the table in order to operate with it.
 --
 ALTER TABLE public.userbehaviours OWNER TO lidia;
+--
+-- Unique index with the fields which identify each record, so the repeated
+-- records are skipped when they are inserted in batches.
+--
+CREATE UNIQUE INDEX userbehaviours_check_key ON public.userbehaviours (date_ini, date_fin, id_user, time);
 
 --
 -- Table CommentSentiments. It will store the results of the sentiment analysis
@@ -185,6 +351,7 @@ ALTER TABLE public.userbehaviours OWNER TO lidia;
 CREATE TABLE public.commentsentiments(
     id_comment_sentiment SERIAL PRIMARY KEY,
     original_text TEXT NOT NULL,
+    text_hash CHAR(32) NOT NULL,
     sentiment VARCHAR(20) NOT NULL,
     degree REAL NOT NULL
 );
@@ -192,20 +359,16 @@ CREATE TABLE public.commentsentiments(
 -- Assign an owner to the table in order to operate with it.
 --
 ALTER TABLE public.commentsentiments OWNER TO lidia;
-
 --
--- Table MediaTitles. It will contain the titles of the posts which could have one,
--- like Instagram posts. This table will be the child of the MediaComments because
--- it's a specialization of this one.
+-- Unique index with the fields which identify each record, so the repeated
+-- records are skipped when they are inserted in batches.
 --
-CREATE TABLE public.mediatitles(
-    CONSTRAINT mediatitles_pkey PRIMARY KEY (id_text)
-) INHERITS (mediacomments);
-
--- 
--- Assign an owner to the table in order to operate with it.
+CREATE UNIQUE INDEX commentsentiments_check_key ON public.commentsentiments (text_hash);
 --
-ALTER TABLE public.mediatitles OWNER TO lidia;
+-- Trigger to fill the hash of the texts before storing them.
+--
+CREATE TRIGGER commentsentiments_text_hash BEFORE INSERT OR UPDATE OF original_text ON public.commentsentiments
+    FOR EACH ROW EXECUTE FUNCTION public.set_text_hash();
 
 --
 -- Table TextSentiments. It will contain the number of positive, neutral and negative
@@ -228,4 +391,84 @@ CREATE TABLE public.textsentiments(
 -- 
 -- Assign an owner to the table in order to operate with it.
 --
-ALTER TABLE public.textsentiments OWNER TO lidia;
\ No newline at end of file
+ALTER TABLE public.textsentiments OWNER TO lidia;
+--
+-- Unique index with the fields which identify each record, so the repeated
+-- records are skipped when they are inserted in batches.
+--
+CREATE UNIQUE INDEX textsentiments_check_key ON public.textsentiments (date_ini, date_fin, id_user, type);
+
+--
+-- Table TrackedUsers. It contains the users whose data will be downloaded periodically
+-- by the task server. Each user has a priority to sort the downloads as well as
+-- the number of hours after which their data should be downloaded again.
+--
+CREATE TABLE public.trackedusers(
+    id_tracked_user SERIAL PRIMARY KEY,
+    username VARCHAR(50) NOT NULL,
+    social_media VARCHAR(30) NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    freshness_hours INTEGER NOT NULL DEFAULT 24,
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    last_enqueued TIMESTAMP,
+    last_crawl TIMESTAMP
+);
+-- 
+-- Assign an owner to the table in order to operate with it.
+--
+ALTER TABLE public.trackedusers OWNER TO lidia;
+--
+-- Unique index with the fields which identify each record, so the repeated
+-- records are skipped when they are inserted in batches.
+--
+CREATE UNIQUE INDEX trackedusers_check_key ON public.trackedusers (username, social_media);
+--
+-- Partial index of the active users sorted by priority, used to get the
+-- users whose data should be downloaded.
+--
+CREATE INDEX trackedusers_due_idx ON public.trackedusers (priority DESC, last_crawl ASC NULLS FIRST) WHERE active;
+
+--
+-- Materialized view ProfilesDaily. It contains the metrics of the profiles of
+-- each user per day, so the profile analyses of any period of time are
+-- performed from these rows. It's refreshed after each download.
+--
+CREATE MATERIALIZED VIEW public.profilesdaily AS
+    SELECT username, social_media, date, CAST(n_medias AS BIGINT) AS n_medias,
+        CAST(n_followers AS BIGINT) AS n_followers, CAST(n_followings AS BIGINT) AS n_followings
+    FROM public.profiles
+    WHERE n_medias ~ '^[0-9]+$' AND n_followers ~ '^[0-9]+$' AND n_followings ~ '^[0-9]+$';
+-- 
+-- Assign an owner to the view in order to operate with it.
+--
+ALTER MATERIALIZED VIEW public.profilesdaily OWNER TO lidia;
+--
+-- Unique index of each user and day, which is required to refresh the view
+-- concurrently.
+--
+CREATE UNIQUE INDEX profilesdaily_key ON public.profilesdaily (username, social_media, date);
+
+--
+-- Materialized view MediasDaily. It contains the number of posts of each user
+-- per day as well as their average number of likes and comments, so the
+-- analyses of the posts of any period of time are performed from these rows.
+-- The averages are not rounded because the DataAnalyzer rounds them, as the
+-- ones computed from the posts. It's refreshed after each download.
+--
+CREATE MATERIALIZED VIEW public.mediasdaily AS
+    SELECT p.username, p.social_media, m.date, COUNT(*) AS n_medias,
+        AVG(CAST(m.like_count AS BIGINT)) AS mean_likes,
+        AVG(CAST(m.comment_count AS BIGINT)) AS mean_comments
+    FROM public.medias m JOIN public.profiles p ON p.id_profile = m.id_profile
+    WHERE m.type = 'common' AND m.date IS NOT NULL
+        AND m.like_count ~ '^[0-9]+$' AND m.comment_count ~ '^[0-9]+$'
+    GROUP BY p.username, p.social_media, m.date;
+-- 
+-- Assign an owner to the view in order to operate with it.
+--
+ALTER MATERIALIZED VIEW public.mediasdaily OWNER TO lidia;
+--
+-- Unique index of each user and day, which is required to refresh the view
+-- concurrently.
+--
+CREATE UNIQUE INDEX mediasdaily_key ON public.mediasdaily (username, social_media, date);
\ No newline at end of file
@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class which contains the asynchronous version of the operations with the Mongo
+database, in order to download, store and read the data of several users at the
+same time in the same event loop. It has the same queries and checks as the
+MongoDB class, but the operations are coroutines made with Motor. The clients
+are bound to the event loop in which they are used for the first time, so
+every AsyncMongoDB object of the process should be used in the same event loop.
+
+@author: Lidia Sánchez Mérida.
+"""
+import os
+import threading
+import warnings
+import pymongo
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from exceptions import NewItemNotFound, CollectionNotFound
+from mongodb import MongoDB
+
+# Asynchronous clients of the process, one per URI, shared by every AsyncMongoDB object
+async_mongo_clients = {}
+async_mongo_clients_lock = threading.Lock()
+
+def get_async_mongo_client(uri):
+    """
+    Function to get the asynchronous client of the process connected to a
+    specific URI. It will be created the first time it's required, with the
+    sizes of its pool of connections stored as env variables
+    (MONGODB_MAX_POOL_SIZE and MONGODB_MIN_POOL_SIZE).
+
+    Parameters
+    ----------
+    uri : str
+        It's the URI of the Mongo database.
+
+    Returns
+    -------
+    The AsyncIOMotorClient object connected to the URI.
+    """
+    client_key = (uri, os.getpid())
+    with async_mongo_clients_lock:
+        if (client_key not in async_mongo_clients):
+            async_mongo_clients[client_key] = AsyncIOMotorClient(uri,
+                maxPoolSize=int(os.environ.get("MONGODB_MAX_POOL_SIZE", "100")),
+                minPoolSize=int(os.environ.get("MONGODB_MIN_POOL_SIZE", "0")))
+        return async_mongo_clients[client_key]
+
+class AsyncMongoDB(MongoDB):
+
+    def __init__(self, collection):
+        """
+        Creates an AsyncMongoDB object with the same attributes as a MongoDB
+        object, whose connections to the collections are AsyncIOMotorCollection
+        objects. With Motor 2.x, the client is bound to the event loop which is
+        running when it's created, so the first object of the process should be
+        created inside the event loop in which it will be used.
+
+        Parameters
+        ----------
+        collection : str.
+            The collection name to connect to in the Mongo database.
+
+        Raises
+        ------
+        InvalidDatabaseCredentials
+            If the provided URI or collection name to connect to in the Mongo database
+            are wrong.
+
+        Returns
+        -------
+        An AsyncMongoDB object with the connection made to the database.
+        """
+        super().__init__(collection)
+        self.collection_type = AsyncIOMotorCollection
+
+    def get_client(self, uri):
+        """
+        Gets the asynchronous client of the process connected to the Mongo
+        database. The collections of this client are AsyncIOMotorCollection objects.
+
+        Parameters
+        ----------
+        uri : str
+            It's the URI of the Mongo database.
+
+        Returns
+        -------
+        The AsyncIOMotorClient object connected to the URI.
+        """
+        return get_async_mongo_client(uri)
+
+    def get_collection(self, collection=None):
+        """
+        Gets the connection to a specific collection in the Mongo database
+        without changing the current one. The asynchronous operations only
+        work with collections which store one document per day, so the
+        collections grouped by user and month are not allowed.
+
+        Parameters
+        ----------
+        collection : str, optional
+            It's the collection name. The default is None, which means the
+            current collection.
+
+        Raises
+        ------
+        CollectionNotFound
+            If the provided collection name is not a non-empty string or the
+            collection is grouped by user and month.
+
+        Returns
+        -------
+        The connection to the collection in the Mongo database.
+        """
+        connection = super().get_collection(collection)
+        # Check if the daily snapshots are stored in the monthly collection
+        if (connection.name in self.bucketed_collections):
+            raise CollectionNotFound("ERROR. The collections grouped by month can't be used asynchronously: "+
+                                     connection.name)
+        return connection
+
+    async def get_records(self, query, values={}, collection=None):
+        """
+        Gets the records which matched with the specified query and values from
+        the connected collection in the Mongo database.
+
+        Parameters
+        ----------
+        query : str
+            It's the query to make in order to get the data.
+        values : dict, optional
+            They are the required values to make the query, in case it has them. 
+            The default is a empty dict.
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        InvalidQuery
+            If the provided query is not a non-empty string or does not exist.
+        InvalidQueryValues
+            If the provided values to make the query are not a non-empty dict
+            or they haven't the required keys.
+
+        Returns
+        -------
+        A list which contains the matched records as dicts.
+        """
+        return [item async for item in self.iter_records(query, values, collection=collection)]
+
+    def iter_records(self, query, values={}, fields=None, batch_size=100,
+                     no_cursor_timeout=False, collection=None):
+        """
+        Gets the records which matched with the specified query and values from
+        the connected collection in the Mongo database one by one, without
+        blocking the event loop while the next batch of records is got.
+
+        Parameters
+        ----------
+        query : str
+            It's the query to make in order to get the data.
+        values : dict, optional
+            They are the required values to make the query, in case it has them. 
+            The default is a empty dict.
+        fields : list of str, optional
+            They're the fields of the records to get. The default is None, which
+            means all the fields.
+        batch_size : int, optional
+            It's the number of records to get in each round trip to the database.
+            The default is 100.
+        no_cursor_timeout : bool, optional
+            If True, the cursor won't be closed by the database when it's idle,
+            for long processes. The default is False.
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        InvalidQuery
+            If the provided query is not a non-empty string or does not exist.
+        InvalidQueryValues
+            If the provided values to make the query are not valid.
+
+        Returns
+        -------
+        An asynchronous iterator of the matched records as dicts.
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        # Make the final query without the Mongo id because it's useless
+        final_query, projection = self.build_find_query(query, values, fields, batch_size)
+        item_rows = connection.find(final_query, projection, batch_size=batch_size,
+                                    no_cursor_timeout=no_cursor_timeout)
+        # Read the dates from the index on the date
+        if (query == "get_dates"):
+            item_rows = item_rows.sort("date", pymongo.ASCENDING)
+        
+        return self.stream_cursor(item_rows)
+
+    async def stream_cursor(self, cursor):
+        """
+        Goes through the records of a cursor and closes it when all of them
+        have been read or the reading is stopped.
+
+        Parameters
+        ----------
+        cursor : AsyncIOMotorCursor
+            It's the cursor of the query made to the Mongo database.
+
+        Yields
+        ------
+        Each record of the cursor as a dict.
+        """
+        try:
+            async for item_r in cursor:
+                yield item_r
+        finally:
+            await cursor.close()
+
+    async def create_unique_index(self, collection=None):
+        """
+        Creates, if it doesn't already exist, the unique index of the current
+        collection on the username, social media source and date.
+
+        Parameters
+        ----------
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+
+        Returns
+        -------
+        The name of the index. None if it couldn't be created because the
+        collection already has duplicated documents. The error is kept, so the
+        index won't be created again until the duplicates are removed (see
+        mongo_indexes.py).
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        
+        # The collections with duplicated documents are not tried again
+        if (connection.name in self.unique_index_errors):
+            return None
+        index_keys = [(key, pymongo.ASCENDING) for key in self.get_queries["general_check"]["fields"]]
+        try:
+            index_name = await connection.create_index(index_keys, unique=True)
+        except pymongo.errors.OperationFailure as error: # pragma no cover
+            self.unique_index_errors[connection.name] = str(error)
+            warnings.warn("The unique index of "+connection.name+" couldn't be created: "+str(error))
+            return None
+        self.unique_indexed_collections.add(connection.name)
+        return index_name
+
+    async def insert_item(self, new_item, collection=None):
+        """
+        Inserts a new record in a specific collection in the Mongo database if
+        it doesn't already exist, in a single upsert operation.
+
+        Parameters
+        ----------
+        new_item : dict
+            It's the new data to insert.
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        NewItemNotFound
+            If the provided values to make the query are not a non-empty dict.
+
+        Returns
+        -------
+        A string id if the item could be inserted, None if it couldn't.
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        # Check the provided new item
+        if (type(new_item) != dict or len(new_item) == 0):
+            raise NewItemNotFound("ERROR. The new item to insert should be a non-empty dict.")
+        
+        if (connection.name not in self.unique_indexed_collections):
+            await self.create_unique_index(connection.name)
+        # Insert the item only if there are not equal records
+        final_query = {key:new_item[key] for key in self.get_queries["general_check"]["fields"]}
+        try:
+            result = await connection.update_one(final_query, {"$setOnInsert":new_item}, upsert=True)
+        except pymongo.errors.DuplicateKeyError: # pragma no cover
+            # Another process has inserted the same item at the same time
+            return None
+        if (result.upserted_id != None):
+            await self.add_available_dates([new_item], connection.name)
+            return str(result.upserted_id)
+
+    async def bulk_upsert(self, items, collection=None):
+        """
+        Inserts a list of new records in a specific collection in the Mongo
+        database in a single unordered bulk operation. The records which
+        already exist won't be modified.
+
+        Parameters
+        ----------
+        items : list of dicts
+            It's the list of new data to insert.
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        NewItemNotFound
+            If the provided items are not a non-empty list of dicts or they
+            have not the required keys.
+
+        Returns
+        -------
+        A dict with the number of inserted records and the number of records
+        which already existed.
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        operations = self.get_upsert_operations(items)
+        
+        if (connection.name not in self.unique_indexed_collections):
+            await self.create_unique_index(connection.name)
+        try:
+            result = (await connection.bulk_write(operations, ordered=False)).bulk_api_result
+        except pymongo.errors.BulkWriteError as error: # pragma no cover
+            result = self.get_duplicated_bulk_result(error)
+        
+        # Add the dates of the inserted records to the summary
+        inserted_items = [items[upserted["index"]] for upserted in result.get("upserted", [])]
+        if (len(inserted_items) > 0):
+            await self.add_available_dates(inserted_items, connection.name)
+        return {"inserted":result["nUpserted"], "matched":result["nMatched"]}
+
+    async def append_items(self, new_item, field, collection=None):
+        """
+        Appends a list of items to a field of the document which has the same
+        username, social media source and date than the provided item. If the
+        document doesn't exist, it will be created. The items which are already
+        in the field are replaced or merged with the new ones (see
+        get_append_update).
+
+        Parameters
+        ----------
+        new_item : dict
+            It's the data to append. It should have the username, the social media
+            source, the date and the field which contains the list of items to append.
+        field : str
+            It's the field of the document in which the items will be appended.
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        NewItemNotFound
+            If the provided item is not a non-empty dict or it has not the
+            required keys.
+
+        Returns
+        -------
+        The number of provided items to append.
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        # Check the provided new item
+        if (type(new_item) != dict or len(new_item) == 0):
+            raise NewItemNotFound("ERROR. The new item to insert should be a non-empty dict.")
+        required_keys = self.get_queries["general_check"]["fields"] + [field]
+        if (not all(key in new_item for key in required_keys) or type(new_item[field]) != list):
+            raise NewItemNotFound("ERROR. The new item should have the required keys and a list of items to append.")
+        
+        # Document to update and items to append
+        final_query = {key:new_item[key] for key in self.get_queries["general_check"]["fields"]}
+        result = await connection.update_one(final_query, self.get_append_update(new_item[field], field), upsert=True)
+        if (result.upserted_id != None):
+            await self.add_available_dates([new_item], connection.name)
+        return len(new_item[field])
+
+    async def collection_size(self, collection=None):
+        """
+        Gets the number of documents contained in the current collection.
+
+        Parameters
+        ----------
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Returns
+        -------
+        An integer which represents the size of the current collection.
+        """
+        return await self.get_collection(collection).count_documents({})
+
+    async def delete_records(self, query, values={}, collection=None):
+        """
+        Deletes the matched records from a specific collection and related to
+        the provided query.
+
+        Parameters
+        ----------
+        query : str
+            It's the query to make in order to remove the matched records.
+        values : dict, optional
+            They're the values to make the query. The default is {}.
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        InvalidQuery
+            If the provided query is not a non-empty string or does not exist.
+        InvalidQueryValues
+            If the provided values to make the query are not a non-empty dict
+            or they haven't the required keys.
+
+        Returns
+        -------
+        The number of deleted records.
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        final_query = self.build_delete_query(query, values)
+        
+        # Delete the matched items related to the specified query
+        result = await connection.delete_many(final_query)
+        # Remove the deleted dates from the summary
+        summary = self.client[self.db][self.available_dates_collection]
+        if (query == "delete_all"):
+            await summary.delete_many({"collection":connection.name})
+        elif (result.deleted_count > 0):
+            await summary.update_one(*self.get_removed_date_update(final_query, connection.name))
+            await summary.delete_many({"collection":connection.name, "users":{"$size":0}})
+        return result.deleted_count
+
+    async def add_available_dates(self, items, collection):
+        """
+        Adds the dates of the provided records to the summary of the dates in
+        which a collection has data of each user.
+
+        Parameters
+        ----------
+        items : list of dicts
+            They're the inserted records with their username, social media
+            source and date.
+        collection : str
+            It's the collection in which the records have been inserted.
+
+        Returns
+        -------
+        The number of dates of the summary which have been updated.
+        """
+        summary = self.client[self.db][self.available_dates_collection]
+        operations = self.get_available_dates_operations(items, collection)
+        try:
+            await summary.bulk_write(operations, ordered=False)
+        except pymongo.errors.BulkWriteError: # pragma no cover
+            # Another process has added the same date at the same time
+            await summary.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    async def rebuild_available_dates(self, collection=None):
+        """
+        Builds again the summary of the dates in which a collection has data of
+        each user by grouping its records in the Mongo database. The summary is
+        updated date by date, so it could be read and updated at the same time.
+
+        Parameters
+        ----------
+        collection : str, optional
+            It's the collection whose dates will be summarized. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+
+        Returns
+        -------
+        The number of dates of the summary.
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        
+        summary = self.client[self.db][self.available_dates_collection]
+        stored_dates = [item async for item in summary.find({"collection":connection.name, "date":{"$ne":None}},
+                                                            {"date":1})]
+        dates = [item async for item in connection.aggregate(self.get_available_dates_pipeline(connection.name))]
+        await summary.bulk_write(self.get_rebuilt_dates_operations(dates, stored_dates, connection.name),
+                                 ordered=False)
+        return len(dates)
+
+    async def get_available_dates(self, collection=None, username=None, social_media=None):
+        """
+        Gets the sorted dates in which a collection has data, optionally of a
+        specific user and social media source, from the summary of dates. If
+        the collection has not been summarized yet, the summary will be built
+        from its records, even if some dates have been added since then.
+
+        Parameters
+        ----------
+        collection : str, optional
+            It's the collection whose dates will be got. The default is None,
+            which means the current collection.
+        username : str, optional
+            It's the username of the user whose dates will be got. The default
+            is None, which means every user.
+        social_media : str, optional
+            It's the social media source of the user. The default is None, which
+            means every social media source.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        InvalidQueryValues
+            If the provided username or social media source are not non-empty strings.
+
+        Returns
+        -------
+        A list with the dates.
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        summary_query = self.build_available_dates_query(connection.name, username, social_media)
+        
+        summary = self.client[self.db][self.available_dates_collection]
+        # Build the summary of the collections which have not got one yet
+        if (await summary.count_documents(dict(self.get_summarized_query(connection.name), summarized=True),
+                                          limit=1) == 0 and
+            await connection.find_one({}, {"_id":1}) != None):
+            await self.rebuild_available_dates(connection.name)
+        
+        dates = summary.find(summary_query, {"_id":0, "date":1}).sort("date", pymongo.ASCENDING)
+        return [item["date"] async for item in dates]
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Command to load every profile and media stored in the Mongo database in the
+Postgres database and refresh the materialized views of the daily metrics. The
+downloads only copy the data of the current day, so it should be run once
+before computing the analyses from the views (ANALYSIS_METRIC_VIEWS) in order
+to include the data downloaded before. It could be run several times because
+the records which are already in the Postgres database are skipped:
+    python3 src/backfill_metric_views.py [--test] [--batch-size N]
+
+@author: Lidia Sánchez Mérida
+"""
+import argparse
+from main_ops import MainOperations
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Loads the stored data in the views of the daily metrics.")
+    parser.add_argument("--test", action="store_true", help="Load the test collections and tables.")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Number of records per batch.")
+    args = parser.parse_args()
+
+    def show_progress(n_read, n_inserted, elapsed):
+        print("    ", n_read, "read,", n_inserted, "inserted,", round(n_read/elapsed, 1), "rows/s")
+    result = MainOperations().backfill_metric_views("test" if args.test else "real",
+                                                    args.batch_size, show_progress)
+    print("Profiles:", result["profiles"])
+    print("Medias:", result["medias"])
+    print("Refreshed views:", result["views"])
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class which watches the changes of the Mongo collections of user data in order
+to perform the analyses in advance. The new snapshots of a user are gathered
+until no more of them arrive during the delay, that is, until the download of
+the user has finished, even if it has many pages. Then, the analyses which
+depend on the modified collections are enqueued as Huey tasks for the periods
+of time which end on the date of the last snapshot: one per analysed window
+and, incrementally, the one since the last date which was analysed in advance.
+In this way, their results are already stored in the Postgres database when
+they are requested from the platform.
+
+The change streams require a Mongo replica set, which could be a single-node
+one started with the option --replSet. The last processed change is stored in
+the Mongo database, once every gathered snapshot has been enqueued, so the
+watcher could be restarted without losing changes.
+
+It's run along with the Huey consumer if ANALYSIS_WATCHER is true (see run_huey.sh):
+    python3 src/change_watcher.py [--test] [--window-days N ...] [--delay SECONDS]
+
+@author: Lidia Sánchez Mérida
+"""
+import argparse
+import time
+from datetime import timedelta
+from exceptions import InvalidMongoDbObject, InvalidLimit
+from mongodb import MongoDB
+
+class AnalysisWatcher:
+
+    def __init__(self, mongodb_object, enqueue_function=None, mode="real",
+                 window_days=7, delay=300):
+        """
+        Creates an AnalysisWatcher object whose attributes are:
+            - A MongoDB object to watch the Mongo database.
+            - The function to enqueue an analysis. By default, the analysis will
+                be enqueued as a Huey task.
+            - The analyses which depend on each watched collection.
+            - The numbers of days of the analysed periods of time.
+            - The time, in seconds, without new snapshots of a user after which
+                their download is considered finished.
+            - The users whose new snapshots are waiting for the end of their
+                download, with the modified collections, the date of the last
+                snapshot and the time of the last change.
+            - The last date which was analysed in advance for each user and analysis.
+            - The collection and the document which store the last processed change.
+
+        Parameters
+        ----------
+        mongodb_object : MongoDB
+            It's the MongoDB object which contains the connection to the Mongo database.
+        enqueue_function : function, optional
+            It's the function which receives the username, the analysis, the
+            social media source, the range of dates and the delay. The default is None.
+        mode : str, optional
+            It's the type of collections to watch, 'real' or 'test'. The default is 'real'.
+        window_days : int or list of int, optional
+            It's the number of days of the analysed periods of time. The default is 7.
+        delay : int, optional
+            It's the time without new snapshots to wait before performing the
+            analyses of a user. The default is 300.
+
+        Raises
+        ------
+        InvalidMongoDbObject
+            If the provided MongoDB object is not valid.
+        InvalidLimit
+            If the provided mode, numbers of days or delay are not valid.
+
+        Returns
+        -------
+        An AnalysisWatcher object.
+        """
+        if (type(mongodb_object) != MongoDB):
+            raise InvalidMongoDbObject("ERROR. The connection to the MongoDB database "+
+                                       "should be a MongoDB object.")
+        # Check the provided mode and limits
+        if (mode != "real" and mode != "test"):
+            raise InvalidLimit("ERROR. The mode should be 'real' or 'test'.")
+        window_days = [window_days] if type(window_days) == int else window_days
+        if (type(window_days) != list or len(window_days) == 0 or
+            not all(type(days) == int and days > 0 for days in window_days)):
+            raise InvalidLimit("ERROR. The number of days should be a number greater than 0.")
+        if (type(delay) != int or delay < 0):
+            raise InvalidLimit("ERROR. The delay should be a positive number.")
+
+        self.mongodb = mongodb_object
+        self.enqueue_function = self.enqueue_huey_task if enqueue_function == None else enqueue_function
+        self.window_days = sorted(set(window_days))
+        self.delay = delay
+        self.pending_users = {}
+        self.analysed_dates = {}
+        self.resume_collection = "change_stream_tokens"
+        self.resume_id = "analysis_watcher_"+mode
+
+        if (mode == "test"):
+            self.collection_analyses = {
+                "test":["test_profile_evolution", "test_profile_activity"],
+                "test_medias":["test_media_evolution", "test_media_popularity",
+                               "test_title_sentiment_analysis"],
+                "test_comments":["test_comment_sentiment_analysis", "test_user_behaviours"]
+                }
+        else:
+            self.collection_analyses = {
+                "profiles":["profile_evolution", "profile_activity"],
+                "medias":["media_evolution", "media_popularity", "title_sentiment_analysis"],
+                "comments":["comment_sentiment_analysis", "user_behaviours"]
+                }
+        # The snapshots of the monthly collections have the same analyses
+        for collection in list(self.collection_analyses.keys()):
+            if (collection in self.mongodb.bucket_metrics):
+                self.collection_analyses[collection+"_monthly"] = self.collection_analyses[collection]
+
+    def enqueue_huey_task(self, username, analysis, social_media, date_ini, date_fin, delay):
+        """
+        Enqueues an analysis as a Huey task which will be performed by the
+        workers after the provided delay.
+
+        Parameters
+        ----------
+        username : str
+            It's the username of the analysed user.
+        analysis : str
+            It's the analysis to perform.
+        social_media : str
+            It's the social media source of the user data.
+        date_ini : str
+            It's the initial date of the analysed period of time.
+        date_fin : str
+            It's the final date of the analysed period of time.
+        delay : int
+            It's the time to wait before performing the analysis.
+
+        Returns
+        -------
+        The result of the Huey task.
+        """
+        from huey_server import precompute_analysis
+        return precompute_analysis.schedule((username, analysis, social_media, date_ini, date_fin),
+                                            delay=delay)
+
+    def get_snapshot_date(self, collection, document):
+        """
+        Gets the date of the snapshot which has been stored in a document. The
+        date of the monthly documents is the date of their last daily snapshot.
+
+        Parameters
+        ----------
+        collection : str
+            It's the collection of the document.
+        document : dict
+            It's the stored document.
+
+        Returns
+        -------
+        A datetime with the date of the snapshot. None if it hasn't got a date.
+        """
+        if (collection.endswith("_monthly")):
+            points = document.get("points", [])
+            return points[-1]["date"] if len(points) > 0 else None
+        return document.get("date")
+
+    def handle_change(self, change, now=None):
+        """
+        Gathers a new or modified document of a watched collection with the
+        rest of the new snapshots of its user. The analyses will be enqueued
+        when the download of the user finishes.
+
+        Parameters
+        ----------
+        change : dict
+            It's the event of the change stream.
+        now : float, optional
+            It's the time of the change. The default is None, which means the
+            current time.
+
+        Returns
+        -------
+        True if the snapshot has been gathered, False if the change is not
+        related to a snapshot of a watched collection.
+        """
+        collection = change.get("ns", {}).get("coll")
+        document = change.get("fullDocument")
+        # Check if the change is related to a watched collection
+        if (collection not in self.collection_analyses or document == None):
+            return False
+        snapshot_date = self.get_snapshot_date(collection, document)
+        if (snapshot_date == None or "username" not in document or "social_media" not in document):
+            return False
+
+        user_key = (document["username"], document["social_media"])
+        pending = self.pending_users.setdefault(user_key, {"collections":set(), "date":snapshot_date})
+        pending["collections"].add(collection)
+        pending["date"] = max(pending["date"], snapshot_date)
+        # Every new snapshot delays the analyses until the download finishes
+        pending["last_change"] = time.time() if now == None else now
+        return True
+
+    def get_analysed_periods(self, user_key, analysis, snapshot_date):
+        """
+        Gets the periods of time to analyse in advance which end on the date of
+        the last snapshot of a user: one per analysed window and the one since
+        the last date which was analysed in advance, if it's not already included.
+
+        Parameters
+        ----------
+        user_key : tuple of str
+            It's the username and the social media source of the user.
+        analysis : str
+            It's the analysis to perform.
+        snapshot_date : datetime
+            It's the date of the last snapshot of the user.
+
+        Returns
+        -------
+        A list of tuples with the initial and final dates of each period.
+        """
+        date_fin = snapshot_date.strftime("%d-%m-%Y")
+        date_inis = [snapshot_date-timedelta(days=days) for days in self.window_days]
+        # Analyse the new snapshots since the last analysed date
+        last_date = self.analysed_dates.get(user_key+(analysis,))
+        if (last_date != None and last_date < snapshot_date and last_date not in date_inis):
+            date_inis.append(last_date)
+        return [(date_ini.strftime("%d-%m-%Y"), date_fin) for date_ini in sorted(date_inis, reverse=True)]
+
+    def flush_pending_users(self, now=None):
+        """
+        Enqueues the analyses of the users whose downloads have finished, that
+        is, whose last snapshot arrived more than the delay ago.
+
+        Parameters
+        ----------
+        now : float, optional
+            It's the current time. The default is None, which means the time
+            of the system.
+
+        Returns
+        -------
+        A list of tuples with the usernames, the enqueued analyses and their
+        ranges of dates.
+        """
+        now = time.time() if now == None else now
+        enqueued = []
+        for user_key in [key for key, pending in self.pending_users.items()
+                         if pending["last_change"] <= now-self.delay]:
+            pending = self.pending_users.pop(user_key)
+            analyses = []
+            for collection in sorted(pending["collections"]):
+                analyses.extend([analysis for analysis in self.collection_analyses[collection]
+                                 if analysis not in analyses])
+            for analysis in analyses:
+                for date_ini, date_fin in self.get_analysed_periods(user_key, analysis, pending["date"]):
+                    self.enqueue_function(user_key[0], analysis, user_key[1], date_ini, date_fin, 0)
+                    enqueued.append((user_key[0], analysis, date_ini, date_fin))
+                self.analysed_dates[user_key+(analysis,)] = pending["date"]
+        return enqueued
+
+    def load_resume_token(self):
+        """
+        Gets the token of the last processed change.
+
+        Returns
+        -------
+        The resume token. None if there isn't any processed change.
+        """
+        tokens = self.mongodb.client[self.mongodb.db][self.resume_collection]
+        document = tokens.find_one({"_id":self.resume_id})
+        return document["token"] if document != None else None
+
+    def save_resume_token(self, token):
+        """
+        Stores the token of the last processed change.
+
+        Parameters
+        ----------
+        token : dict
+            It's the resume token of the change stream.
+
+        Returns
+        -------
+        None.
+        """
+        tokens = self.mongodb.client[self.mongodb.db][self.resume_collection]
+        tokens.update_one({"_id":self.resume_id}, {"$set":{"token":token}}, upsert=True)
+
+    def watch(self, max_changes=None):
+        """
+        Watches the inserted, updated and replaced documents of the collections
+        of user data and enqueues their analyses when the downloads of their
+        users finish. It starts from the last processed change if there is one.
+
+        Parameters
+        ----------
+        max_changes : int, optional
+            It's the number of changes to process before stopping. The default
+            is None, which means that the watcher never stops.
+
+        Returns
+        -------
+        The number of processed changes.
+        """
+        pipeline = [{"$match":{"operationType":{"$in":["insert", "update", "replace"]},
+                               "ns.coll":{"$in":list(self.collection_analyses.keys())}}}]
+        database = self.mongodb.client[self.mongodb.db]
+        n_changes = 0
+        with database.watch(pipeline, full_document="updateLookup", max_await_time_ms=1000,
+                            resume_after=self.load_resume_token()) as stream:
+            while (stream.alive):
+                # Wait for a change at most one second in order to check the finished downloads
+                change = stream.try_next()
+                if (change != None):
+                    self.handle_change(change)
+                    n_changes += 1
+                self.flush_pending_users()
+                # The changes of the gathered snapshots will be processed again after a restart
+                if (len(self.pending_users) == 0 and stream.resume_token != None):
+                    self.save_resume_token(stream.resume_token)
+                if (max_changes != None and n_changes >= max_changes):
+                    break
+        return n_changes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Performs the analyses of the new user data in advance.")
+    parser.add_argument("--test", action="store_true", help="Watch the test collections.")
+    parser.add_argument("--window-days", type=int, nargs="+", default=[7],
+                        help="Numbers of days of the analysed periods.")
+    parser.add_argument("--delay", type=int, default=300,
+                        help="Seconds without new snapshots of a user after which their analyses are performed.")
+    args = parser.parse_args()
+
+    watcher = AnalysisWatcher(MongoDB("profiles"), mode="test" if args.test else "real",
+                              window_days=args.window_days, delay=args.delay)
+    watcher.watch()
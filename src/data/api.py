@@ -19,16 +19,35 @@ import pickle
 
 class Api:
     
-    def __init__(self):
+    def __init__(self, session_pool=None):
         """
         Creates an API object whose attributes are:
             - The connection to one of the avalaible APIs.
+            - An optional pool of authenticated sessions to share the requests
+                between several Instagram accounts.
+            - The username of the session which made the last request.
+            - The seconds to wait between two requests and between the download
+                of two types of user data, in order to not flood the servers.
+
+        Parameters
+        ----------
+        session_pool : SessionPool, optional
+            It's the pool of sessions to the LevPasha Instagram API. If it's
+            provided, each request will be sent using the session with the most
+            remaining requests. The default is None.
 
         Returns
         -------
         An API object.
         """
         self.connection = None
+        self.session_pool = session_pool
+        self.current_session = None
+        self.request_delay = 20
+        self.section_delay = 30
+        # Messages of the responses which mean that the session has been limited
+        self.rate_limit_messages = ['please wait a few minutes', 'spam', 'feedback_required',
+                                    'rate limit']
         
     def connect_levpasha_instagram_api(self, use_session_file=True, session_file="./levpasha_session.txt"):
         """
@@ -91,6 +110,67 @@ class Api:
         
         return self.connection
     
+    def is_rate_limited(self):
+        """
+        Checks if the last response of the LevPasha Instagram API means that the
+        current session has been limited, because of too many requests (HTTP 429)
+        or because they have been considered as spam. Other failures, such as a
+        private or missing account, are not related to the session.
+
+        Returns
+        -------
+        True if the session has been limited, False if it hasn't.
+        """
+        last_response = getattr(self.connection, 'LastResponse', None)
+        if (getattr(last_response, 'status_code', None) == 429):
+            return True
+        last_json = self.connection.LastJson
+        if (last_json.get('spam', False) == True):
+            return True
+        message = str(last_json.get('message', '')).lower()
+        return any(limit_message in message for limit_message in self.rate_limit_messages)
+    
+    def make_request(self, request, *args):
+        """
+        Sends a request to the LevPasha Instagram API. If there is a pool of
+        sessions, the request will be sent using the session with the most
+        remaining requests. The sessions which have been limited will be
+        quarantined and the request will be sent again with another one. The
+        rest of failed responses are returned as they are.
+
+        Parameters
+        ----------
+        request : str
+            It's the name of the LevPasha Instagram API method to call.
+        *args
+            They're the parameters of the request.
+
+        Raises
+        ------
+        MaxRequestsExceed
+            If all the sessions of the pool have reached their limit of requests.
+
+        Returns
+        -------
+        The dict with the response of the LevPasha Instagram API.
+        """
+        # Single connection to the API Instagram
+        if (self.session_pool == None):
+            if (self.connection == None):
+                self.connection = self.connect_levpasha_instagram_api()
+            getattr(self.connection, request)(*args)
+            return self.connection.LastJson
+
+        # Pool of sessions
+        while True:
+            self.current_session, self.connection = self.session_pool.acquire()
+            getattr(self.connection, request)(*args)
+            if (self.connection.LastJson.get('status', 'ok').lower() == 'ok' or
+                not self.is_rate_limited()):
+                return self.connection.LastJson
+            # Quarantine the limited session and try again with another one
+            self.session_pool.quarantine(self.current_session)
+    
     def get_levpasha_instagram_profile(self, search_user):
         """
         Gets the profile of the specified user using the LevPasha Instagram API.
@@ -114,12 +194,8 @@ class Api:
         """
         if (type(search_user) != str or search_user == ""):
             raise UsernameNotFound("ERROR. The username should be a non empty string.")
-        # Check the connection to the API Instagram
-        if (self.connection == None):
-            self.connection = self.connect_levpasha_instagram_api()
-            
         # Gets the profile of the user
-        self.connection.searchUsername(search_user)
+        self.make_request('searchUsername', search_user)
         # Exception when the max number of requests has been exceeded
         if (self.connection.LastJson['status'].lower() != 'ok'):    # pragma: no cover
             raise MaxRequestsExceed("Max requests exceed. Wait to send more.")
@@ -141,12 +217,13 @@ class Api:
         
         return profile
     
-    def get_levpasha_instagram_posts(self, user_id, limit=100):
+    def iter_levpasha_instagram_posts(self, user_id, limit=100):
         """
-        Gets post data of a specific user. Establishing a maximum number of post
-        data is advisable in order to not exceed the maximum number of requests
-        of the LevPasha Instagram API. By default, the maximum number of post
-        data is 100 posts.
+        Gets post data of a specific user page by page, so each page could be
+        processed as soon as it's downloaded. Establishing a maximum number of
+        post data is advisable in order to not exceed the maximum number of
+        requests of the LevPasha Instagram API. By default, the maximum number
+        of post data is 100 posts.
 
         Parameters
         ----------
@@ -162,10 +239,10 @@ class Api:
         InvalidLimit
             If the provided maximum of post data is not a positive integer.
 
-        Returns
-        -------
+        Yields
+        ------
         posts : list of dicts.
-            It's the list of post data whose fields are:
+            It's the page of post data whose fields are:
                 - The post id.
                 - The post title.
                 - The like_count as well as comment_count.
@@ -176,23 +253,19 @@ class Api:
         # Check the limit
         if (type(limit) != int or limit <= 0):
             raise InvalidLimit("ERROR. The post limit should be a number greater than 0.")
-        # Check the connection to the API Instagram
-        if (self.connection == None):
-            self.connection = self.connect_levpasha_instagram_api()
-            
-        posts = []
         more_posts = True
         max_id = ""
         n_downloaded_posts = 0
         # Get posts while there are still more posts
         while more_posts:
-            self.connection.getUserFeed(user_id, max_id)
+            self.make_request('getUserFeed', user_id, max_id)
             if (self.connection.LastJson['more_available'] == False):
                 more_posts = False
 
             # Save the media id, its number of likes and comments.
             max_id = self.connection.LastJson.get('next_max_id', '')
             items_list = self.connection.LastJson['items']
+            posts = []
             for i in items_list:
                 # Format the date
                 posts.append({'id_media':i['id'], 
@@ -201,19 +274,81 @@ class Api:
                               'like_count':i['like_count'], 
                               'comment_count':i['comment_count'],
                               })
+            yield posts
             
             n_downloaded_posts += len(items_list)
             if (n_downloaded_posts >= limit): break
             # IMPORTANT!
             ## Wait some time to avoid flooding the servers.
-            time.sleep(20)
+            time.sleep(self.request_delay)
+
+    def get_levpasha_instagram_posts(self, user_id, limit=100):
+        """
+        Gets post data of a specific user. Establishing a maximum number of post
+        data is advisable in order to not exceed the maximum number of requests
+        of the LevPasha Instagram API. By default, the maximum number of post
+        data is 100 posts.
+
+        Parameters
+        ----------
+        user_id : integer
+            It's the user id which represents the user to get their post data.
+        limit : integer
+            It's the maximum number of post data to get. The default is 100.
+
+        Raises
+        ------
+        InvalidUserId
+            If the provided user id is not a positive integer.
+        InvalidLimit
+            If the provided maximum of post data is not a positive integer.
+
+        Returns
+        -------
+        posts : list of dicts.
+            It's the list of post data whose fields are:
+                - The post id.
+                - The post title.
+                - The like_count as well as comment_count.
+        """
+        posts = []
+        for page in self.iter_levpasha_instagram_posts(user_id, limit):
+            posts.extend(page)
             
         return posts
      
-    def get_levpasha_instagram_posts_comments(self, username, posts):
+    def get_post_activity(self, post):
+        """
+        Gets the values to sort the posts from the most recently active to the
+        least one: the date when the post was uploaded and its number of comments.
+
+        Parameters
+        ----------
+        post : dict
+            It's the post data whose activity is going to be got.
+
+        Returns
+        -------
+        A tuple with the timestamp of the upload date and the number of comments.
+        """
+        try:
+            taken_at = time.mktime(time.strptime(post['taken_at'], '%d-%m-%Y'))
+        except (KeyError, TypeError, ValueError):
+            taken_at = 0
+        try:
+            n_comments = int(post['comment_count'])
+        except (KeyError, TypeError, ValueError):
+            n_comments = 0
+        return (taken_at, n_comments)
+
+    def iter_levpasha_instagram_posts_comments(self, username, posts, 
+                                               max_comments_per_post=200, max_comments=2000):
         """
         Gets the comments of the users who commented in the posts of a specific
-        user.
+        user page by page. The posts are visited from the most recently active to
+        the least one and the pages of each post are requested with the cursor
+        returned by the LevPasha Instagram API until there are no more comments
+        or a budget is reached.
 
         Parameters
         ----------
@@ -222,6 +357,10 @@ class Api:
         posts : list of dicts.
             It's the list of posts of the user. It'll be used to get the post ids
             in order to get their comments.
+        max_comments_per_post : int, optional
+            It's the maximum number of comments to get from each post. The default is 200.
+        max_comments : int, optional
+            It's the maximum number of comments to get from all the posts. The default is 2000.
 
         Raises
         ------
@@ -231,53 +370,111 @@ class Api:
             If the provided list of posts is not a non-empty list of dicts.
         PostDictNotFound
             If the provided list of posts is not a non-empty list of dicts.
+        InvalidLimit
+            If the provided budgets are not positive integers.
         MaxRequestsExceed
             If the maximum number of requests has been excedeed.
 
-        Returns
-        -------
-        comments : list of dicts.
-            A list of dicts in which each dict which contains the comments of each post.
+        Yields
+        ------
+        A dict for each page of comments whose keys are the post id and the list
+        of comments with the user who wrote each one and the text.
         """
         if (type(username) != str or username == ""):
             raise UsernameNotFound("ERROR. The username should be a non empty string.")
         if (type(posts) != list or len(posts) == 0):
             raise PostListNotFound("ERROR. There aren't any posts to get their comments.")
-        # Check the connection to the API Instagram
-        if (self.connection == None):
-            self.connection = self.connect_levpasha_instagram_api()
-            
-        comments = []
+        # Check each post
         for post in posts:
-            # Check each post
             if (type(post) != dict or len(post) == 0):
                 raise PostDictNotFound("ERROR. Each post should be a non empty dict.")
             if ('id_media' not in post):
                 raise PostDictNotFound("ERROR. Each post should have its id.")
-            
-            # IMPORTANT!
-            ## 20 max comments per post
-            self.connection.getMediaComments(post['id_media'])
-            if (self.connection.LastJson['status'].lower() != 'ok'):    # pragma: no cover
-                raise MaxRequestsExceed("Max requests exceed. Wait to send more.")
-            # Save the user who wrote the comment and the text
-            if ('comments' in self.connection.LastJson):
-                post_comments = self.connection.LastJson['comments']
+        # Check the budgets
+        if (type(max_comments_per_post) != int or max_comments_per_post <= 0 or
+            type(max_comments) != int or max_comments <= 0):
+            raise InvalidLimit("ERROR. The comment limits should be numbers greater than 0.")
+
+        n_comments = 0
+        # Get the comments of the most recently active posts first
+        for post in sorted(posts, key=self.get_post_activity, reverse=True):
+            n_post_comments = 0
+            max_id = ""
+            more_comments = True
+            while (more_comments and n_post_comments < max_comments_per_post and
+                   n_comments < max_comments):
+                response = self.make_request('getMediaComments', post['id_media'], max_id)
+                if (response['status'].lower() != 'ok'):    # pragma: no cover
+                    raise MaxRequestsExceed("Max requests exceed. Wait to send more.")
+                # Save the user who wrote the comment and the text
                 comments_list = []
-                for comm in post_comments:
+                for comm in response.get('comments', []):
                     if (comm['user']['username'] != username):
                         comments_list.append({'user':comm['user']['username'], 'text':comm['text']})
-                
-                """Add the comments of the post"""
-                comments.append({'id_media':post['id_media'], 'texts':comments_list})
-            
-            """Wait some time to avoid flooding the servers."""
-            time.sleep(20)
+                # Keep only the comments which fit in the budgets
+                remaining = min(max_comments_per_post-n_post_comments, max_comments-n_comments)
+                comments_list = comments_list[:remaining]
+                n_post_comments += len(comments_list)
+                n_comments += len(comments_list)
+
+                """Add the page of comments of the post"""
+                yield {'id_media':post['id_media'], 'texts':comments_list}
+
+                # Cursor to the next page of comments
+                max_id = response.get('next_max_id', '')
+                more_comments = response.get('has_more_comments', False) and max_id != ""
+                """Wait some time to avoid flooding the servers."""
+                time.sleep(self.request_delay)
+     
+    def get_levpasha_instagram_posts_comments(self, username, posts, 
+                                              max_comments_per_post=200, max_comments=2000):
+        """
+        Gets the comments of the users who commented in the posts of a specific
+        user. The pages of comments of each post are joined in the same dict.
+
+        Parameters
+        ----------
+        username : str
+            The username of the user to get comments of their posts.
+        posts : list of dicts.
+            It's the list of posts of the user. It'll be used to get the post ids
+            in order to get their comments.
+        max_comments_per_post : int, optional
+            It's the maximum number of comments to get from each post. The default is 200.
+        max_comments : int, optional
+            It's the maximum number of comments to get from all the posts. The default is 2000.
+
+        Raises
+        ------
+        UsernameNotFound
+            If the provided username is not a non-empty string.
+        PostListNotFound
+            If the provided list of posts is not a non-empty list of dicts.
+        PostDictNotFound
+            If the provided list of posts is not a non-empty list of dicts.
+        InvalidLimit
+            If the provided budgets are not positive integers.
+        MaxRequestsExceed
+            If the maximum number of requests has been excedeed.
+
+        Returns
+        -------
+        comments : list of dicts.
+            A list of dicts in which each dict which contains the comments of each post.
+        """
+        comments = []
+        post_comments = {}
+        for page in self.iter_levpasha_instagram_posts_comments(username, posts,
+                                max_comments_per_post, max_comments):
+            if (page['id_media'] not in post_comments):
+                post_comments[page['id_media']] = {'id_media':page['id_media'], 'texts':[]}
+                comments.append(post_comments[page['id_media']])
+            post_comments[page['id_media']]['texts'].extend(page['texts'])
         
         return comments
     
     def get_levpasha_instagram_data(self, search_user, use_session_file=True, 
-                                    session_file="./levpasha_session.txt"):
+                                    session_file="./levpasha_session.txt", include_comments=True):
         """
         Gets Instagram data from a specific user account. In order to do that,
         the previous methods will be used to get data such as:
@@ -297,6 +494,9 @@ class Api:
                 - Loading the connection object to the Instagram API.
                 - Storing the connection made to the Instagram API.
             The default is "./levpasha_session.txt".
+        include_comments : bool, optional
+            If False, the comments of the posts won't be downloaded in order to
+            get them later page by page. The default is True.
 
         Raises
         ------
@@ -320,23 +520,26 @@ class Api:
         if (type(search_user) != str or search_user == ""):
             raise UsernameNotFound("ERROR. The username should be a non empty string.")
             
-        # Connect to LevPasha Instagram API
-        self.connection = self.connect_levpasha_instagram_api(use_session_file, session_file)
+        # Connect to LevPasha Instagram API, unless the requests are shared
+        # between the sessions of a pool or a connection has been already set
+        if (self.session_pool == None and self.connection == None):
+            self.connection = self.connect_levpasha_instagram_api(use_session_file, session_file)
         user_data = {}
         try:
             # Profile
             user_data['profile'] = self.get_levpasha_instagram_profile(search_user)
-            time.sleep(30)
+            time.sleep(self.section_delay)
             print("\nPROFILE\n", user_data['profile'])
             # Posts
             user_data['medias'] = self.get_levpasha_instagram_posts(user_data['profile']['userid'])
-            time.sleep(30)
+            time.sleep(self.section_delay)
             print("\nMEDIAS\n", len(user_data['medias']))
             # Comments of the posts
-            user_data['comments'] = self.get_levpasha_instagram_posts_comments(
-                user_data['profile']['username'], user_data['medias'])
-            time.sleep(30)
-            print("\nCOMMENTS\n",len(user_data['comments'] ))
+            if (include_comments):
+                user_data['comments'] = self.get_levpasha_instagram_posts_comments(
+                    user_data['profile']['username'], user_data['medias'])
+                time.sleep(self.section_delay)
+                print("\nCOMMENTS\n",len(user_data['comments'] ))
         except MaxRequestsExceed:   # pragma: no cover
             raise MaxRequestsExceed("Max requests exceed. Wait to send more.")
         
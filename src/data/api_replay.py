@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Classes to record the responses of the LevPasha Instagram API and replay them
+offline. The recorder stores the LastJson of every request in a directory, and
+the replayer serves them again with a configurable latency, a limit of requests
+per period of time and random errors. In this way, the download and storage of
+the user data could be tested and benchmarked without the Instagram servers.
+
+@author: Lidia Sánchez Mérida
+"""
+import hashlib
+import json
+import os
+import random
+import sys
+sys.path.append("../")
+from exceptions import RecordNotFound, InvalidLimit
+import time
+
+def get_record_filename(record_dir, request, args):
+    """
+    Gets the file in which the response of a specific request is stored. The
+    name of the file is the name of the request followed by a hash of its
+    parameters.
+
+    Parameters
+    ----------
+    record_dir : str
+        It's the directory which contains the recorded responses.
+    request : str
+        It's the name of the LevPasha Instagram API method.
+    args : tuple
+        They're the parameters of the request.
+
+    Returns
+    -------
+    A string with the path of the file.
+    """
+    args_hash = hashlib.sha1(json.dumps([str(arg) for arg in args]).encode("utf-8")).hexdigest()
+    return os.path.join(record_dir, request+"_"+args_hash+".json")
+
+class RecordingInstagramAPI:
+
+    def __init__(self, connection, record_dir):
+        """
+        Creates a RecordingInstagramAPI object which wraps a connection to the
+        LevPasha Instagram API and stores the response of every request. Its
+        attributes are:
+            - The connection to the LevPasha Instagram API.
+            - The directory in which the responses will be stored.
+
+        Parameters
+        ----------
+        connection : InstagramAPI
+            It's the authenticated connection to the LevPasha Instagram API.
+        record_dir : str
+            It's the directory to store the responses.
+
+        Returns
+        -------
+        A RecordingInstagramAPI object.
+        """
+        self.connection = connection
+        self.record_dir = record_dir
+        os.makedirs(record_dir, exist_ok=True)
+
+    def __getattr__(self, name):
+        """
+        Gets an attribute of the wrapped connection. If it's a request, the
+        response will be stored after sending it.
+        """
+        attribute = getattr(self.connection, name)
+        if (not callable(attribute)):
+            return attribute
+
+        def record_request(*args):
+            result = attribute(*args)
+            with open(get_record_filename(self.record_dir, name, args), "w") as record_file:
+                json.dump(self.connection.LastJson, record_file)
+            return result
+        return record_request
+
+class ReplayInstagramAPI:
+
+    def __init__(self, record_dir, latency=0.0, max_requests=0, period=3600,
+                 error_rate=0.0, seed=None):
+        """
+        Creates a ReplayInstagramAPI object which has the same requests as the
+        LevPasha Instagram API but answers them with the recorded responses.
+        Its attributes are:
+            - The directory which contains the recorded responses.
+            - The seconds to wait before answering each request.
+            - The maximum number of requests per period of time. Once it's
+                reached, the requests will fail as if the servers had limited them.
+            - The probability of failing each request.
+            - The response of the last request.
+
+        Parameters
+        ----------
+        record_dir : str
+            It's the directory which contains the recorded responses.
+        latency : float, optional
+            It's the seconds to wait before each response. The default is 0.0.
+        max_requests : int, optional
+            It's the maximum number of requests per period. 0 means no limit.
+            The default is 0.
+        period : int, optional
+            It's the period of time, in seconds, to count the requests. The default is 3600.
+        error_rate : float, optional
+            It's the probability, between 0 and 1, of failing a request. The default is 0.0.
+        seed : int, optional
+            It's the seed to inject the same errors in each execution. The default is None.
+
+        Raises
+        ------
+        InvalidLimit
+            If the provided latency, limits or error rate are not valid.
+
+        Returns
+        -------
+        A ReplayInstagramAPI object.
+        """
+        # Check the provided limits
+        if (type(latency) not in [int, float] or latency < 0):
+            raise InvalidLimit("ERROR. The latency should be a positive number.")
+        if (type(max_requests) != int or max_requests < 0):
+            raise InvalidLimit("ERROR. The maximum number of requests should be a positive number.")
+        if (type(period) != int or period <= 0):
+            raise InvalidLimit("ERROR. The period of time should be a number greater than 0.")
+        if (type(error_rate) not in [int, float] or error_rate < 0 or error_rate > 1):
+            raise InvalidLimit("ERROR. The error rate should be a number between 0 and 1.")
+
+        self.record_dir = record_dir
+        self.latency = latency
+        self.max_requests = max_requests
+        self.period = period
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = []
+        self.LastJson = {}
+
+    def replay(self, request, args):
+        """
+        Answers a request with its recorded response, after waiting the latency.
+        The request will fail if the limit of requests has been reached or
+        randomly according to the error rate.
+
+        Parameters
+        ----------
+        request : str
+            It's the name of the LevPasha Instagram API method.
+        args : tuple
+            They're the parameters of the request.
+
+        Raises
+        ------
+        RecordNotFound
+            If there is not a recorded response for the request.
+
+        Returns
+        -------
+        True if the request has been answered successfully, False if it failed.
+        """
+        time.sleep(self.latency)
+        # Limit of requests
+        now = time.time()
+        self.requests = [req for req in self.requests if req > now-self.period]
+        if (self.max_requests > 0 and len(self.requests) >= self.max_requests):
+            self.LastJson = {"status":"fail", "message":"Please wait a few minutes before you try again."}
+            return False
+        self.requests.append(now)
+        # Random errors
+        if (self.random.random() < self.error_rate):
+            self.LastJson = {"status":"fail", "message":"Injected error."}
+            return False
+
+        filename = get_record_filename(self.record_dir, request, args)
+        if (not os.path.exists(filename)):
+            raise RecordNotFound("ERROR. There is not a recorded response for "+request+str(args))
+        with open(filename, "r") as record_file:
+            self.LastJson = json.load(record_file)
+        return True
+
+    def login(self):
+        """Simulates the authentication to the LevPasha Instagram API."""
+        self.LastJson = {"status":"ok"}
+        return True
+
+    def searchUsername(self, usernameName):
+        """Replays the request to get the profile of a user."""
+        return self.replay("searchUsername", (usernameName,))
+
+    def getUserFeed(self, usernameId, maxid='', minTimestamp=None):
+        """Replays the request to get a page of medias of a user."""
+        return self.replay("getUserFeed", (usernameId, maxid))
+
+    def getMediaComments(self, mediaId, max_id=''):
+        """Replays the request to get a page of comments of a media."""
+        return self.replay("getMediaComments", (mediaId, max_id))
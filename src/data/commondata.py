@@ -311,6 +311,7 @@ class CommonData:
         ----------
         user_data : dict
             It's the dict which contains the user data from any social media.
+            The comments are optional because they could be downloaded later.
         social_media : str
             It's the social media which the user data came from.
 
@@ -322,8 +323,10 @@ class CommonData:
         # Get the user id
         username = profile['username']
         medias = self.preprocess_medias(user_data['medias'], social_media, username)
-        comments = self.preprocess_media_comments(user_data['comments'], social_media, username)
-        data = {'profile':profile, 'media_list':medias, 'media_comments':comments}
+        data = {'profile':profile, 'media_list':medias, 'media_comments':None}
+        # The comments could be downloaded later page by page
+        if ('comments' in user_data):
+            data['media_comments'] = self.preprocess_media_comments(user_data['comments'], social_media, username)
         return data
 
     def clean_texts(self, texts):
@@ -393,9 +396,11 @@ class CommonData:
             - The date which the document was inserted in the Mongo database, in
             order to not insert so much data from one user in the same day.
 
+        A list of user data will be inserted in a single bulk operation.
+
         Parameters
         ----------
-        user_data : dict
+        user_data : dict or list of dicts
             It's the user data from any social media source.
         collection : str
             It's the collection in which the user data is going to be inserted.
@@ -403,7 +408,7 @@ class CommonData:
         Raises
         ------
         UserDataNotFound
-            If the provided user data is not a non-empty dict.
+            If the provided user data is not a non-empty dict or list of dicts.
         CollectionNotFound
             If the provided collection is not a non-empty string.
         InvalidMongoDbObject
@@ -411,8 +416,60 @@ class CommonData:
 
         Returns
         -------
-        A string with the id of the document inserted.
+        If a dict is provided, a string with the id of the document inserted or
         None if the document has not been inserted.
+        If a list is provided, a dict with the number of inserted documents and
+        the number of documents which already existed.
+        """
+        # Check the provided user data
+        if (type(user_data) not in [dict, list] or len(user_data) == 0):
+            raise UserDataNotFound("ERROR. The user data should be a non-empty dict or list of dicts.")
+        if (type(user_data) == list and not all(isinstance(item, dict) for item in user_data)):
+            raise UserDataNotFound("ERROR. The user data should be a non-empty list of dicts.")
+        # Check the provided collection
+        if (collection == "" or type(collection) != str):
+            raise CollectionNotFound("ERROR. The collection name should be a non-empty string.")
+        # Check if the collection exists
+        if (collection not in self.related_collections):
+            raise CollectionNotFound("ERROR. The provided collection does not exist.")
+         # Check the current MongoDB object
+        if (type(self.mongodb) != mongodb.MongoDB):
+                raise InvalidMongoDbObject("ERROR. The connection to the MongoDB database "+
+                                       "should be a MongoDB object.")
+        
+        # Stores user data in the specified collection of a Mongo database.
+        if (type(user_data) == list):
+            return self.mongodb.bulk_upsert(user_data, collection)
+        return self.mongodb.insert_item(user_data, collection)
+
+    def append_user_data(self, user_data, collection, field):
+        """
+        Appends a list of user data from any social media source to the document
+        of the same user, social media source and date of a collection in the
+        Mongo database. In this way, the user data could be stored page by page
+        as soon as they are downloaded.
+
+        Parameters
+        ----------
+        user_data : dict
+            It's the preprocessed user data from any social media source.
+        collection : str
+            It's the collection in which the user data is going to be stored.
+        field : str
+            It's the field of the document which contains the list of user data.
+
+        Raises
+        ------
+        UserDataNotFound
+            If the provided user data is not a non-empty dict.
+        CollectionNotFound
+            If the provided collection is not a non-empty string.
+        InvalidMongoDbObject
+            If the MongoDB object does not contain the connection to the Mongo database.
+
+        Returns
+        -------
+        The number of stored items.
         """
         # Check the provided user data
         if (type(user_data) != dict or len(user_data) == 0):
@@ -428,10 +485,8 @@ class CommonData:
                 raise InvalidMongoDbObject("ERROR. The connection to the MongoDB database "+
                                        "should be a MongoDB object.")
         
-        # Set the collection to insert the user data
-        self.mongodb.set_collection(collection)
-        # Stores user data in the specified collection of a Mongo database.
-        return self.mongodb.insert_item(user_data)
+        # Store the user data in the specified collection
+        return self.mongodb.append_items(user_data, field, collection)
 
     def get_user_data(self, collection, query, values={}):
         """
@@ -464,6 +519,45 @@ class CommonData:
         -------
         A dict which contains the matched records as dicts too.
         """
+        return list(self.iter_user_data(collection, query, values))
+
+    def iter_user_data(self, collection, query, values={}, fields=None, batch_size=100):
+        """
+        Gets the matched records from a specific collection and related to a
+        specific query one by one, in order to not load all of them in memory.
+
+        Parameters
+        ----------
+        collection : str
+            It's the collection in which the query will be made and the data will
+            be recovered.
+        query : str
+            It's the query to make in order to get the matched records.
+        values : dict, optional
+            They're the parameters to add to the query in order to filter the
+            data to recover. The default is {}.
+        fields : list of str, optional
+            They're the fields of the records to get. The default is None, which
+            means all the fields.
+        batch_size : int, optional
+            It's the number of records to get in each round trip to the database.
+            The default is 100.
+
+        Raises
+        ------
+        CollectionNotFound
+            If the provided collection is not a non-empty string.
+        InvalidQuery
+            If the provided query is not a non-empty string or does not exist.
+        InvalidQueryValues
+            If the provided values are not in a dict.
+        InvalidMongoDbObject
+            If the MongoDB object does not contain the connection to the Mongo database.
+
+        Returns
+        -------
+        A generator of the matched records as dicts.
+        """
         # Check the MongoDB object
         if (type(self.mongodb) != mongodb.MongoDB):
             raise InvalidMongoDbObject("ERROR. The connection to the MongoDB database "+
@@ -484,6 +578,5 @@ class CommonData:
         if (type(values) != dict):
             raise InvalidQueryValues("ERROR. The values should be a dict.")
         
-        # Set the collection
-        self.mongodb.set_collection(collection)
-        return self.mongodb.get_records(query, values)
+        # Get the records of the specified collection
+        return self.mongodb.iter_records(query, values, fields, batch_size, collection=collection)
@@ -40,6 +40,8 @@ class DataAnalyzer:
             - The list of colours to draw the plots.
             - The default path to store the differents plots.
             - The list of avalaible analysis.
+            - The sentiment analyzers, which will be loaded the first time they're
+                required in order to analyse the texts in several batches.
 
         Returns
         -------
@@ -58,6 +60,20 @@ class DataAnalyzer:
            "test_media_evolution", "test_media_popularity",
            "test_comment_sentiment_analysis", "test_title_sentiment_analysis", 
            "test_user_behaviours"]
+        self.sentiment_analyzers = None
+    
+    def get_sentiment_analyzers(self):
+        """
+        Gets the pre-trained model and the VADER lexicon to identify the
+        sentiments of the texts. They're loaded only once.
+
+        Returns
+        -------
+        A tuple with the pre-trained model and the VADER analyzer.
+        """
+        if (self.sentiment_analyzers == None):
+            self.sentiment_analyzers = (TextClassifier.load('sentiment'), SentimentIntensityAnalyzer())
+        return self.sentiment_analyzers
     
     def get_values_per_one_week(self, values, keys):
         """
@@ -298,10 +314,11 @@ class DataAnalyzer:
         # Get the dates without duplicates
         dates = list(set([item[0] for item in post_interactions]))
         dates.sort()
-        # Compute an average of the number of comments and likes per day
+        # Compute an average of the number of comments and likes per day. The
+        # interactions could be the unrounded daily averages of the posts.
         for date in dates:
-            likes = [int(item[1]) for item in post_interactions if item[0] == date]
-            comments = [int(item[2]) for item in post_interactions if item[0] == date]
+            likes = [float(item[1]) for item in post_interactions if item[0] == date]
+            comments = [float(item[2]) for item in post_interactions if item[0] == date]
             mean_post_interactions.append((date, round(sum(likes)/len(likes)), round(sum(comments)/len(comments))))
         
         # Get the values per one week
@@ -404,10 +421,8 @@ class DataAnalyzer:
         if (type(text_data) != list or len(text_data) == 0):
             raise TextDataNotFound("ERROR. The preprocessed texts to analyze should be a non-empty list of tuples.")
 
-        # For pre-trained models 
-        flair_analyzer = TextClassifier.load('sentiment')
-        # For VADER lexicon
-        vader_analyzer = SentimentIntensityAnalyzer()
+        # Pre-trained model and VADER lexicon
+        flair_analyzer, vader_analyzer = self.get_sentiment_analyzers()
         
         # Perform the sentiment analysis
         text_analysis_results = []
@@ -475,8 +490,37 @@ class DataAnalyzer:
             not all(isinstance(item, dict) for item in user_list)):
             raise SentimentNotFound("ERROR. The users to analyze should be in a non-empty list of dicts.")
         
+        return self.get_user_behaviours(username, self.count_user_sentiments(user_list))
+
+    def count_user_sentiments(self, user_list, user_patterns=None):
+        """
+        Counts the number of different sentiments of each author per date. The
+        counts could be updated with several lists of sentiments, such as the
+        batches of comments read from the Postgres database, so only the counts
+        are kept in memory.
+
+        Parameters
+        ----------
+        user_list : list of dicts
+            It's the list of users with their identified sentiment for each date
+            of downloaded data.
+        user_patterns : dict, optional
+            It's the dict of counts to update. The default is None, which
+            means new counts.
+
+        Raises
+        ------
+        SentimentNotFound
+            If some of the provided sentiments have not got a date, an author or
+            a sentiment.
+
+        Returns
+        -------
+        A dict with the number of each sentiment per date and author.
+        """
+        if (user_patterns == None):
+            user_patterns = {}
         # Count the number of different sentiments for each date without duplicates
-        user_patterns = {}
         for item in user_list:
             if ("date" not in item or "author" not in item or "sentiment" not in item):
                 raise SentimentNotFound("ERROR. Each item should be the three keys: 'date', 'author' and 'sentiment'.")
@@ -490,6 +534,38 @@ class DataAnalyzer:
             # Add the identified sentiment
             if (item["sentiment"] != "none"):
                 user_patterns[item["date"]][item["author"]][item["sentiment"]] += 1
+        return user_patterns
+
+    def get_user_behaviours(self, username, user_patterns):
+        """
+        Computes the evolution of the number of haters and friends from the
+        number of sentiments of each author per date. If it's more than 7 days,
+        the method will calculate the average of likers and haters per week.
+
+        Parameters
+        ----------
+        username : str
+            It's the username of the studied user.
+        user_patterns : dict
+            It's the number of each sentiment per date and author.
+
+        Raises
+        ------
+        UsernameNotFound
+            If the provided username is not a non-empty string.
+        SentimentNotFound
+            If the provided counts are not a non-empty dict.
+
+        Returns
+        -------
+        A dict with the UserBehaviours analysis results per date.
+        """
+        # Check the provided username
+        if (type(username) != str or username == ""):
+            raise UsernameNotFound("ERROR. The username should be a non-empty string.")
+        # Check the provided counts of sentiments
+        if (type(user_patterns) != dict or len(user_patterns) == 0):
+            raise SentimentNotFound("ERROR. The users to analyze should be in a non-empty dict.")
         
         # Get the number of likers and haters per date without duplicates
         behaviour_summary = []
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class which contains a pool of authenticated sessions to the LevPasha Instagram
+API. Each session has its own budget of requests per period of time, so the
+requests will be assigned to the session with the most remaining requests.
+The sessions which reach the limit of requests will be quarantined and
+authenticated again in background.
+
+@author: Lidia Sánchez Mérida
+"""
+import os
+import sys
+sys.path.append("../")
+from exceptions import InvalidCredentials, MaxRequestsExceed, InvalidLimit
+from InstagramAPI import InstagramAPI
+import threading
+import time
+
+class SessionPool:
+
+    def __init__(self, max_requests=150, period=3600, quarantine_time=1800):
+        """
+        Creates a SessionPool object whose attributes are:
+            - The maximum number of requests per session during a period of time.
+            - The period of time, in seconds, to count the requests of each session.
+            - The time, in seconds, that a session will be quarantined if it
+                reaches the limit of requests.
+            - The authenticated sessions as well as their requests and state.
+            - A lock to share the pool between several threads.
+
+        Parameters
+        ----------
+        max_requests : int, optional
+            It's the maximum number of requests per session. The default is 150.
+        period : int, optional
+            It's the period of time to count the requests. The default is 3600.
+        quarantine_time : int, optional
+            It's the time to wait before using a limited session again. The default is 1800.
+
+        Raises
+        ------
+        InvalidLimit
+            If the provided limits are not positive integers.
+
+        Returns
+        -------
+        A SessionPool object.
+        """
+        # Check the provided limits
+        if (type(max_requests) != int or max_requests <= 0):
+            raise InvalidLimit("ERROR. The maximum number of requests should be a number greater than 0.")
+        if (type(period) != int or period <= 0):
+            raise InvalidLimit("ERROR. The period of time should be a number greater than 0.")
+        if (type(quarantine_time) != int or quarantine_time < 0):
+            raise InvalidLimit("ERROR. The quarantine time should be a positive number.")
+
+        self.max_requests = max_requests
+        self.period = period
+        self.quarantine_time = quarantine_time
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def get_env_credentials(self):
+        """
+        Gets the Instagram credentials stored as env variables. The first account
+        is stored in INSTAGRAM_USER and INSTAGRAM_PSWD, and the next ones in
+        INSTAGRAM_USER2 and INSTAGRAM_PSWD2, INSTAGRAM_USER3 and INSTAGRAM_PSWD3, etc.
+
+        Returns
+        -------
+        A list of tuples with the username and password of each account.
+        """
+        credentials = []
+        suffix = ""
+        index = 1
+        while (os.environ.get("INSTAGRAM_USER"+suffix) != None):
+            username = os.environ.get("INSTAGRAM_USER"+suffix)
+            pswd = os.environ.get("INSTAGRAM_PSWD"+suffix)
+            if (username != "" and type(pswd) == str and pswd != ""):
+                credentials.append((username, pswd))
+            index += 1
+            suffix = str(index)
+
+        return credentials
+
+    def login(self, username, pswd):
+        """
+        Makes a new connection to the LevPasha Instagram API with the provided
+        credentials.
+
+        Parameters
+        ----------
+        username : str
+            It's the username of the Instagram account.
+        pswd : str
+            It's the password of the Instagram account.
+
+        Raises
+        ------
+        InvalidCredentials
+            If the credentials are not non-empty strings or are wrong.
+
+        Returns
+        -------
+        The connection made to the LevPasha Instagram API.
+        """
+        if (type(username) != str or type(pswd) != str or username == "" or pswd == ""):
+            raise InvalidCredentials("Username and/or password are not right.")
+
+        connection = InstagramAPI(username, pswd)
+        connection.login()
+        if (connection.LastJson['status'] != 'ok'):
+            raise InvalidCredentials("Invalid Instagram credentials.")
+
+        return connection
+
+    def add_session(self, username, pswd):
+        """
+        Authenticates an Instagram account and adds the session to the pool.
+
+        Parameters
+        ----------
+        username : str
+            It's the username of the Instagram account.
+        pswd : str
+            It's the password of the Instagram account.
+
+        Raises
+        ------
+        InvalidCredentials
+            If the credentials are not non-empty strings or are wrong.
+
+        Returns
+        -------
+        The number of sessions in the pool.
+        """
+        connection = self.login(username, pswd)
+        with self.lock:
+            self.sessions[username] = {"connection":connection, "pswd":pswd,
+                                       "requests":[], "quarantined_until":0}
+            return len(self.sessions)
+
+    def load_sessions(self):
+        """
+        Authenticates every Instagram account stored as env variables and adds
+        them to the pool. The accounts whose credentials are wrong will be skipped.
+
+        Raises
+        ------
+        InvalidCredentials
+            If none of the accounts could be authenticated.
+
+        Returns
+        -------
+        The number of sessions in the pool.
+        """
+        for username, pswd in self.get_env_credentials():
+            try:
+                self.add_session(username, pswd)
+            except InvalidCredentials: # pragma no cover
+                continue
+
+        if (len(self.sessions) == 0):
+            raise InvalidCredentials("ERROR. There aren't any valid Instagram credentials.")
+        return len(self.sessions)
+
+    def remaining_requests(self, username):
+        """
+        Gets the number of requests that a session could still make during the
+        current period of time. The quarantined sessions have not any requests.
+
+        Parameters
+        ----------
+        username : str
+            It's the username of the session.
+
+        Returns
+        -------
+        An integer with the number of remaining requests.
+        """
+        session = self.sessions[username]
+        now = time.time()
+        if (session["quarantined_until"] > now):
+            return 0
+        # Forget the requests made before the current period of time
+        session["requests"] = [req for req in session["requests"] if req > now-self.period]
+        return self.max_requests - len(session["requests"])
+
+    def acquire(self):
+        """
+        Assigns the next request to the session with the most remaining requests
+        and counts it.
+
+        Raises
+        ------
+        MaxRequestsExceed
+            If all the sessions are quarantined or have reached their limit.
+
+        Returns
+        -------
+        A tuple with the username of the session and its connection to the
+        LevPasha Instagram API.
+        """
+        with self.lock:
+            best_session = None
+            best_remaining = 0
+            for username in self.sessions:
+                remaining = self.remaining_requests(username)
+                if (remaining > best_remaining):
+                    best_session = username
+                    best_remaining = remaining
+
+            if (best_session == None):
+                raise MaxRequestsExceed("Max requests exceed in every session. Wait to send more.")
+
+            self.sessions[best_session]["requests"].append(time.time())
+            return best_session, self.sessions[best_session]["connection"]
+
+    def quarantine(self, username):
+        """
+        Quarantines a session which has reached the limit of requests and
+        authenticates it again in background once the quarantine time is over.
+
+        Parameters
+        ----------
+        username : str
+            It's the username of the session to quarantine.
+
+        Returns
+        -------
+        The timer which will authenticate the session again.
+        """
+        with self.lock:
+            self.sessions[username]["quarantined_until"] = time.time() + self.quarantine_time
+
+        timer = threading.Timer(self.quarantine_time, self.reauthenticate, [username])
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def reauthenticate(self, username):
+        """
+        Authenticates a quarantined session again. If it fails, the session will
+        remain quarantined for another period.
+
+        Parameters
+        ----------
+        username : str
+            It's the username of the session to authenticate.
+
+        Returns
+        -------
+        True if the session could be authenticated, False if it couldn't.
+        """
+        with self.lock:
+            pswd = self.sessions[username]["pswd"]
+        try:
+            connection = self.login(username, pswd)
+        except Exception: # pragma no cover
+            self.quarantine(username)
+            return False
+
+        with self.lock:
+            self.sessions[username]["connection"] = connection
+            self.sessions[username]["requests"] = []
+            self.sessions[username]["quarantined_until"] = 0
+        return True
@@ -46,6 +46,12 @@ class ProfileDictNotFound(Exception):
     """Class exception to point out that there's not profile."""
     def __init__(self, mensaje):
         self.mensaje = mensaje
+
+class RecordNotFound(Exception):
+    """Class exception to point out that there is not a recorded response of
+        the API for the provided request."""
+    def __init__(self, mensaje):
+        self.mensaje = mensaje
         
 ############################## CLASS COMMONDATA ###############################
 class ValuesNotFound(Exception):
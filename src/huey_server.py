@@ -1,15 +1,162 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-File which includes the automatic and periodic tasks to download data of a specific
-user and from a particular social media source.
+File which includes the automatic and periodic tasks to download data of the
+tracked users from their social media sources. A periodic task reads the registry
+of tracked users and enqueues one download task per user whose data are older
+than their freshness period, sorted by priority and spread over time with a
+random delay. Each worker keeps its own connections to the databases.
+
+The number of workers is set when the consumer is launched (see run_huey.sh).
 
 @author: Lidia Sánchez Mérida
 """
+import os
+import random
+import threading
 from huey import SqliteHuey, crontab
 huey = SqliteHuey(filename='/tmp/huey_sqlite.db')
 
 from main_ops import MainOperations
+from session_pool import SessionPool
+
+# Minutes between two executions of the scheduler
+SCHEDULER_MINUTES = os.environ.get("CRAWL_SCHEDULER_MINUTES", "15")
+# Maximum random delay, in seconds, to spread the downloads of the same batch
+MAX_JITTER = int(os.environ.get("CRAWL_MAX_JITTER", "600"))
+# Maximum number of users to enqueue in each execution of the scheduler
+MAX_USERS = int(os.environ.get("CRAWL_MAX_USERS", "100"))
+# Hours after which an enqueued download which never finished is enqueued again
+ENQUEUE_TIMEOUT = int(os.environ.get("CRAWL_ENQUEUE_TIMEOUT", "6"))
+# Months after the current one with their own partition of posts and comments
+PARTITION_MONTHS_AHEAD = int(os.environ.get("POSTGRES_PARTITION_MONTHS_AHEAD", "3"))
+# Months of posts and comments to keep attached. All of them by default.
+RETENTION_MONTHS = os.environ.get("POSTGRES_RETENTION_MONTHS")
+
+# Long-lived objects of each worker
+worker_resources = threading.local()
+# Pool of Instagram sessions shared by the workers of the process
+session_pool_lock = threading.Lock()
+session_pool = None
+
+@huey.on_startup()
+def open_worker_resources():
+    """
+    Function to create the MainOperations object of each worker, with its
+    connections to the Mongo and Postgres databases, when the worker starts.
+    """
+    worker_resources.mainops = MainOperations()
+
+def get_worker_mainops():
+    """
+    Function to get the MainOperations object of the current worker. It will
+    be created if the worker has not got one yet.
+    """
+    if (getattr(worker_resources, "mainops", None) == None):
+        open_worker_resources()
+    return worker_resources.mainops
+
+def get_session_pool():
+    """
+    Function to get the pool of Instagram sessions shared by the workers. It
+    will be created, authenticating every avalaible Instagram account, the
+    first time it's required.
+    """
+    global session_pool
+    with session_pool_lock:
+        if (session_pool == None):
+            new_pool = SessionPool()
+            new_pool.load_sessions()
+            session_pool = new_pool
+    return session_pool
+
+@huey.periodic_task(crontab(minute='*/'+SCHEDULER_MINUTES))
+def schedule_user_crawls(mode="real"):
+    """
+    Function to enqueue the download of the data of every tracked user whose
+    data are older than their freshness period. The users with the highest
+    priorities are enqueued first and every download is delayed a random
+    number of seconds in order to not send all the requests at the same time.
+    """
+    mainops_object = get_worker_mainops()
+    due_users_query = "test_get_due_tracked_users" if mode == "test" else "get_due_tracked_users"
+    enqueued_query = "update_test_tracked_user_enqueued" if mode == "test" else "update_tracked_user_enqueued"
+    due_users = mainops_object.postgresdb_object.get_data(due_users_query,
+                    {"enqueue_timeout":ENQUEUE_TIMEOUT, "n_users":MAX_USERS})
+
+    enqueued_users = []
+    for username, social_media, priority in due_users:
+        crawl_user.schedule((username, social_media, mode),
+                            delay=random.randint(0, MAX_JITTER), priority=priority)
+        mainops_object.postgresdb_object.update_data(enqueued_query,
+                    {"username":username, "social_media":social_media})
+        enqueued_users.append(username)
+
+    return enqueued_users
+
+def mark_metric_views(mode):
+    """
+    Function to note that a download has copied new data of the daily metrics
+    to the Postgres database, so the materialized views will be refreshed.
+    """
+    huey.put("stale_metric_views_"+mode, True)
+
+@huey.task(retries=1, retry_delay=1800)
+def crawl_user(username, social_media, mode="real"):
+    """
+    Function to download the data of a specific tracked user from their social
+    media source, using the long-lived objects of the current worker. If the
+    analyses are performed from the daily metrics, the downloaded data are
+    copied to the Postgres database and the materialized views will be
+    refreshed once for the whole batch of downloads.
+    """
+    mainops_object = get_worker_mainops()
+    if (social_media.lower() == "instagram"):
+        mainops_object.get_user_instagram_common_data(username, mode, get_session_pool())
+        if (mainops_object.metric_views):
+            mark_metric_views(mode)
+
+    crawl_query = "update_test_tracked_user_crawl" if mode == "test" else "update_tracked_user_crawl"
+    mainops_object.postgresdb_object.update_data(crawl_query,
+                {"username":username, "social_media":social_media})
+    return username
+
+@huey.periodic_task(crontab(minute='*/'+SCHEDULER_MINUTES))
+def refresh_metric_views(mode="real"):
+    """
+    Function to refresh the materialized views of the daily metrics once for
+    all the downloads made since the last refresh, instead of recomputing them
+    after each download. They're not refreshed if there aren't new data.
+    """
+    # Check if some download has copied new data. The mark is removed.
+    if (huey.get("stale_metric_views_"+mode) == None):
+        return []
+    mainops_object = get_worker_mainops()
+    return mainops_object.postgresdb_object.refresh_views(mode)
+
+@huey.task()
+def precompute_analysis(username, analysis, social_media, date_ini, date_fin):
+    """
+    Function to perform an analysis of a specific user in advance, using the
+    long-lived objects of the current worker, so its results are already stored
+    when they are requested from the platform. It's enqueued by the watcher of
+    the Mongo collections (see change_watcher.py).
+    """
+    mainops_object = get_worker_mainops()
+    mainops_object.perform_analysis(username, analysis, social_media, date_ini, date_fin)
+    return analysis
+
+@huey.periodic_task(crontab(minute='0', hour='3'))
+def maintain_partitions(mode="real"):
+    """
+    Function to create the monthly partitions of the posts and comments of the
+    next months every day at 3 o'clock. If there is a retention period, the
+    partitions older than it are detached in order to archive them.
+    """
+    mainops_object = get_worker_mainops()
+    retention_months = int(RETENTION_MONTHS) if RETENTION_MONTHS != None else None
+    return mainops_object.postgresdb_object.maintain_partitions(mode, PARTITION_MONTHS_AHEAD,
+                                                                retention_months)
 
 @huey.periodic_task(crontab(day='*/1', hour='19'))
 def get_user_data():
@@ -17,10 +164,12 @@ def get_user_data():
     Function to download the data of a specific user from the selected social media
     source every day at 7 o'clock.
     """
-    mainops_object = MainOperations()
+    mainops_object = get_worker_mainops()
     collected_data = {}
-    if (mainops_object.social_media_source.lower() == "instagram"):
+    if (mainops_object.user_to_study != None and
+        mainops_object.social_media_source.lower() == "instagram"):
         collected_data = mainops_object.get_user_instagram_common_data(mainops_object.user_to_study, "real")
+        if (mainops_object.metric_views):
+            mark_metric_views("real")
 
     return collected_data
-
@@ -6,6 +6,8 @@ Class which contains the main operations which can be done on the web platform.
 @author: Lidia Sánchez Mérida
 """
 from datetime import datetime
+import itertools
+import os
 import sys
 sys.path.append('src/data')
 sys.path.append('data')
@@ -17,7 +19,8 @@ from mongodb import MongoDB
 from postgredb import PostgreDB
 from exceptions import UsernameNotFound, MaxRequestsExceed, UserDataNotFound \
    , InvalidMongoDbObject, InvalidSocialMediaSource, InvalidMode, InvalidAnalysis \
-    , InvalidDates, CollectionNotFound, InvalidQuery
+    , InvalidDates, CollectionNotFound, InvalidQuery, ProfilesNotFound, UserActivityNotFound \
+    , TextDataNotFound
 
 class MainOperations:
 
@@ -32,6 +35,19 @@ class MainOperations:
             - A DataAnalyzer object to perform the different analysis.
             - The list of avalaible analysis.
             - The user to download their data as well as the social media source.
+            - The maximum number of comments to download and analyze.
+            - The maximum number of downloaded items to keep in memory before
+                storing them in the Mongo database.
+            - The maximum number of records inserted in the Postgres database
+                in each batch.
+            - The maximum number of records read from the Postgres database
+                in each batch to perform the analyses.
+            - If the profile analyses are computed in the Mongo database
+                (ANALYSIS_PUSHDOWN env variable).
+            - If the profile analyses and the Medias Evolution analysis are
+                performed from the materialized views of the daily metrics
+                (ANALYSIS_METRIC_VIEWS env variable), which are refreshed after
+                each download.
 
         Raises
         ------
@@ -101,6 +117,16 @@ class MainOperations:
             "comment_sentiment_analysis":"get_media_comments",
             "title_sentiment_analysis":"get_media_titles",
         }
+        # Postgre select queries to get the daily metrics of the materialized views
+        self.analysis_view_select_queries = {
+            "test_profile_evolution":"test_get_profiles_daily",
+            "test_profile_activity":"test_get_nmedias_profiles_daily",
+            "test_media_evolution":"test_get_medias_daily",
+
+            "profile_evolution":"get_profiles_daily",
+            "profile_activity":"get_nmedias_profiles_daily",
+            "media_evolution":"get_medias_daily",
+        }
         # Postgre insert queries to add the analysis results
         self.analysis_results_insert_queries = {
             "test_profile_evolution":"insert_test_profile_evolution",
@@ -127,6 +153,23 @@ class MainOperations:
         # User to collect data and social media source
         self.user_to_study = None
         self.social_media_source = 'Instagram'
+        # Maximum number of comments to download per media and per user
+        self.max_comments_per_post = 200
+        self.max_comments = 2000
+        # Maximum number of comments per media to insert in the Postgres database.
+        # None means all the downloaded comments.
+        self.max_comments_per_media = None
+        # Maximum number of medias or comments buffered before storing them
+        self.stream_buffer_size = 50
+        # Maximum number of records inserted in the Postgres database in each batch
+        self.postgres_batch_size = 500
+        # Maximum number of records read from the Postgres database in each batch
+        self.postgres_read_batch_size = 1000
+        # Compute the profile analyses with aggregations in the Mongo database
+        # instead of copying the profiles to the Postgres database
+        self.analysis_pushdown = os.environ.get("ANALYSIS_PUSHDOWN", "false").lower() == "true"
+        # Perform the analyses from the daily metrics of the users
+        self.metric_views = os.environ.get("ANALYSIS_METRIC_VIEWS", "false").lower() == "true"
     
     def set_user_to_study(self, user):
         """
@@ -153,7 +196,61 @@ class MainOperations:
         self.user_to_study = user 
         return self.user_to_study
 
-    def get_user_instagram_common_data(self, search_user, mode):
+    def track_user(self, username, social_media, mode, priority=0, freshness_hours=24):
+        """
+        Adds a user to the registry of tracked users in order to download their
+        data periodically by the task server. If the user is already tracked,
+        they won't be inserted again.
+
+        Parameters
+        ----------
+        username : str
+            It's the username of the user to track.
+        social_media : str
+            It's the social media source which the user data will be downloaded.
+        mode : str
+            It's the mode in which the user will be tracked: 'test' or 'real'.
+        priority : int, optional
+            It's the priority of the user to download their data. The users
+            with the highest priorities will be downloaded first. The default is 0.
+        freshness_hours : int, optional
+            It's the number of hours after which the user data should be downloaded
+            again. The default is 24.
+
+        Raises
+        ------
+        UsernameNotFound
+            If the provided username is not a non-empty string.
+        InvalidSocialMediaSource
+            If the provided social media source is not a non-empty string or does
+            not exist.
+        InvalidMode
+            If the provided mode is not 'test' or 'real'.
+
+        Returns
+        -------
+        A list with the id of the new tracked user, or an empty list if they're
+        already tracked.
+        """
+        # Check the provided username
+        if (type(username) != str or username == ""):
+            raise UsernameNotFound("ERROR. The username should be a non-empty string.")
+        # Check the provided social media source
+        if (type(social_media) != str or social_media == ""):
+            raise InvalidSocialMediaSource("ERROR. The social media source should be a non-empty string.")
+        if (social_media.lower() not in self.common_data_object.social_media_sources):
+            raise InvalidSocialMediaSource("ERROR. The provided social media is wrong.")
+        # Check the provided mode
+        if (mode != "test" and mode != "real"):
+            raise InvalidMode("ERROR. The mode should be 'test' or 'real.")
+
+        insert_query = "insert_test_tracked_user" if mode == "test" else "insert_tracked_user"
+        new_user = {"freshness_hours":freshness_hours, "priority":priority,
+                    "social_media":social_media, "username":username}
+        check_values = {"username":username, "social_media":social_media}
+        return self.postgresdb_object.insert_data(insert_query, [new_user], [check_values])
+
+    def get_user_instagram_common_data(self, search_user, mode, session_pool=None):
         """
         Gets common Instagram data of a specific user using the LevPasha Instagram
         API. The downloaded user data is stored in the Mongo database.
@@ -164,6 +261,9 @@ class MainOperations:
             It's the username of the user to get their data.
         mode : str
             It's the mode in which the user data will be stored in the Mongo database.
+        session_pool : SessionPool, optional
+            It's the pool of sessions to share the requests between several
+            Instagram accounts. The default is None.
 
         Raises
         ------
@@ -185,26 +285,179 @@ class MainOperations:
         # Check the provided mode
         if (mode != "test" and mode != "real"):
             raise InvalidMode("ERROR. The mode should be 'test' or 'real.")
-        try:
-            # Connect to the Levpasha Instagram API
-            inst_api = Api()
-            inst_api.connect_levpasha_instagram_api()
-            # Download Instagram user data
-            user_instagram_data = inst_api.get_levpasha_instagram_data(search_user)
-            # Preprocess and store user data
-            user_data = self.preprocess_and_store_common_data(user_instagram_data, "Instagram", mode)
-            return user_data
-        except MaxRequestsExceed:   # pragma: no cover
-            # Try to connect again to the Instagram LevPasha API using the credentials
-            # instead of the session file in order to avoid logout exceptions
+        # Share the requests between the sessions of the pool
+        if (session_pool != None):
+            user_data = self.download_and_store_instagram_data(Api(session_pool), search_user, mode)
+        else:
             try:
+                # Connect to the Levpasha Instagram API
                 inst_api = Api()
-                inst_api.connect_levpasha_instagram_api(use_session_file=False)
-                user_instagram_data = inst_api.get_levpasha_instagram_data(search_user)
-                user_data = self.preprocess_and_store_common_data(user_instagram_data, "Instagram", mode)
-                return user_data
+                inst_api.connect_levpasha_instagram_api()
+                # Download, preprocess and store user data
+                user_data = self.download_and_store_instagram_data(inst_api, search_user, mode)
             except MaxRequestsExceed:   # pragma: no cover
-                raise MaxRequestsExceed("Max requests exceed. Wait to send more.")
+                # Try to connect again to the Instagram LevPasha API using the credentials
+                # instead of the session file in order to avoid logout exceptions
+                try:
+                    inst_api = Api()
+                    inst_api.connect_levpasha_instagram_api(use_session_file=False)
+                    user_data = self.download_and_store_instagram_data(inst_api, search_user, mode)
+                except MaxRequestsExceed:   # pragma: no cover
+                    raise MaxRequestsExceed("Max requests exceed. Wait to send more.")
+        # Copy the downloaded data of the daily metrics to the Postgres database.
+        # The views are refreshed once after each batch of downloads (see huey_server.py).
+        if (self.metric_views):
+            today = datetime.now().strftime("%d-%m-%Y")
+            self.update_metric_views(search_user, "Instagram", mode, today, today, refresh=False)
+        return user_data
+
+    def download_and_store_instagram_data(self, inst_api, search_user, mode):
+        """
+        Downloads the Instagram data of a specific user using the provided API
+        object and stores them as soon as they are downloaded. The profile is
+        stored first. Then, the medias and their comments are downloaded page by
+        page, preprocessed and stored in bulk every time the buffer is full, so
+        neither the whole crawl is kept in memory nor lost if it fails.
+
+        Parameters
+        ----------
+        inst_api : Api
+            It's the API object to download the Instagram data.
+        search_user : str
+            It's the username of the user to get their data.
+        mode : str
+            It's the mode in which the user data will be stored in the Mongo database.
+
+        Raises
+        ------
+        InvalidMode
+            If the provided mode is not 'test' or 'real'.
+        MaxRequestsExceed
+            If the maximum number of requests of the LevPasha Instagram API
+            has been exceeded.
+
+        Returns
+        -------
+        A dict with the stored profile as well as the number of stored medias
+        and comments.
+        """
+        # Check the provided mode
+        if (mode != "test" and mode != "real"):
+            raise InvalidMode("ERROR. The mode should be 'test' or 'real.")
+
+        # Download, preprocess and store the profile
+        profile = inst_api.get_levpasha_instagram_profile(search_user)
+        user_id = profile['userid']
+        profile = self.common_data_object.preprocess_profile(profile, "Instagram")
+        self.common_data_object.insert_user_data(profile, self.mongo_collections[mode]['profiles'])
+        username = profile['username']
+        # Download, preprocess and store the medias page by page keeping only
+        # the fields required to download their comments
+        medias = []
+        def media_pages():
+            for page in inst_api.iter_levpasha_instagram_posts(user_id):
+                medias.extend([{'id_media':media['id_media'], 'taken_at':media['taken_at'],
+                                'comment_count':media['comment_count']} for media in page])
+                yield page
+        n_medias = self.store_user_data_pages(media_pages(), 'medias', "Instagram", username, mode)
+        # Download, preprocess and store the comments page by page
+        n_comments = 0
+        if (len(medias) > 0):
+            comment_pages = inst_api.iter_levpasha_instagram_posts_comments(username,
+                                medias, self.max_comments_per_post, self.max_comments)
+            n_comments = self.store_user_data_pages(([page] for page in comment_pages),
+                                'comments', "Instagram", username, mode)
+
+        return {'profile':profile, 'media':n_medias, 'comments':n_comments}
+
+    def store_user_data_pages(self, pages, field, social_media, username, mode):
+        """
+        Preprocesses and stores the medias or comments of a specific user as
+        soon as they are downloaded. The items are kept in a bounded buffer and
+        stored in bulk in the document of the same date of the Mongo database
+        every time the buffer is full.
+
+        Parameters
+        ----------
+        pages : iterable of lists
+            It's the pages of items to store. Each page is a list of medias or
+            a list of dicts with the media id and its comments.
+        field : str
+            It's the type of user data to store. Options are 'medias' or 'comments'.
+        social_media : str
+            It's the social media which the user data came from.
+        username : str
+            It's the username of the user who owns the medias.
+        mode : str
+            It's the mode in which the user data will be stored in the Mongo database.
+
+        Raises
+        ------
+        InvalidMode
+            If the provided mode is not 'test' or 'real'.
+        UserDataNotFound
+            If the provided type of user data is not 'medias' or 'comments'.
+
+        Returns
+        -------
+        The number of stored medias or comments.
+        """
+        # Check the provided mode
+        if (mode != "test" and mode != "real"):
+            raise InvalidMode("ERROR. The mode should be 'test' or 'real.")
+        # Check the provided type of user data
+        if (field != "medias" and field != "comments"):
+            raise UserDataNotFound("ERROR. The user data to store should be 'medias' or 'comments'.")
+
+        n_items = 0
+        buffer = []
+        buffer_size = 0
+        for page in pages:
+            buffer.extend(page)
+            # The size of the comments is the number of texts
+            buffer_size += len(page) if field == "medias" else sum(len(item['texts']) for item in page)
+            if (buffer_size >= self.stream_buffer_size):
+                n_items += self.store_user_data_buffer(buffer, field, social_media, username, mode)
+                buffer = []
+                buffer_size = 0
+        # Store the remaining items
+        if (len(buffer) > 0):
+            n_items += self.store_user_data_buffer(buffer, field, social_media, username, mode)
+
+        return n_items
+
+    def store_user_data_buffer(self, buffer, field, social_media, username, mode):
+        """
+        Preprocesses a buffer of medias or comments of a specific user and
+        appends them to the document of the same date of the Mongo database.
+
+        Parameters
+        ----------
+        buffer : list of dicts
+            It's the list of medias or comments to store.
+        field : str
+            It's the type of user data to store. Options are 'medias' or 'comments'.
+        social_media : str
+            It's the social media which the user data came from.
+        username : str
+            It's the username of the user who owns the medias.
+        mode : str
+            It's the mode in which the user data will be stored in the Mongo database.
+
+        Returns
+        -------
+        The number of stored medias or comments.
+        """
+        if (field == "medias"):
+            preprocessed_data = self.common_data_object.preprocess_medias(buffer, social_media, username)
+            n_items = len(preprocessed_data['medias'])
+        else:
+            preprocessed_data = self.common_data_object.preprocess_media_comments(buffer, social_media, username)
+            n_items = sum(len(item['texts']) for item in preprocessed_data['comments'])
+
+        self.common_data_object.append_user_data(preprocessed_data,
+                self.mongo_collections[mode][field], field)
+        return n_items
 
     def preprocess_and_store_common_data(self, user_data, social_media, mode):
         """
@@ -265,8 +518,9 @@ class MainOperations:
             preprocessed_data['profile'], self.mongo_collections[mode]['profiles'])
         self.common_data_object.insert_user_data(
             preprocessed_data['media_list'], self.mongo_collections[mode]['medias'])
-        self.common_data_object.insert_user_data(
-            preprocessed_data['media_comments'], self.mongo_collections[mode]['comments'])
+        if (preprocessed_data['media_comments'] != None):
+            self.common_data_object.insert_user_data(
+                preprocessed_data['media_comments'], self.mongo_collections[mode]['comments'])
 
         return {'profile':preprocessed_data["profile"], 'media':preprocessed_data["media_list"],
                 'comments':preprocessed_data["media_comments"]}
@@ -309,6 +563,50 @@ class MainOperations:
         A list of dicts in which each one of them is a matched data sample got
         from the collection in the Mongo database.
         """
+        return list(self.iter_data_from_mongodb(username, social_media, collection, date_list))
+
+    def iter_data_from_mongodb(self, username, social_media, collection, date_list, fields=None):
+        """
+        Gets any kind of user data of a specific social media source and a related
+        range of dates by recovering the information from a specific collection
+        in the Mongo database one by one, so the data of a long period of time
+        are not loaded in memory at the same time. The process will be run for
+        each provided range of date.
+
+        Parameters
+        ----------
+        username : str
+            It's the username of the studied user to get their data.
+        social_media : str
+            It's the social media source which the desired data came from.
+        collection : str
+            It's the collection in which the data will be looked for.
+        date_list : list of tuples
+            It's the range of dates to add to the query in order to get the data
+            for each range.
+        fields : list of str, optional
+            They're the fields of the data to get. The default is None, which
+            means all the fields.
+
+        Raises
+        ------
+        UsernameNotFound
+            If the provided username is not a non-empty string.
+        InvalidSocialMediaSource
+            If the provided social media source is not a non-empty string or does
+            not exist.
+        CollectionNotFound
+            If the provided collection name is not a non-empty string or does not
+            exist.
+        InvalidDates
+            If the provided range of dates is not a non-empty list of tuples,
+            does not have the valid format or is wrong.
+
+        Returns
+        -------
+        A generator of dicts in which each one of them is a matched data sample
+        got from the collection in the Mongo database.
+        """
         # Check the provided username
         if (type(username) != str or username == ""):
             raise UsernameNotFound("ERROR. The username should be a non-empty string.")
@@ -346,10 +644,11 @@ class MainOperations:
 
             # Complete the get query to make it to the Mongo database
             mongo_values = {"username":username, "social_media":social_media, "date_ini":date_range[0], "date_fin":date_range[1]}
-            # Make the query
-            mongo_data.extend(self.common_data_object.get_user_data(collection, "get_item", mongo_values))
+            # Prepare the query
+            mongo_data.append(self.common_data_object.iter_user_data(collection, "get_item",
+                                                                     mongo_values, fields))
 
-        return mongo_data
+        return itertools.chain.from_iterable(mongo_data)
 
     def get_data_from_postgresdb(self, query, select_values):
         """
@@ -402,6 +701,227 @@ class MainOperations:
 
         return {"ids":id_data, "data":postgres_data}
 
+    def store_profiles_in_postgresdb(self, username, analysis, social_media,
+                                     date_ini, date_fin):
+        """
+        Gets the profiles of a user which belong to the provided range of dates
+        from the Mongo database and inserts them in batches in the Postgres
+        database if they're not already.
+
+        Parameters
+        ----------
+        username : str
+            It's the username of the user which is going to be studied.
+        analysis : str
+            It's the profile analysis which requires the profiles.
+        social_media : str
+            It's the social media source which the user data will be recovered.
+        date_ini : str
+            It's the initial date of the period of time.
+        date_fin : str
+            It's the final date of the period of time.
+
+        Returns
+        -------
+        None.
+        """
+        collection = self.analysis_mongo_collections[analysis]
+        mongo_data = self.iter_data_from_mongodb(username, social_media, collection, [(date_ini, date_fin)])
+
+        # Insert the profiles in batches. The repeated ones will be skipped.
+        insert_query = self.analysis_postgres_insert_queries[analysis]
+        while (True):
+            batch = [dict(sorted(item.items())) for item in itertools.islice(mongo_data, self.postgres_batch_size)]
+            if (len(batch) == 0):
+                break
+            self.postgresdb_object.insert_batch(insert_query, batch)
+
+    def get_profile_aggregates(self, username, analysis, social_media,
+                               date_ini, date_fin):
+        """
+        Computes the Profiles Evolution or Profiles Activity analysis with an
+        aggregation in the Mongo database, so only the averages of the profiles
+        are recovered. The results have the same format as the ones computed by
+        the DataAnalyzer object: the values per day if there are 7 days or less,
+        and the averages per week if there are more.
+
+        Parameters
+        ----------
+        username : str
+            It's the username of the user which is going to be studied.
+        analysis : str
+            It's the profile analysis to perform.
+        social_media : str
+            It's the social media source which the user data will be recovered.
+        date_ini : str
+            It's the initial date of the period of time to perform the analysis.
+        date_fin : str
+            It's the final date of the period of time to perform the analysis.
+
+        Raises
+        ------
+        ProfilesNotFound
+            If there aren't any profiles to perform the Profiles Evolution analysis.
+        UserActivityNotFound
+            If there aren't any profiles to perform the Profiles Activity analysis.
+
+        Returns
+        -------
+        A dict which contains the analysis results per date.
+        """
+        # Analysis results and their related fields in the Mongo database
+        keys = ['date', 'n_posts'] if "activity" in analysis else \
+            ['date', 'n_posts', 'n_followers', 'n_followings']
+        metrics = {'n_posts':'n_medias', 'n_followers':'n_followers', 'n_followings':'n_followings'}
+
+        values = {"username":username, "social_media":social_media, "date_ini":date_ini, "date_fin":date_fin}
+        aggregates = self.mongodb_object.get_date_aggregates(values, [metrics[key] for key in keys[1:]],
+                                                             self.analysis_mongo_collections[analysis])
+        # Check if there are profiles to analyze
+        if (len(aggregates["days"]) == 0):
+            if ("activity" in analysis):
+                raise UserActivityNotFound("ERROR. The user activity should be a non-empty list.")
+            raise ProfilesNotFound("ERROR. The profiles to study should be in a non-empty list.")
+
+        result = {key:[] for key in keys}
+        # Get the values per one week
+        if (len(aggregates["days"]) <= 7):
+            for day in aggregates["days"]:
+                result['date'].append(day["date"])
+                for key in keys[1:]:
+                    result[key].append(round(day[metrics[key]]))
+        # Get the averages per week
+        else:
+            for i, week in enumerate(aggregates["weeks"]):
+                result['date'].append("Semana "+str(i+1))
+                for key in keys[1:]:
+                    result[key].append(round(week[metrics[key]]))
+        return result
+
+    def update_metric_views(self, username, social_media, mode, date_ini, date_fin, refresh=True):
+        """
+        Copies the profiles and the medias of a user which belong to the provided
+        range of dates from the Mongo database to the Postgres database, and
+        refreshes the materialized views of the daily metrics. It's called
+        after each download of the user data, without refreshing the views,
+        which are refreshed once after each batch of downloads.
+
+        Parameters
+        ----------
+        username : str
+            It's the username of the downloaded user.
+        social_media : str
+            It's the social media source of the user data.
+        mode : str
+            It's the type of the collections and tables, 'test' or 'real'.
+        date_ini : str
+            It's the initial date of the period of time.
+        date_fin : str
+            It's the final date of the period of time.
+        refresh : bool, optional
+            If True, the views are refreshed after copying the data. The default is True.
+
+        Raises
+        ------
+        InvalidMode
+            If the provided mode is not valid.
+
+        Returns
+        -------
+        A list with the names of the refreshed views.
+        """
+        # Check the provided mode
+        if (mode != "test" and mode != "real"):
+            raise InvalidMode("ERROR. The mode should be 'test' or 'real'.")
+        prefix = "test_" if mode == "test" else ""
+        self.store_profiles_in_postgresdb(username, prefix+"profile_evolution", social_media, date_ini, date_fin)
+        self.insert_media_data(username, prefix+"media_evolution", social_media, date_ini, date_fin)
+        return self.postgresdb_object.refresh_views(mode) if refresh else []
+
+    def get_backfill_medias(self, mode, profile_ids):
+        """
+        Gets the medias of every user and date stored in the Mongo database
+        with the fields of the insert query of the medias, so they could be
+        loaded in the Postgres database. The medias whose profiles are not
+        stored in the Postgres database are skipped.
+
+        Parameters
+        ----------
+        mode : str
+            It's the type of the collections and tables, 'test' or 'real'.
+        profile_ids : dict
+            It's the id of each profile in the Postgres database, whose keys are
+            tuples with the username, social media source and date.
+
+        Yields
+        ------
+        Each media as a dict.
+        """
+        collection = "test_medias" if mode == "test" else "medias"
+        mongo_data = self.mongodb_object.iter_records("get_all", fields=["username", "social_media", "date", "medias"],
+                                                      batch_size=self.postgres_batch_size, collection=collection)
+        for item in mongo_data:
+            profile_key = (item["username"], item["social_media"], item["date"].strftime("%Y-%m-%d"))
+            if (profile_key not in profile_ids):
+                continue
+            for media in item.get("medias", []):
+                yield {"comment_count":media["comment_count"], "date":item["date"], "id_media":media["id_media"],
+                       "id_profile":profile_ids[profile_key], "like_count":media["like_count"],
+                       "uploaded_date":media["taken_at"]}
+
+    def backfill_metric_views(self, mode, batch_size=10000, progress=None):
+        """
+        Loads every profile and media stored in the Mongo database in the
+        Postgres database and refreshes the materialized views of the daily
+        metrics, so they also contain the data downloaded before computing the
+        analyses from them. The records which are already in the Postgres
+        database are skipped, so it could be run several times.
+
+        Parameters
+        ----------
+        mode : str
+            It's the type of the collections and tables, 'test' or 'real'.
+        batch_size : int, optional
+            It's the number of records of each batch to load. The default is 10000.
+        progress : function, optional
+            It's the function which receives the number of read records, the
+            number of inserted records and the elapsed seconds after each batch.
+            The default is None.
+
+        Raises
+        ------
+        InvalidMode
+            If the provided mode is not valid.
+
+        Returns
+        -------
+        A dict with the number of read and inserted profiles and medias, and
+        the names of the refreshed views.
+        """
+        # Check the provided mode
+        if (mode != "test" and mode != "real"):
+            raise InvalidMode("ERROR. The mode should be 'test' or 'real'.")
+        prefix = "test_" if mode == "test" else ""
+        # 1. Load the profiles of every user and date which have the fields of the insert query
+        profile_collection = self.analysis_mongo_collections[prefix+"profile_evolution"]
+        profile_query = self.analysis_postgres_insert_queries[prefix+"profile_evolution"]
+        profile_fields = self.postgresdb_object.insert_queries[profile_query]['fields']
+        profiles = ({field:item[field] for field in profile_fields} for item in
+                    self.mongodb_object.iter_records("get_all", batch_size=self.postgres_batch_size,
+                                                     collection=profile_collection)
+                    if all(field in item for field in profile_fields))
+        loaded_profiles = self.postgresdb_object.bulk_load(profile_query, profiles, batch_size, progress)
+        # 2. Load the medias with the ids of their profiles, which are got before
+        # so the load doesn't wait for another connection
+        profile_ids = {(username, social_media, date.strftime("%Y-%m-%d")):id_profile
+                       for username, social_media, date, id_profile in
+                       self.postgresdb_object.get_data(prefix+"get_profile_ids")}
+        loaded_medias = self.postgresdb_object.bulk_load(self.analysis_postgres_insert_queries[prefix+"media_evolution"],
+                                                         self.get_backfill_medias(mode, profile_ids), batch_size, progress)
+        # 3. Refresh the views with the loaded data
+        return {"profiles":loaded_profiles, "medias":loaded_medias,
+                "views":self.postgresdb_object.refresh_views(mode)}
+
     def perform_profile_evolution(self, username, analysis, social_media,
                                   date_ini, date_fin):
         """
@@ -432,28 +952,25 @@ class MainOperations:
             - The file name of the saved analysis results.
             - The ids of the inserted analysis results.
         """
-        # 1. Get the required data from Mongo database
-        collection = self.analysis_mongo_collections[analysis]
-        mongo_data = self.get_data_from_mongodb(username, social_media, collection, [(date_ini, date_fin)])
-
-        # 2. Insert the recovered data to Postgres database
-        insert_query = self.analysis_postgres_insert_queries[analysis]
-        check_query = self.postgresdb_object.check_queries[insert_query]
-        check_keys = self.postgresdb_object.select_queries[check_query]['fields']
-        for item in mongo_data:
-            if (len(check_keys) > 0):
-                check_dict = {key:item[key] for key in check_keys}
-            # Insert the data and provide the check values, if there are any
-            self.postgresdb_object.insert_data(insert_query, [dict(sorted(item.items()))], [check_dict])
-
-        # 3. Get only the required fields to perform the analysis
-        select_query = self.analysis_postgres_select_queries[analysis]
-        select_values = {"username":username, "social_media":social_media,
-                          "date_ini":date_ini, "date_fin":date_fin}
-        required_data = self.postgresdb_object.get_data(select_query, select_values)
-
-        # 4. Perform the analysis
-        analysis_results = self.data_analyzer_object.profile_evolution(username, required_data)
+        if (self.analysis_pushdown):
+            # Compute the averages in the Mongo database
+            analysis_results = self.get_profile_aggregates(username, analysis, social_media,
+                                                           date_ini, date_fin)
+        else:
+            # 1-2. Get the required data from Mongo database and insert them to
+            # the Postgres database. The daily metrics are already stored.
+            if (not self.metric_views):
+                self.store_profiles_in_postgresdb(username, analysis, social_media, date_ini, date_fin)
+
+            # 3. Get only the required fields to perform the analysis
+            select_query = self.analysis_view_select_queries[analysis] if self.metric_views \
+                else self.analysis_postgres_select_queries[analysis]
+            select_values = {"username":username, "social_media":social_media,
+                              "date_ini":date_ini, "date_fin":date_fin}
+            required_data = self.postgresdb_object.get_data(select_query, select_values)
+
+            # 4. Perform the analysis
+            analysis_results = self.data_analyzer_object.profile_evolution(username, required_data)
         # Store the analysis results
         insert_query = self.analysis_results_insert_queries[analysis]
         analysis_ids = []
@@ -502,28 +1019,25 @@ class MainOperations:
             - The file name of the saved analysis results.
             - The ids of the inserted analysis results.
         """
-        # 1. Get the required data from Mongo database
-        collection = self.analysis_mongo_collections[analysis]
-        mongo_data = self.get_data_from_mongodb(username, social_media, collection, [(date_ini, date_fin)])
-
-        # 2. Insert the recovered data to Postgres database
-        insert_query = self.analysis_postgres_insert_queries[analysis]
-        check_query = self.postgresdb_object.check_queries[insert_query]
-        check_keys = self.postgresdb_object.select_queries[check_query]['fields']
-        for item in mongo_data:
-            if (len(check_keys) > 0):
-                check_dict = {key:item[key] for key in check_keys}
-            # Insert the data and provide the check values, if there are any
-            self.postgresdb_object.insert_data(insert_query, [dict(sorted(item.items()))], [check_dict])
-
-        # 3. Get only the required fields to perform the analysis
-        select_query = self.analysis_postgres_select_queries[analysis]
-        select_values = {"username":username, "social_media":social_media,
-                          "date_ini":date_ini, "date_fin":date_fin}
-        required_data = self.postgresdb_object.get_data(select_query, select_values)
-
-        # 4. Perform the analysis
-        analysis_results = self.data_analyzer_object.user_activity(username, required_data)
+        if (self.analysis_pushdown):
+            # Compute the averages in the Mongo database
+            analysis_results = self.get_profile_aggregates(username, analysis, social_media,
+                                                           date_ini, date_fin)
+        else:
+            # 1-2. Get the required data from Mongo database and insert them to
+            # the Postgres database. The daily metrics are already stored.
+            if (not self.metric_views):
+                self.store_profiles_in_postgresdb(username, analysis, social_media, date_ini, date_fin)
+
+            # 3. Get only the required fields to perform the analysis
+            select_query = self.analysis_view_select_queries[analysis] if self.metric_views \
+                else self.analysis_postgres_select_queries[analysis]
+            select_values = {"username":username, "social_media":social_media,
+                              "date_ini":date_ini, "date_fin":date_fin}
+            required_data = self.postgresdb_object.get_data(select_query, select_values)
+
+            # 4. Perform the analysis
+            analysis_results = self.data_analyzer_object.user_activity(username, required_data)
         # Store the analysis results
         insert_query = self.analysis_results_insert_queries[analysis]
         analysis_ids = []
@@ -563,9 +1077,15 @@ class MainOperations:
         -------
         None
         """
+        # 0. The profiles are not copied to the Postgres database by the profile
+        # analyses computed in the Mongo database
+        if (self.analysis_pushdown):
+            profile_analysis = "test_profile_evolution" if "test" in analysis else "profile_evolution"
+            self.store_profiles_in_postgresdb(username, profile_analysis, social_media, date_ini, date_fin)
         # 1. Get the required data from Mongo database
         collection = "test_medias" if "test" in analysis else "medias"
-        mongo_data = self.get_data_from_mongodb(username, social_media, collection, [(date_ini, date_fin)])
+        mongo_data = self.iter_data_from_mongodb(username, social_media, collection, [(date_ini, date_fin)],
+                                                 ["username", "date", "medias"])
         # 2. Insert the recovered medias with their related id profile and title
         # to the Postgres database
         insert_medias_query = "insert_test_medias" if "test" in analysis else "insert_medias"
@@ -610,20 +1130,23 @@ class MainOperations:
                         media_id = self.postgresdb_object.get_data(get_media_id_query, check_values)
 
                     collection = "test_comments" if "test" in analysis else "comments"
-                    mongo_data = self.get_data_from_mongodb(username, social_media, collection, [(date_ini, date_fin)])
+                    comment_data = self.iter_data_from_mongodb(username, social_media, collection,
+                                                               [(date_ini, date_fin)], ["comments"])
                     insert_query = "insert_test_media_comments" if "test" in analysis else "insert_media_comments"
                     got_media_id = media_id[0] if type(media_id) == list else media_id
-                    for record in mongo_data:
+                    comments_to_insert = []
+                    for record in comment_data:
                         for comment_item in record["comments"]:
                             # 3.1. Clean the comments
-                            for comment in comment_item["texts"][:20]:
+                            for comment in comment_item["texts"][:self.max_comments_per_media]:
                                 prep_text = self.common_data_object.clean_texts([comment["text"]])[0]
-                                # 3.2. Insert the preprocessed text
-                                comment_to_insert = {"author":comment["user"], "date":item["date"],
-                                                      "id_media_aut":got_media_id, "original_text":comment["text"],
-                                                      "preprocessed_text":prep_text}
-                                check_values = {"original_text":prep_text, "author":username, "id_media_aut":got_media_id}
-                                self.postgresdb_object.insert_data(insert_query, [comment_to_insert], [check_values])
+                                comments_to_insert.append({"author":comment["user"], "date":item["date"],
+                                                           "id_media_aut":got_media_id, "original_text":comment["text"],
+                                                           "preprocessed_text":prep_text})
+                    # 3.2. Insert the preprocessed texts in batches
+                    for i in range(0, len(comments_to_insert), self.postgres_batch_size):
+                        self.postgresdb_object.insert_batch(insert_query,
+                                comments_to_insert[i:i+self.postgres_batch_size])
 
     def perform_medias_evolution(self, username, analysis, social_media,
                                  date_ini, date_fin):
@@ -655,10 +1178,13 @@ class MainOperations:
             - The file name of the saved analysis results.
             - The ids of the inserted analysis results.
         """
-        # 1. Get and insert the required medias to perform the analysis
-        self.insert_media_data(username, analysis, social_media, date_ini, date_fin)
+        # 1. Get and insert the required medias to perform the analysis. The
+        # daily averages are already stored.
+        if (not self.metric_views):
+            self.insert_media_data(username, analysis, social_media, date_ini, date_fin)
         # 2. Get only the required fields to perform the analysis
-        select_query = self.analysis_postgres_select_queries[analysis]
+        select_query = self.analysis_view_select_queries[analysis] if self.metric_views \
+            else self.analysis_postgres_select_queries[analysis]
         select_values = {"date_ini":date_ini, "date_fin":date_fin,
                          "username":username, "social_media":social_media}
         required_data = self.postgresdb_object.get_data(select_query, select_values)
@@ -771,26 +1297,35 @@ class MainOperations:
         select_values = {"comment_date_ini":date_ini, "comment_date_fin":date_fin,
                          "media_date_ini":date_ini, "media_date_fin":date_fin,
                          "username":username, "social_media":social_media}
-        required_data = self.postgresdb_object.get_data(select_query, select_values)
-        # 3. Perform the analysis
-        analysis_results = self.data_analyzer_object.sentiment_analysis_text(username, required_data)
+        required_data = self.postgresdb_object.iter_data(select_query, select_values,
+                                                         self.postgres_read_batch_size)
+        # 3. Perform the analysis of each batch of texts
         # 4. Store the sentiment analysis results for the analyzed texts and count
-        # the number of each one as well as the average polarity
+        # the number of each one as well as the average polarity. They're stored
+        # with the cursor of each batch, which commits them before the next one.
         total_sentiments = {'pos':0.0, 'neu':0.0, 'neg':0.0}
         total_degree = {'pos':0.0, 'neu':0.0, 'neg':0.0}
-        for item in analysis_results:
-            if ("comment" in analysis):
-                insert_analyzed_text_query = "insert_test_comment_sentiment_analysis" if "test" in analysis else "insert_comment_sentiment_analysis"
-                check_analyzed_text = [{"original_text":item["original_text"]}]
-                self.postgresdb_object.insert_data(insert_analyzed_text_query, [item], check_analyzed_text)
-            # Count the number of sentiments and compute the average degree
-            if (item["sentiment"] != "none"):
-                total_sentiments[item["sentiment"]] += 1
-                total_degree[item["sentiment"]] += item["degree"]
+        n_analyzed = 0
+        for batch, cursor in required_data:
+            analysis_results = self.data_analyzer_object.sentiment_analysis_text(username, batch)
+            n_analyzed += len(analysis_results)
+            for item in analysis_results:
+                if ("comment" in analysis):
+                    insert_analyzed_text_query = "insert_test_comment_sentiment_analysis" if "test" in analysis else "insert_comment_sentiment_analysis"
+                    check_analyzed_text = [{"original_text":item["original_text"]}]
+                    self.postgresdb_object.insert_data(insert_analyzed_text_query, [item], check_analyzed_text,
+                                                       cursor)
+                # Count the number of sentiments and compute the average degree
+                if (item["sentiment"] != "none"):
+                    total_sentiments[item["sentiment"]] += 1
+                    total_degree[item["sentiment"]] += item["degree"]
+        # Check if there were texts to analyze
+        if (n_analyzed == 0):
+            raise TextDataNotFound("ERROR. The preprocessed texts to analyze should be a non-empty list of tuples.")
 
         # Average of the polarity for each sentiment
         for key in total_degree: 
-            total_degree[key] = round(total_degree[key]/len(analysis_results), 2)
+            total_degree[key] = round(total_degree[key]/n_analyzed, 2)
         # 5. Store the sentiment analysis results
         insert_analysis_query = "insert_test_sentiment_analysis" if "test" in analysis else "insert_sentiment_analysis"
         analysis_type = "titles" if "title" in analysis else "comments"
@@ -832,25 +1367,23 @@ class MainOperations:
             - The file name of the saved analysis results.
             - The ids of the inserted analysis results.
         """
-        # 1. Get the media comments as well as the authors
-        get_comments_query = "test_get_comments_and_authors" if "test" in analysis else "get_comments_and_authors"
+        # 1. Get the authors of the analysed media comments as well as their sentiments
+        get_comments_query = "test_get_comment_sentiments_and_authors" if "test" in analysis else "get_comment_sentiments_and_authors"
         query_values = {"comment_date_ini":date_ini, "comment_date_fin":date_fin,
                         "media_date_ini":date_ini, "media_date_fin":date_fin,
                         "username":username, "social_media":social_media}
-        recovered_comments = self.postgresdb_object.get_data(get_comments_query, query_values)
-        # 2. Get the sentiments of the recovered comments
-        get_sentiments_query = "test_get_comment_sentiment" if "test" in analysis else "get_comment_sentiment"
-        data_to_analyze = []
-        for comment in recovered_comments:
-            recovered_sentiment = self.postgresdb_object.get_data(get_sentiments_query,
-                                                                  {"original_text":comment[2]})
-
-            if (len(recovered_sentiment) > 0):
-                data_to_analyze.append({"date":comment[0].strftime("%d-%m-%Y"), "author":comment[1],
-                                        "sentiment":recovered_sentiment[0][0]})
+        recovered_comments = self.postgresdb_object.iter_data(get_comments_query, query_values,
+                                                              self.postgres_read_batch_size)
+        # 2. Only the comments whose sentiments have been identified are recovered.
+        # The sentiments of each author per date are counted batch by batch.
+        user_patterns = {}
+        for batch, cursor in recovered_comments:
+            data_to_analyze = [{"date":comment[0].strftime("%d-%m-%Y"), "author":comment[1], "sentiment":comment[2]}
+                               for comment in batch]
+            self.data_analyzer_object.count_user_sentiments(data_to_analyze, user_patterns)
 
         # 3. Analyze the user behaviours from the recovered analysed comments
-        analysis_results = self.data_analyzer_object.user_behaviours(username, data_to_analyze)
+        analysis_results = self.data_analyzer_object.get_user_behaviours(username, user_patterns)
         # 4. Insert the analysis results
         inserted_analysis = []
         insert_query = self.analysis_results_insert_queries[analysis]
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class which declares the indexes required by the queries of the Mongo
+collections and creates them if they don't already exist. It also checks, using
+the query plans, that the most frequent queries are solved with the indexes
+instead of scanning the whole collections.
+
+It could be run as a command in order to create and verify the indexes. It's
+run before starting the platform (see Dockerfile), instead of when the app is
+imported, so an index which can't be created doesn't stop the platform:
+    python3 src/mongo_indexes.py [--verify] [--migrate-buckets] [collection ...]
+
+The daily documents stored before grouping a collection by user and month
+(MONGODB_BUCKETED_COLLECTIONS) are copied to its monthly collection with
+--migrate-buckets, so they are still available.
+
+@author: Lidia Sánchez Mérida
+"""
+import argparse
+import sys
+import pymongo
+from exceptions import InvalidMongoDbObject, CollectionNotFound
+from mongodb import MongoDB
+
+class MongoIndexManager:
+
+    def __init__(self, mongodb_object):
+        """
+        Creates a MongoIndexManager object whose attributes are:
+            - A MongoDB object to operate with the Mongo database.
+            - The indexes required by each collection.
+            - The collections which contain user data.
+            - The queries to check for each collection of user data, with example values.
+            - The errors of the indexes which couldn't be created.
+
+        Parameters
+        ----------
+        mongodb_object : MongoDB
+            It's the MongoDB object which contains the connection to the Mongo database.
+
+        Raises
+        ------
+        InvalidMongoDbObject
+            If the provided MongoDB object is not valid.
+
+        Returns
+        -------
+        A MongoIndexManager object.
+        """
+        if (type(mongodb_object) != MongoDB):
+            raise InvalidMongoDbObject("ERROR. The connection to the MongoDB database "+
+                                       "should be a MongoDB object.")
+        self.mongodb = mongodb_object
+        # The unique index solves the equalities on the username and social media
+        # source as well as the range of dates. The index on the date solves
+        # the query of the avalaible dates.
+        user_date_indexes = [
+            {"keys":[("username", pymongo.ASCENDING), ("social_media", pymongo.ASCENDING),
+                     ("date", pymongo.ASCENDING)], "unique":True},
+            {"keys":[("date", pymongo.ASCENDING)], "unique":False}
+            ]
+        self.collection_indexes = {
+            "profiles":user_date_indexes,
+            "medias":user_date_indexes,
+            "comments":user_date_indexes,
+            "test":user_date_indexes,
+            "test_medias":user_date_indexes,
+            "test_comments":user_date_indexes,
+            "available_dates":[
+                {"keys":[("collection", pymongo.ASCENDING), ("date", pymongo.ASCENDING)], "unique":True}
+                ]
+            }
+        # The monthly collections store one document per user and month
+        month_indexes = [
+            {"keys":[("username", pymongo.ASCENDING), ("social_media", pymongo.ASCENDING),
+                     ("month", pymongo.ASCENDING)], "unique":True}
+            ]
+        for collection in self.mongodb.bucket_metrics:
+            self.collection_indexes[collection+"_monthly"] = month_indexes
+        # Collections which contain user data
+        self.data_collections = [collection for collection in self.collection_indexes
+                                 if self.collection_indexes[collection] == user_date_indexes]
+        user_values = {"username":"username", "social_media":"Instagram",
+                       "date_ini":"01-01-2021", "date_fin":"31-12-2021"}
+        self.hot_queries = {
+            "get_item":user_values,
+            "get_dates":{}
+            }
+        self.index_errors = {}
+
+    def apply_indexes(self, collections=None):
+        """
+        Creates the required indexes of the provided collections which don't
+        already exist. It could be run several times without duplicating them.
+        The indexes which can't be created, such as a unique index of a
+        collection with duplicated documents, are skipped and their errors are
+        kept in order to report them.
+
+        Parameters
+        ----------
+        collections : list of str, optional
+            They're the collections to index. The default is None, which means
+            all the collections.
+
+        Raises
+        ------
+        CollectionNotFound
+            If some of the provided collections have not declared indexes.
+
+        Returns
+        -------
+        A dict with the names of the new indexes of each collection.
+        """
+        collections = list(self.collection_indexes.keys()) if collections == None else collections
+        # Check the provided collections
+        if (not all(collection in self.collection_indexes for collection in collections)):
+            raise CollectionNotFound("ERROR. Avalaible collections: "+str(list(self.collection_indexes.keys())))
+
+        new_indexes = {}
+        for collection in collections:
+            connection = self.mongodb.client[self.mongodb.db][collection]
+            existing_keys = [list(index["key"].items()) for index in connection.list_indexes()]
+            new_indexes[collection] = []
+            self.index_errors.pop(collection, None)
+            for index in self.collection_indexes[collection]:
+                if (index["keys"] in existing_keys):
+                    continue
+                try:
+                    new_indexes[collection].extend(connection.create_indexes(
+                        [pymongo.IndexModel(index["keys"], unique=index["unique"])]))
+                except pymongo.errors.OperationFailure as error:
+                    self.index_errors.setdefault(collection, []).append(str(error))
+
+        return new_indexes
+
+    def get_plan_stages(self, plan):
+        """
+        Gets the stages of a query plan and the indexes which it uses.
+
+        Parameters
+        ----------
+        plan : dict
+            It's the query plan to go through.
+
+        Returns
+        -------
+        A list with the names of the stages and a list with the names of the indexes.
+        """
+        stages = [plan.get("stage")]
+        indexes = [plan["indexName"]] if "indexName" in plan else []
+        children = plan.get("inputStages", [])
+        if ("inputStage" in plan):
+            children = children + [plan["inputStage"]]
+        for child in children:
+            child_stages, child_indexes = self.get_plan_stages(child)
+            stages.extend(child_stages)
+            indexes.extend(child_indexes)
+        return stages, indexes
+
+    def verify_indexes(self, collections=None):
+        """
+        Checks the query plans of the most frequent queries of the provided
+        collections in order to know if they are solved with the indexes.
+
+        Parameters
+        ----------
+        collections : list of str, optional
+            They're the collections to check. The default is None, which means
+            all the collections of user data.
+
+        Raises
+        ------
+        CollectionNotFound
+            If some of the provided collections don't contain user data.
+
+        Returns
+        -------
+        A dict with the results of each collection and query. Each result
+        contains the used indexes, if the whole collection is scanned and if the
+        query is covered by the index, that is, the documents are not read.
+        """
+        collections = self.data_collections if collections == None else collections
+        # Check the provided collections
+        if (not all(collection in self.data_collections for collection in collections)):
+            raise CollectionNotFound("ERROR. Avalaible collections: "+str(self.data_collections))
+
+        results = {}
+        for collection in collections:
+            connection = self.mongodb.client[self.mongodb.db][collection]
+            results[collection] = {}
+            for query, values in self.hot_queries.items():
+                final_query, projection = self.mongodb.build_query(query, values)
+                cursor = connection.find(final_query, projection)
+                if (query == "get_dates"):
+                    cursor = cursor.sort("date", pymongo.ASCENDING)
+                plan = cursor.explain()["queryPlanner"]["winningPlan"]
+                stages, indexes = self.get_plan_stages(plan)
+                results[collection][query] = {"indexes":indexes,
+                                              "collection_scan":"COLLSCAN" in stages,
+                                              "covered":len(indexes) > 0 and "FETCH" not in stages}
+        return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Creates the indexes of the Mongo collections.")
+    parser.add_argument("collections", nargs="*", help="Collections to index. All of them by default.")
+    parser.add_argument("--verify", action="store_true", help="Check the query plans of the frequent queries.")
+    parser.add_argument("--migrate-buckets", action="store_true",
+                        help="Copy the daily documents of the collections grouped by month to their monthly collections.")
+    args = parser.parse_args()
+
+    index_manager = MongoIndexManager(MongoDB("profiles"))
+    collections = args.collections if len(args.collections) > 0 else None
+    for collection, indexes in index_manager.apply_indexes(collections).items():
+        print(collection, "- new indexes:", indexes)
+    for collection, errors in index_manager.index_errors.items():
+        print(collection, "- indexes not created:", errors)
+    if (args.migrate_buckets):
+        for collection in index_manager.mongodb.bucketed_collections:
+            print(collection, "- migrated snapshots:", index_manager.mongodb.migrate_to_buckets(collection))
+    if (args.verify):
+        results = index_manager.verify_indexes(collections)
+        for collection, queries in results.items():
+            for query, result in queries.items():
+                print(collection, query, result)
+        # Return an error if some query scans the whole collection
+        if (any(result["collection_scan"] for queries in results.values() for result in queries.values())):
+            sys.exit(1)
+    if (len(index_manager.index_errors) > 0):
+        sys.exit(1)
@@ -7,14 +7,61 @@ classes which need to operate with the Mongo database.
 
 @author: Lidia Sánchez Mérida.
 """
+import copy
 import os
 import pymongo
+import threading
+import warnings
 from datetime import datetime
 import sys
 sys.path.append('src/exceptions')
 from exceptions import ConnectionNotFound, CollectionNotFound \
     , InvalidDatabaseCredentials, InvalidQuery, NewItemNotFound, InvalidQueryValues
 
+# Clients of the process, one per URI, shared by every MongoDB object
+mongo_clients = {}
+mongo_clients_lock = threading.Lock()
+
+def get_mongo_client(uri):
+    """
+    Function to get the client of the process connected to a specific URI. It
+    will be created the first time it's required, with the sizes of its pool of
+    connections stored as env variables (MONGODB_MAX_POOL_SIZE and
+    MONGODB_MIN_POOL_SIZE). A new client is created in the processes forked
+    after the client, because a client can't be shared between processes.
+
+    Parameters
+    ----------
+    uri : str
+        It's the URI of the Mongo database.
+
+    Returns
+    -------
+    The MongoClient object connected to the URI.
+    """
+    client_key = (uri, os.getpid())
+    with mongo_clients_lock:
+        if (client_key not in mongo_clients):
+            mongo_clients[client_key] = pymongo.MongoClient(uri,
+                maxPoolSize=int(os.environ.get("MONGODB_MAX_POOL_SIZE", "100")),
+                minPoolSize=int(os.environ.get("MONGODB_MIN_POOL_SIZE", "0")))
+        return mongo_clients[client_key]
+
+def close_mongo_clients():
+    """
+    Function to close every client of the current process and their pools of
+    connections.
+
+    Returns
+    -------
+    The number of closed clients.
+    """
+    with mongo_clients_lock:
+        process_clients = [key for key in mongo_clients if key[1] == os.getpid()]
+        for client_key in process_clients:
+            mongo_clients.pop(client_key).close()
+        return len(process_clients)
+
 class MongoDB:
     
     def __init__(self, collection):
@@ -22,9 +69,21 @@ class MongoDB:
         Creates a MongoDB object whose attributes are:
             - The name of the database to connect with.
             - The Mongo database URI and credentials.
-            - The queries to make in order to get some data.
+            - The queries to make in order to get some data. They're templates
+                which are never modified, so the same object could be shared
+                between several threads.
             - The relationship between the insert and the get queries.
+            - The client of the process connected to the Mongo database, which
+                is shared by every MongoDB object with the same URI.
             - The connection to the specified collection in the Mongo database.
+            - The collections which already have the unique index to identify
+                each document by its username, social media source and date,
+                and the errors of the collections in which it couldn't be created.
+            - The collection which contains the summary of the dates in which
+                each collection has data of each user.
+            - The metrics of the daily snapshots of the collections which could
+                be stored grouped by month, and the collections which are
+                stored in this way (MONGODB_BUCKETED_COLLECTIONS env variable).
 
         Parameters
         ----------
@@ -52,7 +111,11 @@ class MongoDB:
         # Queries to get data
         self.get_queries = {
             "get_dates":{
-                "query":{"date":1},
+                "query":{"date":1, "_id":0},
+                "fields":[]
+            },
+            "get_all":{
+                "query":{},
                 "fields":[]
             },
             "get_item":{
@@ -79,11 +142,58 @@ class MongoDB:
             }
         }
         
-        # Make the connection
-        self.client = pymongo.MongoClient(uri)
+        # Use the client of the process to connect to the collection
+        self.collection_type = pymongo.collection.Collection
+        self.client = self.get_client(uri)
         self.db = "socialnetworksdb"
         self.connection = self.client[self.db][collection]
+        self.unique_indexed_collections = set()
+        self.unique_index_errors = {}
+        self.available_dates_collection = "available_dates"
+        # Collections whose daily snapshots could be grouped in one document per
+        # user and month. The rest of the fields are stored once per month.
+        profile_metrics = ["n_followers", "n_followings", "n_medias"]
+        self.bucket_metrics = {"profiles":profile_metrics, "test":profile_metrics}
+        self.bucketed_collections = [name for name in os.environ.get("MONGODB_BUCKETED_COLLECTIONS", "").split(",")
+                                     if name in self.bucket_metrics]
+        # Key of the items appended to the documents and, for the fields whose
+        # items are stored page by page, the list of each item to merge
+        self.append_key = "id_media"
+        self.append_merge_lists = {"comments":"texts"}
         
+    def get_client(self, uri):
+        """
+        Gets the client of the process connected to the Mongo database.
+
+        Parameters
+        ----------
+        uri : str
+            It's the URI of the Mongo database.
+
+        Returns
+        -------
+        The MongoClient object connected to the URI.
+        """
+        return get_mongo_client(uri)
+    
+    def check_connection(self, connection):
+        """
+        Checks that the connection to a collection of the Mongo database has
+        been made.
+
+        Parameters
+        ----------
+        connection : Collection
+            It's the connection to the collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        """
+        if (type(connection) != self.collection_type):
+            raise ConnectionNotFound("ERROR. There is not connection to the database.")
+    
     def set_collection(self, new_collection):
         """
         Sets a new collection name to connect with in the Mongo database.
@@ -108,10 +218,71 @@ class MongoDB:
         self.connection = self.client[self.db][new_collection]
         return self.connection
     
-    def get_records(self, query, values={}):
+    def get_collection(self, collection=None):
         """
-        Gets the records which matched with the specified query and values from
-        the connected collection in the Mongo database.
+        Gets the connection to a specific collection in the Mongo database
+        without changing the current one, so several threads could operate with
+        different collections using the same object.
+
+        Parameters
+        ----------
+        collection : str, optional
+            It's the collection name. The default is None, which means the
+            current collection.
+
+        Raises
+        ------
+        CollectionNotFound
+            If the provided collection name is not a non-empty string.
+
+        Returns
+        -------
+        The connection to the collection in the Mongo database.
+        """
+        if (collection == None):
+            return self.connection
+        if (type(collection) != str or collection == ""):
+            raise CollectionNotFound("ERROR. Invalid collection name.")
+        return self.client[self.db][collection]
+    
+    def build_query(self, query, values={}):
+        """
+        Completes a copy of one of the predefined queries with the provided
+        values, so the templates are never modified.
+
+        Parameters
+        ----------
+        query : str
+            It's the predefined query to complete.
+        values : dict, optional
+            They are the required values to make the query, in case it has them. 
+            The default is a empty dict.
+
+        Returns
+        -------
+        A tuple with the filter and the projection of the query.
+        """
+        final_query = copy.deepcopy(self.get_queries[query]["query"])
+        if (query == "get_dates"):
+            return {}, final_query
+        elif (query == "general_check"):
+            for key in final_query:
+                final_query[key] = values[key]
+        else:
+            for key in self.get_queries[query]["fields"]:
+                if (key == "date_ini"):
+                    final_query["date"]["$gte"] = datetime.strptime(values[key],"%d-%m-%Y")
+                elif (key == "date_fin"):
+                    final_query["date"]["$lte"] = datetime.strptime(values[key],"%d-%m-%Y") 
+                else:
+                    final_query[key] = values[key]
+        
+        return final_query, None
+    
+    def build_find_query(self, query, values={}, fields=None, batch_size=100):
+        """
+        Checks the provided query, values, fields and batch size and completes
+        the query with its projection in order to get the records.
 
         Parameters
         ----------
@@ -120,24 +291,27 @@ class MongoDB:
         values : dict, optional
             They are the required values to make the query, in case it has them. 
             The default is a empty dict.
+        fields : list of str, optional
+            They're the fields of the records to get. The default is None, which
+            means all the fields.
+        batch_size : int, optional
+            It's the number of records to get in each round trip to the database.
+            The default is 100.
 
         Raises
         ------
-        ConnectionNotFound
-            If the connection to the Mongo database has not been made.
         InvalidQuery
             If the provided query is not a non-empty string or does not exist.
         InvalidQueryValues
             If the provided values to make the query are not a non-empty dict
-            or they haven't the required keys.
+            or they haven't the required keys, or the provided fields or batch
+            size are not valid.
 
         Returns
         -------
-        A list which contains the matched records as dicts.
+        A tuple with the filter and the projection of the query. The Mongo id
+        is never returned.
         """
-        # Check if the connection has been made
-        if (type(self.connection) != pymongo.collection.Collection):
-            raise ConnectionNotFound("ERROR. There is not connection to the database.")
         # Check the provided query
         if (type(query) != str or query == ""):
             raise InvalidQuery("ERROR. The query should be a non-empty string.")
@@ -149,45 +323,374 @@ class MongoDB:
             raise InvalidQueryValues("ERROR. The specified query needs some values.")
         if (required_values != list(values.keys())):
             raise InvalidQueryValues("ERROR. The provided values to make the query are wrong.")
+        # Check the provided fields and batch size
+        if (fields != None and (type(fields) != list or len(fields) == 0 or
+                                not all(type(field) == str for field in fields))):
+            raise InvalidQueryValues("ERROR. The fields to get should be a non-empty list of strings.")
+        if (type(batch_size) != int or batch_size <= 0):
+            raise InvalidQueryValues("ERROR. The batch size should be a number greater than 0.")
         
-        # Complete the query
-        final_query = self.get_queries[query]["query"]
+        final_query, projection = self.build_query(query, values)
+        if (projection == None):
+            projection = {"_id":0} if fields == None else dict({field:1 for field in fields}, _id=0)
+        return final_query, projection
+    
+    def get_bucket_collection(self, connection):
+        """
+        Gets the collection which stores the daily snapshots of a collection
+        grouped by user and month, if it's stored in this way.
+
+        Parameters
+        ----------
+        connection : Collection
+            It's the connection to the collection of daily snapshots.
+
+        Returns
+        -------
+        The connection to the monthly collection. None if the collection
+        stores one document per day.
+        """
+        if (connection.name not in self.bucketed_collections):
+            return None
+        return self.client[self.db][connection.name+"_monthly"]
+    
+    def get_month(self, date):
+        """
+        Gets the first day of the month of a date, which identifies the monthly
+        document in which the daily snapshot of that date is stored.
+
+        Parameters
+        ----------
+        date : datetime
+            It's the date of the daily snapshot.
+
+        Raises
+        ------
+        NewItemNotFound
+            If the provided date is not a datetime.
+
+        Returns
+        -------
+        A datetime with the first day of the month.
+        """
+        if (type(date) != datetime):
+            raise NewItemNotFound("ERROR. The date of the monthly collections should be a datetime.")
+        return datetime(date.year, date.month, 1)
+    
+    def get_bucket_update(self, new_item, collection):
+        """
+        Gets the filter and the update to add a daily snapshot to the document
+        of its user and month. The metrics are added as a new daily point and
+        the rest of the fields are stored once per month with their last values.
+        The filter doesn't match if the month already has a point of that date.
+
+        Parameters
+        ----------
+        new_item : dict
+            It's the daily snapshot to add.
+        collection : str
+            It's the collection of daily snapshots.
+
+        Returns
+        -------
+        A tuple with the filter and the update.
+        """
+        metrics = self.bucket_metrics[collection]
+        check_fields = self.get_queries["general_check"]["fields"]
+        point = {"date":new_item["date"]}
+        point.update({key:new_item[key] for key in metrics if key in new_item})
+        static = {key:value for key, value in new_item.items()
+                  if key not in metrics and key not in check_fields and key != "_id"}
+        
+        bucket_query = {"username":new_item["username"], "social_media":new_item["social_media"],
+                        "month":self.get_month(new_item["date"]), "points.date":{"$ne":new_item["date"]}}
+        update = {"$push":{"points":point}}
+        if (len(static) > 0):
+            update["$set"] = {"static":static}
+        return bucket_query, update
+    
+    def build_bucket_pipeline(self, final_query, projection=None):
+        """
+        Translates the filter of a query of daily snapshots into the aggregation
+        pipeline which gets them from the monthly documents. Each daily point is
+        returned with the same fields as a daily document.
+
+        Parameters
+        ----------
+        final_query : dict
+            It's the filter of the daily snapshots with the username, social
+            media source and date or range of dates.
+        projection : dict, optional
+            It's the projection of the daily snapshots. The default is None.
+
+        Returns
+        -------
+        A list with the stages of the pipeline.
+        """
+        bucket_query = {key:value for key, value in final_query.items() if key != "date"}
+        point_query = {}
+        if ("date" in final_query):
+            date = final_query["date"]
+            if (type(date) == dict):
+                bucket_query["month"] = {"$gte":self.get_month(date["$gte"]), "$lte":self.get_month(date["$lte"])}
+                point_query["points.date"] = {"$gte":date["$gte"], "$lte":date["$lte"]}
+            else:
+                bucket_query["month"] = self.get_month(date)
+                point_query["points.date"] = date
+        
+        pipeline = [{"$match":bucket_query}, {"$unwind":"$points"}]
+        if (len(point_query) > 0):
+            pipeline.append({"$match":point_query})
+        pipeline.append({"$replaceRoot":{"newRoot":{"$mergeObjects":[
+            {"$ifNull":["$static", {}]}, "$points",
+            {"username":"$username", "social_media":"$social_media"}]}}})
+        if (projection != None):
+            pipeline.append({"$project":projection})
+        return pipeline
+    
+    def get_records(self, query, values={}, collection=None):
+        """
+        Gets the records which matched with the specified query and values from
+        the connected collection in the Mongo database.
+
+        Parameters
+        ----------
+        query : str
+            It's the query to make in order to get the data.
+        values : dict, optional
+            They are the required values to make the query, in case it has them. 
+            The default is a empty dict.
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        InvalidQuery
+            If the provided query is not a non-empty string or does not exist.
+        InvalidQueryValues
+            If the provided values to make the query are not a non-empty dict
+            or they haven't the required keys.
+
+        Returns
+        -------
+        A list which contains the matched records as dicts.
+        """
+        return list(self.iter_records(query, values, collection=collection))
+    
+    def iter_records(self, query, values={}, fields=None, batch_size=100,
+                     no_cursor_timeout=False, collection=None):
+        """
+        Gets the records which matched with the specified query and values from
+        the connected collection in the Mongo database one by one, so they are
+        not loaded in memory at the same time. The Mongo id is removed by the
+        database as well as the fields which are not required.
+
+        Parameters
+        ----------
+        query : str
+            It's the query to make in order to get the data.
+        values : dict, optional
+            They are the required values to make the query, in case it has them. 
+            The default is a empty dict.
+        fields : list of str, optional
+            They're the fields of the records to get. The default is None, which
+            means all the fields.
+        batch_size : int, optional
+            It's the number of records to get in each round trip to the database.
+            The default is 100.
+        no_cursor_timeout : bool, optional
+            If True, the cursor won't be closed by the database when it's idle,
+            for long processes. The default is False.
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        InvalidQuery
+            If the provided query is not a non-empty string or does not exist.
+        InvalidQueryValues
+            If the provided values to make the query are not a non-empty dict
+            or they haven't the required keys, or the provided fields or batch
+            size are not valid, or the timeout of the cursor of a collection
+            grouped by month should be disabled.
+
+        Returns
+        -------
+        A generator of the matched records as dicts.
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        # Make the final query without the Mongo id because it's useless
+        final_query, projection = self.build_find_query(query, values, fields, batch_size)
+        # Get the daily snapshots from the monthly documents
+        bucket = self.get_bucket_collection(connection)
+        if (bucket != None):
+            # Check the timeout because the cursors of an aggregation are always closed when they're idle
+            if (no_cursor_timeout):
+                raise InvalidQueryValues("ERROR. The timeout of the cursors of a collection grouped "+
+                                         "by month can't be disabled.")
+            pipeline = self.build_bucket_pipeline(final_query, projection)
+            if (query == "get_dates"):
+                pipeline.append({"$sort":{"date":pymongo.ASCENDING}})
+            return self.stream_cursor(bucket.aggregate(pipeline, batchSize=batch_size))
+        
+        item_rows = connection.find(final_query, projection, batch_size=batch_size,
+                                    no_cursor_timeout=no_cursor_timeout)
+        # Read the dates from the index on the date
         if (query == "get_dates"):
-            item_rows = self.connection.find({}, final_query)
-        elif (query == "general_check"):
-            for key in final_query:
-                final_query[key] = values[key]
-            # Make the final query
-            item_rows = self.connection.find(final_query)
+            item_rows = item_rows.sort("date", pymongo.ASCENDING)
+        
+        return self.stream_cursor(item_rows)
+    
+    def get_date_aggregates(self, values, metrics, collection=None):
+        """
+        Computes in the Mongo database the average of some numeric fields of a
+        user per day and per week between a range of dates, so only the averages
+        are returned instead of the whole records. The weeks are groups of 7
+        consecutive days with data, the same as the ones of the DataAnalyzer
+        object. The operators on dates require MongoDB 5.0 or later.
+
+        Parameters
+        ----------
+        values : dict
+            They're the values of the 'get_item' query: username, social media
+            source and range of dates.
+        metrics : list of str
+            They're the numeric fields to average.
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        InvalidQueryValues
+            If the provided values or metrics are not valid.
+
+        Returns
+        -------
+        A dict with the list of averages per day, whose dates are the day, and
+        the list of averages per week, whose week is the position of the week
+        starting from 0.
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        # Check the provided metrics
+        if (type(metrics) != list or len(metrics) == 0 or
+            not all(type(metric) == str and metric != "" for metric in metrics)):
+            raise InvalidQueryValues("ERROR. The metrics should be a non-empty list of strings.")
+        final_query, projection = self.build_find_query("get_item", values)
+
+        # Filter the records of the user, or the daily points of the monthly documents
+        bucket = self.get_bucket_collection(connection)
+        if (bucket != None):
+            source = bucket
+            pipeline = self.build_bucket_pipeline(final_query)
         else:
-            for key in required_values:
-                if (key == "date_ini"):
-                    final_query["date"]["$gte"] = datetime.strptime(values[key],"%d-%m-%Y")
-                elif (key == "date_fin"):
-                    final_query["date"]["$lte"] = datetime.strptime(values[key],"%d-%m-%Y") 
-                else:
-                    final_query[key] = values[key]
-                    
-            # Make the final query
-            item_rows = self.connection.find(final_query)
+            source = connection
+            pipeline = [{"$match":final_query}]
+        day_averages = {metric:{"$avg":{"$toDouble":"$"+metric}} for metric in metrics}
+        week_averages = {metric:{"$avg":"$days."+metric} for metric in metrics}
+        # Number the sorted days in order to group them 7 by 7
+        week_number = {"$floor":{"$divide":["$position", 7]}}
+        pipeline.extend([
+            {"$group":dict({"_id":{"$dateTrunc":{"date":"$date", "unit":"day"}}}, **day_averages)},
+            {"$sort":{"_id":pymongo.ASCENDING}},
+            {"$facet":{
+                "days":[{"$project":dict({"_id":0, "date":"$_id"}, **{metric:1 for metric in metrics})}],
+                "weeks":[{"$group":{"_id":None, "days":{"$push":"$$ROOT"}}},
+                         {"$unwind":{"path":"$days", "includeArrayIndex":"position"}},
+                         {"$group":dict({"_id":week_number}, **week_averages)},
+                         {"$sort":{"_id":pymongo.ASCENDING}},
+                         {"$project":dict({"_id":0, "week":"$_id"}, **{metric:1 for metric in metrics})}]
+                }}
+            ])
+        return list(source.aggregate(pipeline))[0]
+    
+    def stream_cursor(self, cursor):
+        """
+        Goes through the records of a cursor and closes it when all of them
+        have been read or the reading is stopped.
+
+        Parameters
+        ----------
+        cursor : pymongo.cursor.Cursor
+            It's the cursor of the query made to the Mongo database.
+
+        Yields
+        ------
+        Each record of the cursor as a dict.
+        """
+        try:
+            for item_r in cursor:
+                yield item_r
+        finally:
+            cursor.close()
+    
+    def create_unique_index(self, collection=None):
+        """
+        Creates, if it doesn't already exist, the unique index of the current
+        collection on the username, social media source and date, so there
+        couldn't be two documents of the same user and date even if several
+        crawlers insert them at the same time.
+
+        Parameters
+        ----------
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+
+        Returns
+        -------
+        The name of the index. None if it couldn't be created because the
+        collection already has duplicated documents. The error is kept, so the
+        index won't be created again until the duplicates are removed (see
+        mongo_indexes.py).
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
         
-        documents = []
-        for item_r in item_rows:
-            # Delete the Mongo id because it's useless
-            del item_r["_id"]
-            documents.append(item_r)
-            
-        return documents
+        # The collections with duplicated documents are not tried again
+        if (connection.name in self.unique_index_errors):
+            return None
+        index_keys = [(key, pymongo.ASCENDING) for key in self.get_queries["general_check"]["fields"]]
+        try:
+            index_name = connection.create_index(index_keys, unique=True)
+        except pymongo.errors.OperationFailure as error: # pragma no cover
+            self.unique_index_errors[connection.name] = str(error)
+            warnings.warn("The unique index of "+connection.name+" couldn't be created: "+str(error))
+            return None
+        self.unique_indexed_collections.add(connection.name)
+        return index_name
     
-    def insert_item(self, new_item):
+    def insert_item(self, new_item, collection=None):
         """
         Inserts a new record in a specific collection in the Mongo database if
-        it doesn't already exist.
+        it doesn't already exist. The check and the insertion are made in a
+        single upsert operation.
 
         Parameters
         ----------
         new_item : dict
             It's the new data to insert.
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
 
         Raises
         ------
@@ -200,38 +703,432 @@ class MongoDB:
         -------
         A string id if the item could be inserted, None if it couldn't.
         """
+        connection = self.get_collection(collection)
         # Check if the connection has been made
-        if (type(self.connection) != pymongo.collection.Collection):
-            raise ConnectionNotFound("ERROR. There is not connection to the database.")
+        self.check_connection(connection)
         # Check the provided new item
         if (type(new_item) != dict or len(new_item) == 0):
             raise NewItemNotFound("ERROR. The new item to insert should be a non-empty dict.")
         
-        # Check if the item to insert already exists
-        final_query = self.get_queries["general_check"]["query"]
-        for key in self.get_queries["general_check"]["fields"]:
-            final_query[key] = new_item[key]
+        # Add the item to the document of its user and month
+        bucket = self.get_bucket_collection(connection)
+        if (bucket != None):
+            return self.insert_bucket_item(new_item, connection.name, bucket)
+        
+        if (connection.name not in self.unique_indexed_collections):
+            self.create_unique_index(connection.name)
+        # Insert the item only if there are not equal records
+        final_query = {key:new_item[key] for key in self.get_queries["general_check"]["fields"]}
+        try:
+            result = connection.update_one(final_query, {"$setOnInsert":new_item}, upsert=True)
+        except pymongo.errors.DuplicateKeyError: # pragma no cover
+            # Another process has inserted the same item at the same time
+            return None
+        if (result.upserted_id != None):
+            self.add_available_dates([new_item], connection.name)
+            return str(result.upserted_id)
+    
+    def create_bucket_index(self, bucket):
+        """
+        Creates, if it doesn't already exist, the unique index of a monthly
+        collection on the username, social media source and month.
+
+        Parameters
+        ----------
+        bucket : Collection
+            It's the connection to the monthly collection.
+
+        Returns
+        -------
+        The name of the index.
+        """
+        index_name = bucket.create_index([("username", pymongo.ASCENDING),
+            ("social_media", pymongo.ASCENDING), ("month", pymongo.ASCENDING)], unique=True)
+        self.unique_indexed_collections.add(bucket.name)
+        return index_name
+    
+    def insert_bucket_item(self, new_item, collection, bucket):
+        """
+        Adds a daily snapshot to the document of its user and month in a
+        monthly collection if the month doesn't already have a snapshot of the
+        same date. The document will be created if it doesn't exist.
+
+        Parameters
+        ----------
+        new_item : dict
+            It's the daily snapshot to add.
+        collection : str
+            It's the collection of daily snapshots.
+        bucket : Collection
+            It's the connection to the monthly collection.
+
+        Returns
+        -------
+        A string id of the monthly document if the snapshot could be added,
+        None if it couldn't.
+        """
+        if (bucket.name not in self.unique_indexed_collections):
+            self.create_bucket_index(bucket)
+        bucket_query, update = self.get_bucket_update(new_item, collection)
+        try:
+            document = bucket.find_one_and_update(bucket_query, update, projection={"_id":1}, upsert=True,
+                                                  return_document=pymongo.ReturnDocument.AFTER)
+        except pymongo.errors.DuplicateKeyError:
+            # The month already has a snapshot of the same date
+            return None
+        self.add_available_dates([new_item], collection)
+        return str(document["_id"])
+    
+    def get_bucket_operations(self, items, collection):
+        """
+        Gets the operations to add a list of daily snapshots to the documents of
+        their users and months in a monthly collection. The first operations
+        create the monthly documents which don't exist and the rest add each
+        snapshot only if its month doesn't already have a snapshot of the same date.
+
+        Parameters
+        ----------
+        items : list of dicts
+            It's the list of daily snapshots to add.
+        collection : str
+            It's the collection of daily snapshots.
+
+        Returns
+        -------
+        A list of UpdateOne operations to create the monthly documents and a list
+        of UpdateOne operations to add the snapshots.
+        """
+        month_queries, push_operations = [], []
+        for item in items:
+            bucket_query, update = self.get_bucket_update(item, collection)
+            month_query = {key:value for key, value in bucket_query.items() if key != "points.date"}
+            if (month_query not in month_queries):
+                month_queries.append(month_query)
+            push_operations.append(pymongo.UpdateOne(bucket_query, update))
+        month_operations = [pymongo.UpdateOne(month_query, {"$setOnInsert":{"points":[]}}, upsert=True)
+                            for month_query in month_queries]
+        return month_operations, push_operations
+    
+    def bulk_upsert_bucket(self, items, collection, bucket):
+        """
+        Adds a list of daily snapshots to the documents of their users and
+        months in a monthly collection in two unordered bulk operations. The
+        first one creates the monthly documents which don't exist and the
+        second one adds the snapshots whose dates are not already stored.
+
+        Parameters
+        ----------
+        items : list of dicts
+            It's the list of daily snapshots to add.
+        collection : str
+            It's the collection of daily snapshots.
+        bucket : Collection
+            It's the connection to the monthly collection.
+
+        Returns
+        -------
+        A dict with the number of inserted snapshots and the number of
+        snapshots which already existed.
+        """
+        if (bucket.name not in self.unique_indexed_collections):
+            self.create_bucket_index(bucket)
+        month_operations, push_operations = self.get_bucket_operations(items, collection)
+        try:
+            bucket.bulk_write(month_operations, ordered=False)
+        except pymongo.errors.BulkWriteError as error: # pragma no cover
+            # Another process has created the same monthly documents at the same time
+            self.get_duplicated_bulk_result(error)
+        n_inserted = bucket.bulk_write(push_operations, ordered=False).modified_count
+        # The dates of all the snapshots are stored, so they're added to the summary
+        self.add_available_dates(items, collection)
+        return {"inserted":n_inserted, "matched":len(items)-n_inserted}
+    
+    def migrate_to_buckets(self, collection, batch_size=1000):
+        """
+        Copies the daily documents of a collection to the documents of their
+        users and months in its monthly collection, so the data downloaded
+        before grouping the collection are still available. The daily documents
+        are not removed and the snapshots which already are in the monthly
+        collection are skipped, so it could be run several times.
+
+        Parameters
+        ----------
+        collection : str
+            It's the collection of daily documents to migrate.
+        batch_size : int, optional
+            It's the number of documents to add in each bulk operation. The
+            default is 1000.
+
+        Raises
+        ------
+        CollectionNotFound
+            If the provided collection could not be grouped by user and month.
+        InvalidQueryValues
+            If the provided batch size is not a positive integer.
+
+        Returns
+        -------
+        A dict with the number of migrated snapshots and the number of
+        snapshots which already were in the monthly collection.
+        """
+        # Check the provided collection and batch size
+        if (collection not in self.bucket_metrics):
+            raise CollectionNotFound("ERROR. Collections which could be grouped by month: "+
+                                     str(list(self.bucket_metrics.keys())))
+        if (type(batch_size) != int or batch_size <= 0):
+            raise InvalidQueryValues("ERROR. The batch size should be a positive integer.")
+        connection = self.client[self.db][collection]
+        bucket = self.client[self.db][collection+"_monthly"]
+        
+        result = {"inserted":0, "matched":0}
+        batch = []
+        with connection.find({}, {"_id":0}, batch_size=batch_size, no_cursor_timeout=True) as cursor:
+            for item in cursor:
+                batch.append(item)
+                if (len(batch) == batch_size):
+                    batch_result = self.bulk_upsert_bucket(batch, collection, bucket)
+                    result = {key:result[key]+batch_result[key] for key in result}
+                    batch = []
+        if (len(batch) > 0):
+            batch_result = self.bulk_upsert_bucket(batch, collection, bucket)
+            result = {key:result[key]+batch_result[key] for key in result}
+        return result
+    
+    def get_upsert_operations(self, items):
+        """
+        Checks a list of new records and gets the operations to insert each one
+        of them only if there is not a record with the same username, social
+        media source and date.
+
+        Parameters
+        ----------
+        items : list of dicts
+            It's the list of new data to insert.
+
+        Raises
+        ------
+        NewItemNotFound
+            If the provided items are not a non-empty list of dicts or they
+            have not the required keys.
+
+        Returns
+        -------
+        A list of UpdateOne operations.
+        """
+        # Check the provided items
+        if (type(items) != list or len(items) == 0):
+            raise NewItemNotFound("ERROR. The new items to insert should be a non-empty list.")
+        check_fields = self.get_queries["general_check"]["fields"]
+        if (not all(type(item) == dict and all(key in item for key in check_fields) for item in items)):
+            raise NewItemNotFound("ERROR. Each new item should be a dict with the required keys.")
+        
+        return [pymongo.UpdateOne({key:item[key] for key in check_fields},
+                                  {"$setOnInsert":item}, upsert=True) for item in items]
+    
+    def get_duplicated_bulk_result(self, error):
+        """
+        Gets the result of a bulk operation which failed because some records
+        were inserted by another process at the same time. These records are
+        counted as records which already existed.
+
+        Parameters
+        ----------
+        error : BulkWriteError
+            It's the error of the bulk operation.
+
+        Raises
+        ------
+        BulkWriteError
+            If some record could not be written because of another reason.
+
+        Returns
+        -------
+        The dict with the result of the bulk operation.
+        """
+        result = error.details
+        duplicated = [err for err in result["writeErrors"] if err["code"] == 11000]
+        if (len(duplicated) != len(result["writeErrors"])):
+            raise error
+        result["nMatched"] += len(duplicated)
+        return result
+    
+    def bulk_upsert(self, items, collection=None):
+        """
+        Inserts a list of new records in a specific collection in the Mongo
+        database in a single unordered bulk operation. The records which
+        already exist, with the same username, social media source and date,
+        won't be modified.
+
+        Parameters
+        ----------
+        items : list of dicts
+            It's the list of new data to insert.
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        NewItemNotFound
+            If the provided items are not a non-empty list of dicts or they
+            have not the required keys.
+
+        Returns
+        -------
+        A dict with the number of inserted records and the number of records
+        which already existed.
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        operations = self.get_upsert_operations(items)
+        # Add the items to the documents of their users and months
+        bucket = self.get_bucket_collection(connection)
+        if (bucket != None):
+            return self.bulk_upsert_bucket(items, connection.name, bucket)
+        
+        if (connection.name not in self.unique_indexed_collections):
+            self.create_unique_index(connection.name)
+        try:
+            result = connection.bulk_write(operations, ordered=False).bulk_api_result
+        except pymongo.errors.BulkWriteError as error: # pragma no cover
+            result = self.get_duplicated_bulk_result(error)
         
-        matched_records = self.get_records("general_check", final_query)
-        # Insert the query if there are not equal records
-        if (len(matched_records) == 0):
-            id_new_item = self.connection.insert_one(new_item.copy(), bypass_document_validation=True).inserted_id
-            return str(id_new_item)
+        # Add the dates of the inserted records to the summary
+        inserted_items = [items[upserted["index"]] for upserted in result.get("upserted", [])]
+        if (len(inserted_items) > 0):
+            self.add_available_dates(inserted_items, connection.name)
+        return {"inserted":result["nUpserted"], "matched":result["nMatched"]}
+    
+    def get_append_update(self, new_items, field):
+        """
+        Gets the update which appends a list of items to a field of a document,
+        identifying each item by its media id. The stored items with the same id
+        are replaced by the new ones, so a media downloaded again the same day
+        is stored once with its last counts. If the items of the field are stored
+        page by page, like the comments, the list of each item is merged with
+        the stored one instead.
+
+        Parameters
+        ----------
+        new_items : list of dicts
+            It's the list of items to append.
+        field : str
+            It's the field of the document in which the items will be appended.
+
+        Returns
+        -------
+        A list with the stages of the update pipeline.
+        """
+        merge_list = self.append_merge_lists.get(field)
+        # Join the provided items with the same id
+        items = {}
+        for i, item in enumerate(new_items):
+            item_key = item.get(self.append_key) if type(item) == dict else None
+            if (item_key == None):
+                items[("without_key", i)] = item
+            elif (merge_list != None and item_key in items):
+                merged_item = dict(items[item_key])
+                merged_item[merge_list] = merged_item[merge_list] + [element for element in item[merge_list]
+                                                                     if element not in merged_item[merge_list]]
+                items[item_key] = merged_item
+            else:
+                items[item_key] = item
+        item_keys = [item_key for item_key in items if type(item_key) != tuple]
+        # The items are literals, so their texts are never read as field paths
+        stored_items = {"$ifNull":["$"+field, []]}
+        kept_items = {"$filter":{"input":stored_items, "cond":{"$not":[{"$in":["$$this."+self.append_key,
+                                                                             {"$literal":item_keys}]}]}}}
+        appended_items = {"$literal":list(items.values())}
+        if (merge_list != None):
+            # Elements of the stored item with the same id, followed by the new ones
+            stored_list = {"$reduce":{"input":{"$filter":{"input":stored_items, "as":"stored",
+                               "cond":{"$eq":["$$stored."+self.append_key, "$$item."+self.append_key]}}},
+                           "initialValue":[], "in":{"$concatArrays":["$$value", {"$ifNull":["$$this."+merge_list, []]}]}}}
+            merged_list = {"$concatArrays":["$$stored_list", {"$filter":{"input":"$$item."+merge_list,
+                               "cond":{"$not":[{"$in":["$$this", "$$stored_list"]}]}}}]}
+            appended_items = {"$map":{"input":appended_items, "as":"item",
+                                      "in":{"$let":{"vars":{"stored_list":stored_list},
+                                                    "in":{"$mergeObjects":["$$item", {merge_list:merged_list}]}}}}}
+        return [{"$set":{field:{"$concatArrays":[kept_items, appended_items]}}}]
     
-    def collection_size(self):
+    def append_items(self, new_item, field, collection=None):
+        """
+        Appends a list of items to a field of the document which has the same
+        username, social media source and date than the provided item. If the
+        document doesn't exist, it will be created. The items which are already
+        in the field are replaced or merged with the new ones (see
+        get_append_update). In this way, the data of a specific date could be
+        stored in several steps.
+
+        Parameters
+        ----------
+        new_item : dict
+            It's the data to append. It should have the username, the social media
+            source, the date and the field which contains the list of items to append.
+        field : str
+            It's the field of the document in which the items will be appended.
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        NewItemNotFound
+            If the provided item is not a non-empty dict or it has not the
+            required keys.
+
+        Returns
+        -------
+        The number of provided items to append.
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        # Check the provided new item
+        if (type(new_item) != dict or len(new_item) == 0):
+            raise NewItemNotFound("ERROR. The new item to insert should be a non-empty dict.")
+        required_keys = self.get_queries["general_check"]["fields"] + [field]
+        if (not all(key in new_item for key in required_keys) or type(new_item[field]) != list):
+            raise NewItemNotFound("ERROR. The new item should have the required keys and a list of items to append.")
+        
+        # Document to update and items to append
+        final_query = {key:new_item[key] for key in self.get_queries["general_check"]["fields"]}
+        result = connection.update_one(final_query, self.get_append_update(new_item[field], field), upsert=True)
+        if (result.upserted_id != None):
+            self.add_available_dates([new_item], connection.name)
+        return len(new_item[field])
+    
+    def collection_size(self, collection=None):
         """
         Gets the number of documents contained in the current collection.
 
+        Parameters
+        ----------
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
         Returns
         -------
         An integer which represents the size of the current collection.
         """
-        return self.connection.count_documents({})
+        connection = self.get_collection(collection)
+        # Count the daily points of the monthly documents
+        bucket = self.get_bucket_collection(connection)
+        if (bucket != None):
+            sizes = list(bucket.aggregate([{"$group":{"_id":None, "size":{"$sum":{"$size":"$points"}}}}]))
+            return sizes[0]["size"] if len(sizes) > 0 else 0
+        return connection.count_documents({})
     
-    def delete_records(self, query, values={}):
+    def build_delete_query(self, query, values={}):
         """
-        Deletes the matched records from a specific collection and related to
-        the provided query.
+        Checks the provided query and values and completes a copy of the
+        predefined query in order to delete some records.
 
         Parameters
         ----------
@@ -242,8 +1139,6 @@ class MongoDB:
 
         Raises
         ------
-        ConnectionNotFound
-            If the connection to the Mongo database has not been made.
         InvalidQuery
             If the provided query is not a non-empty string or does not exist.
         InvalidQueryValues
@@ -252,11 +1147,8 @@ class MongoDB:
 
         Returns
         -------
-        The number of deleted records.
+        A dict with the filter of the records to delete.
         """
-        # Check if the connection has been made
-        if (type(self.connection) != pymongo.collection.Collection):
-            raise ConnectionNotFound("ERROR. There is not connection to the database.")
         # Check the provided query
         if (type(query) != str or query == ""):
             raise InvalidQuery("ERROR. The query should be a non-empty string.")
@@ -270,14 +1162,345 @@ class MongoDB:
             raise InvalidQueryValues("ERROR. The provided values to make the query are wrong.")
         
         # Complete the query
-        final_query = self.delete_queries[query]["query"]
+        final_query = copy.deepcopy(self.delete_queries[query]["query"])
         if (len(required_values) > 0):
             for key in final_query:
                 if (key == "date"):
                     final_query[key] = datetime.strptime(values[key],"%d-%m-%Y")
                 else:
                     final_query[key] = values[key]
+        return final_query
+    
+    def delete_records(self, query, values={}, collection=None):
+        """
+        Deletes the matched records from a specific collection and related to
+        the provided query.
+
+        Parameters
+        ----------
+        query : str
+            It's the query to make in order to remove the matched records.
+        values : dict, optional
+            They're the values to make the query. The default is {}.
+        collection : str, optional
+            It's the collection in which the operation is made. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        InvalidQuery
+            If the provided query is not a non-empty string or does not exist.
+        InvalidQueryValues
+            If the provided values to make the query are not a non-empty dict
+            or they haven't the required keys.
+
+        Returns
+        -------
+        The number of deleted records.
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        final_query = self.build_delete_query(query, values)
         
         # Delete the matched items related to the specified query
-        result = self.connection.delete_many(final_query)
-        return result.deleted_count
\ No newline at end of file
+        bucket = self.get_bucket_collection(connection)
+        if (bucket != None):
+            deleted_count = self.delete_bucket_records(final_query, bucket)
+        else:
+            deleted_count = connection.delete_many(final_query).deleted_count
+        # Remove the deleted dates from the summary
+        summary = self.client[self.db][self.available_dates_collection]
+        if (query == "delete_all"):
+            summary.delete_many({"collection":connection.name})
+        elif (deleted_count > 0):
+            summary.update_one(*self.get_removed_date_update(final_query, connection.name))
+            summary.delete_many({"collection":connection.name, "users":{"$size":0}})
+        return deleted_count
+    
+    def delete_bucket_records(self, final_query, bucket):
+        """
+        Deletes the daily snapshots which match with a filter from the
+        documents of a monthly collection. The documents without snapshots will
+        also be deleted.
+
+        Parameters
+        ----------
+        final_query : dict
+            It's the filter of the daily snapshots to delete. An empty filter
+            means all of them.
+        bucket : Collection
+            It's the connection to the monthly collection.
+
+        Returns
+        -------
+        The number of deleted snapshots.
+        """
+        if (len(final_query) == 0):
+            sizes = list(bucket.aggregate([{"$group":{"_id":None, "size":{"$sum":{"$size":"$points"}}}}]))
+            bucket.delete_many({})
+            return sizes[0]["size"] if len(sizes) > 0 else 0
+        
+        bucket_query = {"username":final_query["username"], "social_media":final_query["social_media"],
+                        "month":self.get_month(final_query["date"]), "points.date":final_query["date"]}
+        result = bucket.update_one(bucket_query, {"$pull":{"points":{"date":final_query["date"]}}})
+        bucket.delete_many({"points":{"$size":0}})
+        return result.modified_count
+    
+    def get_available_dates_operations(self, items, collection):
+        """
+        Gets the operations to add the dates of the provided records to the
+        summary of the dates in which a collection has data of each user.
+
+        Parameters
+        ----------
+        items : list of dicts
+            They're the inserted records with their username, social media
+            source and date.
+        collection : str
+            It's the collection in which the records have been inserted.
+
+        Returns
+        -------
+        A list of UpdateOne operations.
+        """
+        return [pymongo.UpdateOne({"collection":collection, "date":item["date"]},
+                    {"$addToSet":{"users":{"username":item["username"], "social_media":item["social_media"]}}},
+                    upsert=True) for item in items]
+    
+    def get_removed_date_update(self, deleted_query, collection):
+        """
+        Gets the update to remove the user of a deleted record from the summary
+        of the dates in which a collection has data of each user.
+
+        Parameters
+        ----------
+        deleted_query : dict
+            It's the filter of the deleted record, with the username, social
+            media source and date.
+        collection : str
+            It's the collection in which the record has been deleted.
+
+        Returns
+        -------
+        A tuple with the filter and the update to make in the summary.
+        """
+        return ({"collection":collection, "date":deleted_query["date"]},
+                {"$pull":{"users":{"username":deleted_query["username"],
+                                   "social_media":deleted_query["social_media"]}}})
+    
+    def add_available_dates(self, items, collection):
+        """
+        Adds the dates of the provided records to the summary of the dates in
+        which a collection has data of each user.
+
+        Parameters
+        ----------
+        items : list of dicts
+            They're the inserted records with their username, social media
+            source and date.
+        collection : str
+            It's the collection in which the records have been inserted.
+
+        Returns
+        -------
+        The number of dates of the summary which have been updated.
+        """
+        summary = self.client[self.db][self.available_dates_collection]
+        operations = self.get_available_dates_operations(items, collection)
+        try:
+            summary.bulk_write(operations, ordered=False)
+        except pymongo.errors.BulkWriteError: # pragma no cover
+            # Another process has added the same date at the same time
+            summary.bulk_write(operations, ordered=False)
+        return len(operations)
+    
+    def get_available_dates_pipeline(self, collection):
+        """
+        Gets the aggregation pipeline which groups the records of a collection
+        by their dates in order to build the summary of the dates.
+
+        Parameters
+        ----------
+        collection : str
+            It's the collection whose dates will be summarized.
+
+        Returns
+        -------
+        A list with the stages of the pipeline.
+        """
+        return [{"$group":{"_id":"$date",
+                           "users":{"$addToSet":{"username":"$username", "social_media":"$social_media"}}}},
+                {"$project":{"_id":0, "collection":{"$literal":collection}, "date":"$_id", "users":1}}]
+    
+    def get_rebuilt_dates_operations(self, dates, stored_dates, collection):
+        """
+        Gets the operations to update the summary of the dates of a collection
+        with its grouped records. The users of each date are added to the
+        stored ones, so the dates added at the same time by other processes are
+        kept. The stored dates which have no records anymore are removed, and the
+        collection is marked as summarized.
+
+        Parameters
+        ----------
+        dates : list of dicts
+            They're the dates of the records of the collection with their users.
+        stored_dates : list of dicts
+            They're the dates of the summary before grouping the records, with
+            their Mongo ids.
+        collection : str
+            It's the collection whose dates are summarized.
+
+        Returns
+        -------
+        A list of UpdateOne and DeleteOne operations.
+        """
+        operations = [pymongo.UpdateOne({"collection":collection, "date":item["date"]},
+                          {"$addToSet":{"users":{"$each":item["users"]}}}, upsert=True)
+                      for item in dates]
+        current_dates = set(item["date"] for item in dates)
+        operations.extend([pymongo.DeleteOne({"_id":item["_id"]}) for item in stored_dates
+                           if item["date"] not in current_dates])
+        operations.append(pymongo.UpdateOne(self.get_summarized_query(collection),
+                                            {"$set":{"summarized":True}}, upsert=True))
+        return operations
+    
+    def get_summarized_query(self, collection):
+        """
+        Gets the filter of the document which marks a collection as summarized.
+        It's stored in the summary of dates without a date.
+
+        Parameters
+        ----------
+        collection : str
+            It's the summarized collection.
+
+        Returns
+        -------
+        A dict with the filter of the document.
+        """
+        return {"collection":collection, "date":None}
+    
+    def rebuild_available_dates(self, collection=None):
+        """
+        Builds again the summary of the dates in which a collection has data of
+        each user by grouping its records in the Mongo database. The summary is
+        updated date by date, so it could be read and updated at the same time.
+
+        Parameters
+        ----------
+        collection : str, optional
+            It's the collection whose dates will be summarized. The default is
+            None, which means the current collection.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+
+        Returns
+        -------
+        The number of dates of the summary.
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        
+        summary = self.client[self.db][self.available_dates_collection]
+        stored_dates = list(summary.find({"collection":connection.name, "date":{"$ne":None}}, {"date":1}))
+        # The records of the monthly collections are the daily points
+        bucket = self.get_bucket_collection(connection)
+        if (bucket != None):
+            pipeline = self.build_bucket_pipeline({}) + self.get_available_dates_pipeline(connection.name)
+            dates = list(bucket.aggregate(pipeline))
+        else:
+            dates = list(connection.aggregate(self.get_available_dates_pipeline(connection.name)))
+        summary.bulk_write(self.get_rebuilt_dates_operations(dates, stored_dates, connection.name),
+                           ordered=False)
+        return len(dates)
+    
+    def build_available_dates_query(self, collection, username=None, social_media=None):
+        """
+        Checks the provided user and gets the filter of the summary of dates
+        in order to get the dates of a collection, optionally of a specific user.
+
+        Parameters
+        ----------
+        collection : str
+            It's the collection whose dates will be got.
+        username : str, optional
+            It's the username of the user whose dates will be got. The default
+            is None, which means every user.
+        social_media : str, optional
+            It's the social media source of the user. The default is None, which
+            means every social media source.
+
+        Raises
+        ------
+        InvalidQueryValues
+            If the provided username or social media source are not non-empty strings.
+
+        Returns
+        -------
+        A dict with the filter of the summary of dates.
+        """
+        # Check the provided user
+        if ((username != None and (type(username) != str or username == "")) or
+            (social_media != None and (type(social_media) != str or social_media == ""))):
+            raise InvalidQueryValues("ERROR. The username and social media should be non-empty strings.")
+        
+        summary_query = {"collection":collection, "date":{"$ne":None}}
+        # Filter the dates of a specific user
+        user_filter = {key:value for key, value in [("username", username), ("social_media", social_media)]
+                       if value != None}
+        if (len(user_filter) > 0):
+            summary_query["users"] = {"$elemMatch":user_filter}
+        return summary_query
+    
+    def get_available_dates(self, collection=None, username=None, social_media=None):
+        """
+        Gets the sorted dates in which a collection has data, optionally of a
+        specific user and social media source, from the summary of dates. If
+        the collection has not been summarized yet, the summary will be built
+        from its records, even if some dates have been added since then.
+
+        Parameters
+        ----------
+        collection : str, optional
+            It's the collection whose dates will be got. The default is None,
+            which means the current collection.
+        username : str, optional
+            It's the username of the user whose dates will be got. The default
+            is None, which means every user.
+        social_media : str, optional
+            It's the social media source of the user. The default is None, which
+            means every social media source.
+
+        Raises
+        ------
+        ConnectionNotFound
+            If the connection to the Mongo database has not been made.
+        InvalidQueryValues
+            If the provided username or social media source are not non-empty strings.
+
+        Returns
+        -------
+        A list with the dates.
+        """
+        connection = self.get_collection(collection)
+        # Check if the connection has been made
+        self.check_connection(connection)
+        summary_query = self.build_available_dates_query(connection.name, username, social_media)
+        
+        summary = self.client[self.db][self.available_dates_collection]
+        bucket = self.get_bucket_collection(connection)
+        source = bucket if bucket is not None else connection
+        # Build the summary of the collections which have not got one yet
+        if (summary.count_documents(dict(self.get_summarized_query(connection.name), summarized=True), limit=1) == 0 and
+            source.find_one({}, {"_id":1}) != None):
+            self.rebuild_available_dates(connection.name)
+        
+        dates = summary.find(summary_query, {"_id":0, "date":1}).sort("date", pymongo.ASCENDING)
+        return [item["date"] for item in dates]
\ No newline at end of file
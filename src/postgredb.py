@@ -4,6 +4,8 @@
 Class which represents the Single Source of Truth and contains the operations
 which can be done in the PostgreSQL database.
     - Insert a new item in a specific table, if it's not already.
+    - Insert a batch of new items in a single statement skipping the repeated ones.
+    - Load large amounts of items through a staging table and COPY.
     - Get the matched records related to a specific query.
     - Get the number of records or size from a table.
 
@@ -11,11 +13,92 @@ This class will be used by the classes which needs to operate with the PostgreSQ
 
 @author: Lidia Sánchez Mérida
 """
+import contextlib
+import io
 import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+import psycopg2.pool
 import os
+import re
+import threading
+import time
+import uuid
 from exceptions import InvalidDatabaseCredentials, InvalidTableName \
     , InvalidQuery, InvalidQueryValues
 
+# Pools of connections of the current process, shared by every PostgreDB object
+# connected to the same database with the same credentials
+postgres_pools = {}
+postgres_pools_lock = threading.Lock()
+
+class PreparedConnection(psycopg2.extensions.connection):
+    """
+    Connection to the Postgres database which keeps the names of the predefined
+    queries which have been prepared in its session.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_queries = set()
+
+def get_postgres_pool(database_name, user, pswd):
+    """
+    Function to get the pool of connections of the process to a specific
+    database. It will be created the first time it's required, with the sizes
+    stored as env variables (POSTGRES_MIN_POOL_SIZE and POSTGRES_MAX_POOL_SIZE).
+    A new pool is created in the processes forked after the pool, because the
+    connections can't be shared between processes.
+
+    Parameters
+    ----------
+    database_name : str
+        It's the name of the Postgres database.
+    user : str
+        It's the user of the Postgres database.
+    pswd : str
+        It's the password of the user.
+
+    Raises
+    ------
+    InvalidDatabaseCredentials
+        If the sizes of the pool are not valid or the credentials are wrong.
+
+    Returns
+    -------
+    A tuple with the ThreadedConnectionPool object and the semaphore which
+    limits the number of threads using its connections.
+    """
+    pool_key = (database_name, user, pswd, os.getpid())
+    with postgres_pools_lock:
+        if (pool_key not in postgres_pools):
+            min_size = int(os.environ.get("POSTGRES_MIN_POOL_SIZE", "1"))
+            max_size = int(os.environ.get("POSTGRES_MAX_POOL_SIZE", "10"))
+            # Check the sizes of the pool
+            if (min_size < 1 or max_size < min_size):
+                raise InvalidDatabaseCredentials("ERROR. The sizes of the pool of connections are not valid.")
+            try:
+                pool = psycopg2.pool.ThreadedConnectionPool(min_size, max_size, host="localhost",
+                            user=user, password=pswd, database=database_name,
+                            connection_factory=PreparedConnection)
+            except Exception: # pragma no cover
+                raise InvalidDatabaseCredentials("ERROR. The provided PostgreSQL credentials are wrong.")
+            postgres_pools[pool_key] = (pool, threading.BoundedSemaphore(max_size))
+        return postgres_pools[pool_key]
+
+def close_postgres_pools():
+    """
+    Function to close every pool of the current process and their connections.
+
+    Returns
+    -------
+    The number of closed pools.
+    """
+    with postgres_pools_lock:
+        process_pools = [key for key in postgres_pools if key[3] == os.getpid()]
+        for pool_key in process_pools:
+            postgres_pools.pop(pool_key)[0].closeall()
+        return len(process_pools)
+
 class PostgreDB:
     
     def __init__(self):
@@ -23,9 +106,15 @@ class PostgreDB:
         Creates a PostgreSQL object whose attributes are:
             - The name of the PostgreSQL database.
             - The tables of the database.
-            - The connection and the cursor to make queries.
+            - The pool of connections of the process to the database. Each
+                operation uses its own connection and cursor, so the same object
+                could be shared between several threads.
             - The avalaible queries to make.
             - The check queries to make in order to insert new data.
+            - The update queries to modify some existing data.
+            - The materialized views of the daily metrics of the users.
+            - If the predefined queries are prepared in each connection in order
+                to reuse their plans (POSTGRES_PREPARED_QUERIES env variable).
 
         Returns
         -------
@@ -39,13 +128,16 @@ class PostgreDB:
                        'testmedias', 'testmediasevolution', 'testmediaspopularity',
                        'testmediatitles', 'testmediacomments',
                        'testtextsentiments', 'testcommentsentiments', 'testuserbehaviours',
+                       'testtrackedusers',
                        
                        'profiles', 'profilesevolution', 'profilesactivity',
                        'medias', 'mediasevolution', 'mediaspopularity',
-                       'textsentiments', 'userbehaviours'
+                       'textsentiments', 'userbehaviours', 'trackedusers'
                        ]
         # Connect to the database
         self.connect_to_database()
+        # Prepare the predefined queries once per connection
+        self.prepare_queries = os.environ.get("POSTGRES_PREPARED_QUERIES", "true").lower() == "true"
         
         # Predefined queryies
         ## 1. SELECT QUERIES
@@ -66,6 +158,10 @@ class PostgreDB:
             'check_test_profile':{
                 'query':"SELECT id_profile FROM testprofiles WHERE username=%s AND social_media=%s AND date=%s",
                 'fields':['username', 'social_media', 'date']},
+            ## Get the id of every profile in order to load their medias
+            'test_get_profile_ids':{
+                'query':"SELECT username, social_media, date, id_profile FROM testprofiles",
+                'fields':[]},
             ## Get the required profiles for the ProfilesEvolution
             'test_get_profiles':{
                 'query':'SELECT date, n_medias, n_followers, n_followings FROM testprofiles WHERE '+
@@ -76,6 +172,16 @@ class PostgreDB:
                 'query':'SELECT date, n_medias FROM testprofiles WHERE '+
                     'username=%s AND social_media=%s AND date>=%s AND date<=%s',
                 'fields':['username', 'social_media', 'date_ini', 'date_fin']},
+            ## Get the daily metrics of the profiles for the ProfilesEvolution
+            'test_get_profiles_daily':{
+                'query':'SELECT date, n_medias, n_followers, n_followings FROM testprofilesdaily WHERE '+
+                    'username=%s AND social_media=%s AND date>=%s AND date<=%s ORDER BY date',
+                'fields':['username', 'social_media', 'date_ini', 'date_fin']},
+            ## Get the daily number of posts of the profiles for the ProfilesActivity
+            'test_get_nmedias_profiles_daily':{
+                'query':'SELECT date, n_medias FROM testprofilesdaily WHERE '+
+                    'username=%s AND social_media=%s AND date>=%s AND date<=%s ORDER BY date',
+                'fields':['username', 'social_media', 'date_ini', 'date_fin']},
             ## Check if the ProfilesEvolution analysis results are already in the database
             'check_test_profile_evolution':{
                 'query':'SELECT id_profile_evolution FROM testprofilesevolution WHERE '+
@@ -112,6 +218,12 @@ class PostgreDB:
                     "(SELECT id_profile FROM testprofiles WHERE username=%s AND social_media=%s)",
                 'fields':['date_ini', 'date_fin', 'username', 'social_media'],
             },
+            # Get the daily averages of the medias to perform a MediasEvolution analysis
+            'test_get_medias_daily':{
+                'query':"SELECT date, mean_likes, mean_comments FROM testmediasdaily "+
+                    "WHERE date>=%s AND date<=%s AND username=%s AND social_media=%s ORDER BY date",
+                'fields':['date_ini', 'date_fin', 'username', 'social_media'],
+            },
             # Get the required medias to perform a MediasPopularity analysis
             'test_get_medias_with_id':{
                 'query':"SELECT id_media, like_count, comment_count FROM testmedias "+
@@ -121,7 +233,7 @@ class PostgreDB:
             },
             # Check if a specific comment is already in the database before inserting it
             'check_test_media_comment':{
-                'query':"SELECT id_text FROM testmediacomments WHERE type='comment' AND original_text=%s AND author=%s AND id_media_aut=%s",
+                'query':"SELECT id_text FROM testmediacomments WHERE type='comment' AND text_hash=md5(%s) AND author=%s AND id_media_aut=%s",
                 'fields':["original_text", "author", "id_media_aut"]
             },
             # Get the required comments to perform a CommentsSentiments analysis
@@ -133,7 +245,7 @@ class PostgreDB:
             },
             # Check if the media title to insert is already in the database
             'check_test_media_title':{
-                'query':"SELECT id_text FROM testmediatitles WHERE type='title' AND id_media_aut=%s AND original_text=%s AND author=%s",
+                'query':"SELECT id_text FROM testmediatitles WHERE type='title' AND id_media_aut=%s AND text_hash=md5(%s) AND author=%s",
                 'fields':['id_media_aut', 'original_text', 'author']
             },
             # Get the required comments to perform a CommentsSentiments analysis
@@ -183,7 +295,7 @@ class PostgreDB:
             },
             # Check if a text sentiment analysis already exists
             'check_test_comment_sentiment':{
-                'query':'SELECT id_comment_sentiment FROM testcommentsentiments WHERE original_text=%s',
+                'query':'SELECT id_comment_sentiment FROM testcommentsentiments WHERE text_hash=md5(%s)',
                 'fields':["original_text"]
             },
             # Get the CommentSentiment analysis results to plot them directly
@@ -201,9 +313,20 @@ class PostgreDB:
                 'fields':["comment_date_ini", "comment_date_fin", "media_date_ini", "media_date_fin",
                           "username", "social_media"]
             },
+            # Get the sentiments of the analysed comments as well as their authors
+            # in a single query, joining the texts through their hashes
+            'test_get_comment_sentiments_and_authors':{
+                'query':"SELECT c.date, c.author, s.sentiment FROM testmediacomments c JOIN testcommentsentiments s "+
+                    "ON s.text_hash=c.text_hash AND s.original_text=c.original_text "+
+                    "WHERE c.type='comment' AND c.date>=%s AND c.date<=%s AND c.id_media_aut IN "+
+                    "(SELECT id_media_aut FROM testmedias WHERE type='common' AND date>=%s AND date<=%s AND id_profile IN "+
+                    "(SELECT id_profile FROM testprofiles WHERE username=%s AND social_media=%s))",
+                'fields':["comment_date_ini", "comment_date_fin", "media_date_ini", "media_date_fin",
+                          "username", "social_media"]
+            },
             # Get the sentiment from a analysed comment 
             'test_get_comment_sentiment':{
-                'query':"SELECT sentiment FROM testcommentsentiments WHERE original_text=%s",
+                'query':"SELECT sentiment FROM testcommentsentiments WHERE text_hash=md5(%s)",
                 'fields':["original_text"]
             },
             # Check if there are similar UserBehaviours analysis before inserting a new one
@@ -219,12 +342,33 @@ class PostgreDB:
                 'fields':['date_ini', 'date_fin', 'id_user']
             },
             
+            # FOR THE CRAWL SCHEDULER
+            ## Check if the user to track is already in the database
+            'check_test_tracked_user':{
+                'query':'SELECT id_tracked_user FROM testtrackedusers WHERE username=%s AND social_media=%s',
+                'fields':['username', 'social_media']
+            },
+            ## Get the active users whose data are older than their freshness period
+            ## and which are not waiting to be downloaded, sorted by priority
+            'test_get_due_tracked_users':{
+                'query':"SELECT username, social_media, priority FROM testtrackedusers WHERE active AND "+
+                    "(last_crawl IS NULL OR last_crawl <= NOW() - freshness_hours * INTERVAL '1 hour') AND "+
+                    "(last_enqueued IS NULL OR last_enqueued <= last_crawl OR "+
+                    "last_enqueued <= NOW() - %s * INTERVAL '1 hour') "+
+                    "ORDER BY priority DESC, last_crawl ASC NULLS FIRST LIMIT %s",
+                'fields':['enqueue_timeout', 'n_users']
+            },
+            
             ############################### REAL ANALYSIS ##################################
             # FOR PROFILES_EVOLUTION AND PROFILES_ACTIVITY
             ## Check if the profile to insert is already in the database
             'check_profile':{
                 'query':"SELECT id_profile FROM profiles WHERE username=%s AND social_media=%s AND date=%s",
                 'fields':['username', 'social_media', 'date']},
+            ## Get the id of every profile in order to load their medias
+            'get_profile_ids':{
+                'query':"SELECT username, social_media, date, id_profile FROM profiles",
+                'fields':[]},
             ## Get the required profiles for the ProfilesEvolution
             'get_profiles':{
                 'query':'SELECT date, n_medias, n_followers, n_followings FROM profiles WHERE '+
@@ -235,6 +379,16 @@ class PostgreDB:
                 'query':'SELECT date, n_medias FROM profiles WHERE '+
                     'username=%s AND social_media=%s AND date>=%s AND date<=%s',
                 'fields':['username', 'social_media', 'date_ini', 'date_fin']},
+            ## Get the daily metrics of the profiles for the ProfilesEvolution
+            'get_profiles_daily':{
+                'query':'SELECT date, n_medias, n_followers, n_followings FROM profilesdaily WHERE '+
+                    'username=%s AND social_media=%s AND date>=%s AND date<=%s ORDER BY date',
+                'fields':['username', 'social_media', 'date_ini', 'date_fin']},
+            ## Get the daily number of posts of the profiles for the ProfilesActivity
+            'get_nmedias_profiles_daily':{
+                'query':'SELECT date, n_medias FROM profilesdaily WHERE '+
+                    'username=%s AND social_media=%s AND date>=%s AND date<=%s ORDER BY date',
+                'fields':['username', 'social_media', 'date_ini', 'date_fin']},
             ## Check if the ProfilesEvolution analysis results are already in the database
             'check_profile_evolution':{
                 'query':'SELECT id_profile_evolution FROM profilesevolution WHERE '+
@@ -271,6 +425,12 @@ class PostgreDB:
                     "(SELECT id_profile FROM profiles WHERE username=%s AND social_media=%s)",
                 'fields':['date_ini', 'date_fin', 'username', 'social_media'],
             },
+            # Get the daily averages of the medias to perform a MediasEvolution analysis
+            'get_medias_daily':{
+                'query':"SELECT date, mean_likes, mean_comments FROM mediasdaily "+
+                    "WHERE date>=%s AND date<=%s AND username=%s AND social_media=%s ORDER BY date",
+                'fields':['date_ini', 'date_fin', 'username', 'social_media'],
+            },
             # Get the required medias to perform a MediasPopularity analysis
             'get_medias_with_id':{
                 'query':"SELECT id_media, like_count, comment_count FROM medias "+
@@ -280,7 +440,7 @@ class PostgreDB:
             },
             # Check if a specific comment is already in the database before inserting it
             'check_media_comment':{
-                'query':"SELECT id_text FROM mediacomments WHERE type='comment' AND original_text=%s AND author=%s AND id_media_aut=%s",
+                'query':"SELECT id_text FROM mediacomments WHERE type='comment' AND text_hash=md5(%s) AND author=%s AND id_media_aut=%s",
                 'fields':["original_text", "author", "id_media_aut"]
             },
             # Get the required comments to perform a CommentsSentiments analysis
@@ -292,7 +452,7 @@ class PostgreDB:
             },
             # Check if the media title to insert is already in the database
             'check_media_title':{
-                'query':"SELECT id_text FROM mediatitles WHERE type='title' AND id_media_aut=%s AND original_text=%s AND author=%s",
+                'query':"SELECT id_text FROM mediatitles WHERE type='title' AND id_media_aut=%s AND text_hash=md5(%s) AND author=%s",
                 'fields':['id_media_aut', 'original_text', 'author']
             },
             # Get the required comments to perform a CommentsSentiments analysis
@@ -342,7 +502,7 @@ class PostgreDB:
             },
             # Check if a text sentiment analysis already exists
             'check_comment_sentiment':{
-                'query':'SELECT id_comment_sentiment FROM commentsentiments WHERE original_text=%s',
+                'query':'SELECT id_comment_sentiment FROM commentsentiments WHERE text_hash=md5(%s)',
                 'fields':["original_text"]
             },
             # Get the CommentSentiment analysis results to plot them directly
@@ -360,9 +520,20 @@ class PostgreDB:
                 'fields':["comment_date_ini", "comment_date_fin", "media_date_ini", "media_date_fin",
                           "username", "social_media"]
             },
+            # Get the sentiments of the analysed comments as well as their authors
+            # in a single query, joining the texts through their hashes
+            'get_comment_sentiments_and_authors':{
+                'query':"SELECT c.date, c.author, s.sentiment FROM mediacomments c JOIN commentsentiments s "+
+                    "ON s.text_hash=c.text_hash AND s.original_text=c.original_text "+
+                    "WHERE c.type='comment' AND c.date>=%s AND c.date<=%s AND c.id_media_aut IN "+
+                    "(SELECT id_media_aut FROM medias WHERE type='common' AND date>=%s AND date<=%s AND id_profile IN "+
+                    "(SELECT id_profile FROM profiles WHERE username=%s AND social_media=%s))",
+                'fields':["comment_date_ini", "comment_date_fin", "media_date_ini", "media_date_fin",
+                          "username", "social_media"]
+            },
             # Get the sentiment from a analysed comment 
             'get_comment_sentiment':{
-                'query':"SELECT sentiment FROM commentsentiments WHERE original_text=%s",
+                'query':"SELECT sentiment FROM commentsentiments WHERE text_hash=md5(%s)",
                 'fields':["original_text"]
             },
             # Check if there are similar UserBehaviours analysis before inserting a new one
@@ -377,6 +548,23 @@ class PostgreDB:
                     'date_ini=%s AND date_fin=%s AND id_user=%s',
                 'fields':['date_ini', 'date_fin', 'id_user']
             },
+            
+            # FOR THE CRAWL SCHEDULER
+            ## Check if the user to track is already in the database
+            'check_tracked_user':{
+                'query':'SELECT id_tracked_user FROM trackedusers WHERE username=%s AND social_media=%s',
+                'fields':['username', 'social_media']
+            },
+            ## Get the active users whose data are older than their freshness period
+            ## and which are not waiting to be downloaded, sorted by priority
+            'get_due_tracked_users':{
+                'query':"SELECT username, social_media, priority FROM trackedusers WHERE active AND "+
+                    "(last_crawl IS NULL OR last_crawl <= NOW() - freshness_hours * INTERVAL '1 hour') AND "+
+                    "(last_enqueued IS NULL OR last_enqueued <= last_crawl OR "+
+                    "last_enqueued <= NOW() - %s * INTERVAL '1 hour') "+
+                    "ORDER BY priority DESC, last_crawl ASC NULLS FIRST LIMIT %s",
+                'fields':['enqueue_timeout', 'n_users']
+            },
         }
         
         ## 2. INSERT QUERIES
@@ -478,6 +666,13 @@ class PostgreDB:
                 'fields':["date_fin", "date_ini", "id_user", "n_haters", "n_likers", "time"],
                 'table':"testuserbehaviours"
             },
+            # Insert a new user to download their data periodically
+            'insert_test_tracked_user':{
+                'query':"INSERT INTO testtrackedusers (freshness_hours, priority, social_media, username) "+
+                    "VALUES (%s, %s, %s, %s) RETURNING id_tracked_user",
+                'fields':["freshness_hours", "priority", "social_media", "username"],
+                'table':"testtrackedusers"
+            },
             
             ###################################### REAL ANALYSIS ##################################
             # FOR PROFILES_EVOLUTION AND PROFILES_ACTIVITY
@@ -563,6 +758,13 @@ class PostgreDB:
                 'fields':["date_fin", "date_ini", "id_user", "n_haters", "n_likers", "time"],
                 'table':"userbehaviours"
             },
+            # Insert a new user to download their data periodically
+            'insert_tracked_user':{
+                'query':"INSERT INTO trackedusers (freshness_hours, priority, social_media, username) "+
+                    "VALUES (%s, %s, %s, %s) RETURNING id_tracked_user",
+                'fields':["freshness_hours", "priority", "social_media", "username"],
+                'table':"trackedusers"
+            },
         }
         
         # 3. INSERT-SELECT QUERIES
@@ -587,6 +789,8 @@ class PostgreDB:
             'insert_test_sentiment_analysis':'check_test_sentiment_analysis',
             # FOR USER BEHAVIOURS ANALYSIS
             'insert_test_user_behaviour':'check_test_user_behaviour',
+            # FOR THE CRAWL SCHEDULER
+            'insert_test_tracked_user':'check_test_tracked_user',
             
             ######################### REAL ANALYSIS #########################
             # FOR PROFILES ANALYSIS
@@ -604,12 +808,54 @@ class PostgreDB:
             'insert_sentiment_analysis':'check_sentiment_analysis',
             # FOR USER BEHAVIOURS ANALYSIS
             'insert_user_behaviour':'check_user_behaviour',
+            # FOR THE CRAWL SCHEDULER
+            'insert_tracked_user':'check_tracked_user',
+        }
+        
+        # 4. UPDATE QUERIES
+        self.update_queries = {
+            ######################### TEST ANALYSIS #########################
+            # FOR THE CRAWL SCHEDULER
+            ## Save when the download of the user data has been enqueued
+            'update_test_tracked_user_enqueued':{
+                'query':'UPDATE testtrackedusers SET last_enqueued=NOW() WHERE username=%s AND social_media=%s',
+                'fields':['username', 'social_media']
+            },
+            ## Save when the user data have been downloaded
+            'update_test_tracked_user_crawl':{
+                'query':'UPDATE testtrackedusers SET last_crawl=NOW() WHERE username=%s AND social_media=%s',
+                'fields':['username', 'social_media']
+            },
+            
+            ######################### REAL ANALYSIS #########################
+            # FOR THE CRAWL SCHEDULER
+            ## Save when the download of the user data has been enqueued
+            'update_tracked_user_enqueued':{
+                'query':'UPDATE trackedusers SET last_enqueued=NOW() WHERE username=%s AND social_media=%s',
+                'fields':['username', 'social_media']
+            },
+            ## Save when the user data have been downloaded
+            'update_tracked_user_crawl':{
+                'query':'UPDATE trackedusers SET last_crawl=NOW() WHERE username=%s AND social_media=%s',
+                'fields':['username', 'social_media']
+            },
+        }
+        # Materialized views of the daily metrics of the users
+        self.materialized_views = {
+            'test':['testprofilesdaily', 'testmediasdaily'],
+            'real':['profilesdaily', 'mediasdaily']
+        }
+        # Tables partitioned by month. The comments go first because they
+        # reference the partitions of the medias.
+        self.partitioned_tables = {
+            'test':['testmediacomments', 'testmedias'],
+            'real':['mediacomments', 'medias']
         }
         
     def connect_to_database(self):
         """
-        Makes the connection to the database through the environment variables which
-        contains the credentials.
+        Gets the pool of connections to the database through the environment
+        variables which contains the credentials.
 
         Raises
         ------
@@ -618,7 +864,7 @@ class PostgreDB:
 
         Returns
         -------
-        The cursor object which allows to make the queries.
+        The pool of connections which allows to make the queries.
         """
         # Get the PostgreSQL credentials
         user = os.environ.get("POSTGRES_USER") 
@@ -627,18 +873,237 @@ class PostgreDB:
         if (type(user) != str or user == "" or type(pswd) != str or pswd == ""):
             raise InvalidDatabaseCredentials("ERROR. The PostgreSQL credentials should be non-empty strings.")
         # Try to connect to the database        
+        self.pool, self.pool_semaphore = get_postgres_pool(self.database_name, user, pswd)
+        return self.pool
+    
+    def get_healthy_connection(self):
+        """
+        Gets a connection of the pool which is still open. The closed connections
+        are discarded. If every connection of the pool is in use, it waits
+        until one of them is released.
+
+        Returns
+        -------
+        An open connection of the pool.
+        """
+        self.pool_semaphore.acquire()
         try:
-            self.connection = psycopg2.connect(host="localhost", user=user, 
-                               password=pswd, database=self.database_name)
-            self.cursor = self.connection.cursor()
-            return self.cursor
-        except Exception: # pragma no cover
-            raise InvalidDatabaseCredentials("ERROR. The provided PostgreSQL credentials are wrong.")
+            connection = self.pool.getconn()
+            # Replace the connections which have been closed
+            while (connection.closed != 0):
+                self.pool.putconn(connection, close=True)
+                connection = self.pool.getconn()
+            return connection
+        except Exception:
+            self.pool_semaphore.release()
+            raise
     
-    def get_data(self, query, values={}):
+    @contextlib.contextmanager
+    def get_cursor(self, name=None):
         """
-        Makes a predefined query in a specific table and returns the matched records.
-        In order to prevent SQL injection, non-predefined queries will not be allowed.
+        Gets a new cursor of a connection of the pool in order to make an
+        operation. The transaction is committed when the operation finishes and
+        rolled back if it fails. Then, the connection is returned to the pool,
+        or discarded if it has been lost.
+
+        Parameters
+        ----------
+        name : str, optional
+            It's the name of the cursor in order to create a server-side cursor.
+            The default is None, which creates a client-side cursor.
+
+        Returns
+        -------
+        A context manager which yields the cursor.
+        """
+        connection = self.get_healthy_connection()
+        try:
+            with connection.cursor(name=name) as cursor:
+                yield cursor
+            connection.commit()
+        except Exception:
+            # The transactions of the lost connections can't be rolled back
+            if (connection.closed == 0):
+                connection.rollback()
+            raise
+        finally:
+            self.pool.putconn(connection, close=connection.closed != 0)
+            self.pool_semaphore.release()
+    
+    @contextlib.contextmanager
+    def get_savepoint_cursor(self, connection, name=None):
+        """
+        Gets a new cursor of a connection which is already in use in order to
+        make an operation inside a savepoint of its transaction. The savepoint
+        is released when the operation finishes and rolled back if it fails,
+        so the rest of the transaction is kept.
+
+        Parameters
+        ----------
+        connection : connection
+            It's the connection of the transaction.
+        name : str, optional
+            It's the name of the cursor in order to create a server-side cursor.
+            The default is None, which creates a client-side cursor.
+
+        Returns
+        -------
+        A context manager which yields the cursor.
+        """
+        savepoint = "operation_"+uuid.uuid4().hex
+        with connection.cursor() as savepoint_cursor:
+            savepoint_cursor.execute("SAVEPOINT "+savepoint)
+        try:
+            with connection.cursor(name=name) as cursor:
+                yield cursor
+        except Exception:
+            if (connection.closed == 0):
+                with connection.cursor() as savepoint_cursor:
+                    savepoint_cursor.execute("ROLLBACK TO SAVEPOINT "+savepoint)
+            raise
+        with connection.cursor() as savepoint_cursor:
+            savepoint_cursor.execute("RELEASE SAVEPOINT "+savepoint)
+    
+    def run_operation(self, operation, cursor=None):
+        """
+        Runs an operation with a new cursor. If the connection has been lost,
+        the operation will be run again with another connection of the pool.
+        The rest of the errors, such as a cancelled query or a serialization
+        failure, are raised without running the operation again because its
+        transaction has been rolled back. If a cursor is provided, the operation
+        is made inside a savepoint of its transaction instead.
+
+        Parameters
+        ----------
+        operation : function
+            It's the function which receives the cursor and makes the queries.
+        cursor : cursor, optional
+            It's the cursor of a transaction in progress, such as the one of
+            the batches of iter_data. The default is None, which means a new
+            connection of the pool.
+
+        Returns
+        -------
+        The result of the operation.
+        """
+        # Check if the operation is part of a transaction in progress
+        if (cursor != None):
+            with self.get_savepoint_cursor(cursor.connection) as savepoint_cursor:
+                return operation(savepoint_cursor)
+        
+        connection = None
+        try:
+            with self.get_cursor() as cursor:
+                connection = cursor.connection
+                return operation(cursor)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # Check if the connection has been lost
+            if (connection == None or connection.closed == 0):
+                raise
+        with self.get_cursor() as cursor:
+            return operation(cursor)
+    
+    def get_prepared_query(self, query):
+        """
+        Replaces the placeholders of a query (%s) by the numbered parameters of
+        the prepared statements ($1, $2...).
+
+        Parameters
+        ----------
+        query : str
+            It's the query with the placeholders of psycopg2.
+
+        Returns
+        -------
+        A string with the query to prepare.
+        """
+        parts = query.replace("%%", "%").split("%s")
+        prepared_query = parts[0]
+        for i in range(1, len(parts)):
+            prepared_query += "$"+str(i)+parts[i]
+        return prepared_query
+    
+    def execute_query(self, cursor, name, query, values=[]):
+        """
+        Makes a predefined query with the provided cursor. If the queries are
+        prepared, the query is prepared the first time it's made in the
+        connection of the cursor and then the prepared statement is executed.
+
+        Parameters
+        ----------
+        cursor : cursor
+            It's the cursor to make the query.
+        name : str
+            It's the name of the prepared statement of the query.
+        query : str
+            It's the predefined query to make.
+        values : list, optional
+            It's the list of values to make the query. The default is [].
+
+        Returns
+        -------
+        None.
+        """
+        if (not self.prepare_queries):
+            cursor.execute(query, values)
+            return
+        connection = cursor.connection
+        if (name not in connection.prepared_queries):
+            cursor.execute("PREPARE "+name+" AS "+self.get_prepared_query(query))
+            connection.prepared_queries.add(name)
+        if (len(values) > 0):
+            cursor.execute("EXECUTE "+name+" ("+", ".join(["%s"]*len(values))+")", values)
+        else:
+            cursor.execute("EXECUTE "+name)
+    
+    def fetch_prepared(self, cursor, name, query, values=[]):
+        """
+        Makes a predefined query with the provided cursor, as a prepared statement
+        if the queries are prepared, and gets all the matched records.
+
+        Parameters
+        ----------
+        cursor : cursor
+            It's the cursor to make the query.
+        name : str
+            It's the name of the prepared statement of the query.
+        query : str
+            It's the predefined query to make.
+        values : list, optional
+            It's the list of values to make the query. The default is [].
+
+        Returns
+        -------
+        A list of tuples with the matched records.
+        """
+        self.execute_query(cursor, name, query, values)
+        return cursor.fetchall()
+    
+    def fetch_all(self, cursor, query, values=[]):
+        """
+        Makes a query with the provided cursor and gets all the matched records.
+        It's used by the operations which are run with their own cursor.
+
+        Parameters
+        ----------
+        cursor : cursor
+            It's the cursor to make the query.
+        query : str
+            It's the query to make.
+        values : list, optional
+            It's the list of values to make the query. The default is [].
+
+        Returns
+        -------
+        A list of tuples with the matched records.
+        """
+        cursor.execute(query, values)
+        return cursor.fetchall()
+    
+    def check_select_values(self, query, values):
+        """
+        Checks if the provided query is one of the predefined select queries and
+        if the provided values are the required ones to make it.
 
         Parameters
         ----------
@@ -646,8 +1111,7 @@ class PostgreDB:
             It's the predefined query to make.
         values : dict
             It's the dict which contains the values to make the provided query.
-            It could be not provided if the query does not need any additional parameters.
-        
+
         Raises
         ------
         InvalidQuery
@@ -657,8 +1121,7 @@ class PostgreDB:
 
         Returns
         -------
-        A tuple of lists with the matched results and the values of the specific
-        chosen fields.
+        None.
         """
         # Check the provided predefined query
         if (type(query) != str or query == ""):
@@ -675,17 +1138,162 @@ class PostgreDB:
         value_fields = list(values.keys())
         if (query_fields != value_fields):
             raise InvalidQueryValues("ERROR. Some of the required values are missing or are wrong.")
-    
+
+    def get_data(self, query, values={}, cursor=None):
+        """
+        Makes a predefined query in a specific table and returns the matched records.
+        In order to prevent SQL injection, non-predefined queries will not be allowed.
+
+        Parameters
+        ----------
+        query : str
+            It's the predefined query to make.
+        values : dict
+            It's the dict which contains the values to make the provided query.
+            It could be not provided if the query does not need any additional parameters.
+        cursor : cursor, optional
+            It's the cursor of a transaction in progress to make the query with.
+            The default is None, which means a new connection of the pool.
+        
+        Raises
+        ------
+        InvalidQuery
+            If the provided query is not a non-empty string or is not one of the defined queries.
+        InvalidQueryValues
+            If the provided values for the selected query are not valid.
+
+        Returns
+        -------
+        A tuple of lists with the matched results and the values of the specific
+        chosen fields.
+        """
+        self.check_select_values(query, values)
         # Make the final query
-        try: 
-            self.cursor.execute(self.select_queries[query]['query'], list(values.values()))
-            matches = self.cursor.fetchall()
-        except: #pragma no cover
-            self.connect_to_database()
-            self.cursor.execute(self.select_queries[query]['query'], list(values.values()))
-            matches = self.cursor.fetchall()
+        return self.run_operation(lambda cursor: self.fetch_prepared(cursor, "select_"+query,
+                    self.select_queries[query]['query'], list(values.values())), cursor)
+    
+    def iter_data(self, query, values={}, batch_size=1000):
+        """
+        Makes a predefined query in a specific table and returns the matched
+        records in batches. The records are read through a server-side cursor,
+        so only one batch is kept in memory at the same time. The connection
+        is used until all the batches have been read or the iteration stops.
+        Each batch is returned with a cursor of the same connection, so the
+        operations made with it while the batch is processed don't need another
+        connection of the pool. They're committed before reading the next batch
+        and rolled back if the reading is stopped before.
+
+        Parameters
+        ----------
+        query : str
+            It's the predefined query to make.
+        values : dict
+            It's the dict which contains the values to make the provided query.
+            It could be not provided if the query does not need any additional parameters.
+        batch_size : int, optional
+            It's the maximum number of records of each batch. The default is 1000.
         
-        return matches
+        Raises
+        ------
+        InvalidQuery
+            If the provided query is not a non-empty string or is not one of the defined queries.
+        InvalidQueryValues
+            If the provided values for the selected query or the size of the
+            batches are not valid.
+
+        Returns
+        -------
+        A generator of tuples with the list of matched results and the cursor
+        to make the operations of the batch.
+        """
+        self.check_select_values(query, values)
+        # Check the size of the batches
+        if (type(batch_size) != int or batch_size <= 0):
+            raise InvalidQueryValues("ERROR. The size of the batches should be a number greater than 0.")
+        return self.iter_cursor(query, list(values.values()), batch_size)
+    
+    def explain_data(self, query, values={}):
+        """
+        Gets the execution plan of a predefined query, running it with
+        EXPLAIN (ANALYZE, BUFFERS) in order to check which indexes are used,
+        the time of each step and the read blocks. The query is run inside a
+        transaction which is rolled back.
+
+        Parameters
+        ----------
+        query : str
+            It's the predefined query to explain.
+        values : dict
+            It's the dict which contains the values to make the provided query.
+            It could be not provided if the query does not need any additional parameters.
+        
+        Raises
+        ------
+        InvalidQuery
+            If the provided query is not a non-empty string or is not one of the defined queries.
+        InvalidQueryValues
+            If the provided values for the selected query are not valid.
+
+        Returns
+        -------
+        A dict with the execution plan in JSON format.
+        """
+        self.check_select_values(query, values)
+        def explain(cursor):
+            # Undo the changes of the query without ending the transaction
+            cursor.execute("SAVEPOINT explain_query")
+            plan = self.fetch_all(cursor, "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "+
+                                  self.select_queries[query]['query'], list(values.values()))
+            cursor.execute("ROLLBACK TO SAVEPOINT explain_query")
+            return plan[0][0][0]
+        return self.run_operation(explain)
+    
+    def iter_cursor(self, query, values, batch_size):
+        """
+        Reads the records of a checked predefined query in batches with a named
+        cursor of its own connection. The cursor is kept after each commit
+        (WITH HOLD), so the operations made with the cursor of each batch are
+        committed before reading the next one. The operations of the last batch
+        are rolled back if the reading is stopped or fails.
+
+        Parameters
+        ----------
+        query : str
+            It's the checked predefined query to make.
+        values : list
+            It's the list of values to make the query.
+        batch_size : int
+            It's the maximum number of records of each batch.
+
+        Yields
+        ------
+        Each batch of matched records as a list of tuples, along with the
+        cursor to make the operations of the batch.
+        """
+        with self.get_cursor() as cursor:
+            connection = cursor.connection
+            named_cursor = connection.cursor(name="iter_"+uuid.uuid4().hex, withhold=True)
+            named_cursor.itersize = batch_size
+            declared = False
+            try:
+                named_cursor.execute(self.select_queries[query]['query'], values)
+                # The server keeps the records of the held cursor after the commit
+                connection.commit()
+                declared = True
+                batch = named_cursor.fetchmany(batch_size)
+                while (len(batch) > 0):
+                    yield batch, cursor
+                    # Store the operations of the batch before reading the next one
+                    connection.commit()
+                    batch = named_cursor.fetchmany(batch_size)
+            finally:
+                # Undo the operations of the last batch if the reading has been
+                # stopped, and close the held cursor, which outlives the transactions
+                if (connection.closed == 0):
+                    connection.rollback()
+                    if (declared):
+                        named_cursor.close()
+                        connection.commit()
     
     def get_table_size(self, table):
         """
@@ -716,30 +1324,19 @@ class PostgreDB:
             raise InvalidTableName("ERROR. The provided table name does not exist in the PostgreSQL database.")
 
         query = "SELECT count(*) FROM "+table
-        try:
-            self.cursor.execute(query)
-            return self.cursor.fetchone()[0]
-        except: #pragma no cover
-            self.connect_to_database()
-            self.cursor.execute(query)
-            return self.cursor.fetchone()[0]
+        return self.run_operation(lambda cursor: self.fetch_all(cursor, query))[0][0]
         
-    def insert_data(self, query, new_values, check_values=[]):
+    def check_insert_values(self, query, new_values):
         """
-        Inserts new records in a specific table if the new item does not already
-        exist. Each table will have its own inserted conditions.
+        Checks the provided insert query and the new items to insert.
 
         Parameters
         ----------
         query : str
             It's the inserted query to make.
         new_values : list of dicts
-            It's the list which contains the new items to insert in different dicts.
-            In this way, one or multiple items could be inserted.
-        check_values : list of dicts
-            It's the list which contains the values related to each data sample to
-            insert in order to check if it's already in the database.
-        
+            It's the list which contains the new items to insert.
+
         Raises
         ------
         InvalidQuery
@@ -749,8 +1346,7 @@ class PostgreDB:
 
         Returns
         -------
-        A list of tuples which contains the id or the several ids returned from the
-        inserted queries in a specific table in the Postgres database.
+        None.
         """
         # Check the provided query
         if (type(query) != str or query == ""):
@@ -765,6 +1361,39 @@ class PostgreDB:
         keys_new_values = [True for item in new_values if (list(item.keys()) == self.insert_queries[query]['fields'])]
         if (len(keys_new_values) != len (new_values)):
             raise InvalidQueryValues("ERROR. There are some missing keys in the new values.")
+    
+    def insert_data(self, query, new_values, check_values=[], cursor=None):
+        """
+        Inserts new records in a specific table if the new item does not already
+        exist. Each table will have its own inserted conditions.
+
+        Parameters
+        ----------
+        query : str
+            It's the inserted query to make.
+        new_values : list of dicts
+            It's the list which contains the new items to insert in different dicts.
+            In this way, one or multiple items could be inserted.
+        check_values : list of dicts
+            It's the list which contains the values related to each data sample to
+            insert in order to check if it's already in the database.
+        cursor : cursor, optional
+            It's the cursor of a transaction in progress to insert the items with.
+            The default is None, which means a new connection of the pool.
+        
+        Raises
+        ------
+        InvalidQuery
+            If the provided query is not a non-empty string or is not one of the insert queries.
+        InvalidQueryValues
+            If the provided values for the insert query are not valid.
+
+        Returns
+        -------
+        A list of tuples which contains the id or the several ids returned from the
+        inserted queries in a specific table in the Postgres database.
+        """
+        self.check_insert_values(query, new_values)
         
         # Check the check values, if they are provided
         data_to_insert = new_values
@@ -782,7 +1411,7 @@ class PostgreDB:
             # Check if the new item to insert is already in the table
             data_to_insert = []
             for i in range(0, len(check_values)):
-                result = self.get_data(self.check_queries[query], check_values[i])
+                result = self.get_data(self.check_queries[query], check_values[i], cursor)
                 if (len(result) == 0):
                     data_to_insert.append(new_values[i])
                 
@@ -791,15 +1420,390 @@ class PostgreDB:
         new_ids = []
         for item in data_to_insert:
             try:
-                self.cursor.execute(self.insert_queries[query]['query'], list(item.values()))
-                self.connection.commit()
-                result = list(self.cursor.fetchone())
-                new_ids.extend(result)
-            except: 
+                new_ids.extend(self.run_operation(lambda cursor: self.fetch_prepared(cursor, "insert_"+query,
+                                    self.insert_queries[query]['query'], list(item.values())), cursor)[0])
+            except Exception: 
                 raise InvalidQueryValues("ERROR. The new data couldn't be inserted.")
         
         return new_ids
     
+    def get_batch_insert_query(self, query):
+        """
+        Splits a predefined insert query into the statement and the template
+        of each row in order to insert several rows in a single statement. The
+        rows which already exist, according to the unique indexes of the table,
+        will be skipped.
+
+        Parameters
+        ----------
+        query : str
+            It's the predefined insert query.
+
+        Returns
+        -------
+        A tuple with the statement and the template of each row.
+        """
+        match = re.match(r"^(.*?)\s*VALUES\s*(\(.*\))\s*(RETURNING .*)$",
+                         self.insert_queries[query]['query'], re.DOTALL)
+        statement = match.group(1)+" VALUES %s ON CONFLICT DO NOTHING "+match.group(3)
+        return statement, match.group(2)
+    
+    def insert_batch(self, query, new_values, page_size=1000, cursor=None):
+        """
+        Inserts a batch of new records in a specific table with a single statement
+        per page of records and only one commit. The records which are already
+        in the table, according to the fields of the related check query, will
+        be skipped by the unique index of the table.
+
+        Parameters
+        ----------
+        query : str
+            It's the inserted query to make.
+        new_values : list of dicts
+            It's the list which contains the new items to insert in different dicts.
+        page_size : int, optional
+            It's the maximum number of records of each statement. The default is 1000.
+        cursor : cursor, optional
+            It's the cursor of a transaction in progress to insert the items with.
+            The default is None, which means a new connection of the pool.
+
+        Raises
+        ------
+        InvalidQuery
+            If the provided query is not a non-empty string or is not one of the insert queries.
+        InvalidQueryValues
+            If the provided values for the insert query are not valid or they
+            couldn't be inserted.
+
+        Returns
+        -------
+        A list with the ids of the newly inserted records. The skipped records
+        are not included, so the positions of the ids don't match the ones of
+        the provided items.
+        """
+        self.check_insert_values(query, new_values)
+        # Check the provided page size
+        if (type(page_size) != int or page_size <= 0):
+            raise InvalidQueryValues("ERROR. The page size should be a number greater than 0.")
+        
+        statement, template = self.get_batch_insert_query(query)
+        try:
+            rows = self.run_operation(lambda cursor: psycopg2.extras.execute_values(cursor, statement,
+                        [list(item.values()) for item in new_values],
+                        template=template, page_size=page_size, fetch=True), cursor)
+        except Exception:
+            raise InvalidQueryValues("ERROR. The new data couldn't be inserted.")
+        
+        return [row[0] for row in rows]
+    
+    def split_row_template(self, template):
+        """
+        Splits the template of a row of an insert query into the expression of
+        each column. The commas inside parentheses and quotes are not taken into
+        account.
+
+        Parameters
+        ----------
+        template : str
+            It's the template of a row, such as "(%s, TO_DATE(%s,'DD-MM-YYYY'), 'common')".
+
+        Returns
+        -------
+        A list with the expression of each column.
+        """
+        expressions = []
+        current = ""
+        depth = 0
+        quoted = False
+        for char in template.strip()[1:-1]:
+            if (char == "'"):
+                quoted = not quoted
+            elif (not quoted and char == "("):
+                depth += 1
+            elif (not quoted and char == ")"):
+                depth -= 1
+            elif (not quoted and depth == 0 and char == ","):
+                expressions.append(current.strip())
+                current = ""
+                continue
+            current += char
+        expressions.append(current.strip())
+        return expressions
+    
+    def get_bulk_load_queries(self, cursor, query):
+        """
+        Builds the queries to load the records of a predefined insert query
+        through a staging table whose columns are texts. The records are copied
+        to the staging table and then merged into the target table converting
+        each column to its type, as defined in the information schema, and
+        skipping the records which are already in the table.
+
+        Parameters
+        ----------
+        cursor : cursor
+            It's the cursor to get the types of the columns.
+        query : str
+            It's the predefined insert query.
+
+        Returns
+        -------
+        A dict with the queries to create, empty and fill the staging table and
+        the query to merge it into the target table.
+        """
+        statement, template = self.get_batch_insert_query(query)
+        match = re.match(r"^INSERT INTO (\w+)\s*\((.*?)\)", statement, re.DOTALL)
+        table = match.group(1)
+        columns = [column.strip() for column in match.group(2).split(",")]
+        fields = self.insert_queries[query]['fields']
+        staging = "staging_"+table
+        
+        # Get the type of each column of the target table
+        column_types = dict(self.fetch_all(cursor, "SELECT column_name, data_type FROM "+
+            "information_schema.columns WHERE table_schema='public' AND table_name=%s", [table]))
+        # Read each field from the staging table and convert it to its type
+        field_iter = iter(fields)
+        expressions = []
+        for column, expression in zip(columns, self.split_row_template(template)):
+            while ("%s" in expression):
+                expression = expression.replace("%s", "s."+next(field_iter), 1)
+            expressions.append("CAST("+expression+" AS "+column_types[column]+")")
+        
+        return {"create":"CREATE TEMP TABLE IF NOT EXISTS "+staging+" ("+
+                    ", ".join([field+" TEXT" for field in fields])+")",
+                "empty":"TRUNCATE "+staging,
+                "copy":"COPY "+staging+" ("+", ".join(fields)+") FROM STDIN WITH (FORMAT csv)",
+                "merge":"INSERT INTO "+table+" ("+", ".join(columns)+") SELECT "+
+                    ", ".join(expressions)+" FROM "+staging+" s ON CONFLICT DO NOTHING"}
+    
+    def get_copy_rows(self, new_values):
+        """
+        Writes a list of records in CSV format in order to copy them to a table.
+        The None values are written as NULL values and the rest of them as
+        quoted texts.
+
+        Parameters
+        ----------
+        new_values : list of dicts
+            It's the list of records to write.
+
+        Returns
+        -------
+        A file object with the records in CSV format.
+        """
+        lines = []
+        for item in new_values:
+            lines.append(",".join(['' if value == None else '"'+str(value).replace('"', '""')+'"'
+                                   for value in item.values()]))
+        return io.StringIO("\n".join(lines)+"\n")
+    
+    def bulk_load(self, query, new_values, batch_size=10000, progress=None):
+        """
+        Loads a large amount of new records in a specific table. The records
+        are copied in batches to a staging table with COPY and then merged into
+        the target table in a single statement per batch. The records which are
+        already in the table, according to the fields of the related check
+        query, will be skipped. Each batch is committed separately.
+
+        Parameters
+        ----------
+        query : str
+            It's the inserted query whose table and fields will be used.
+        new_values : iterable of dicts
+            They're the new items to insert. It could be a generator, so the
+            records are not loaded in memory at the same time.
+        batch_size : int, optional
+            It's the number of records of each batch. The default is 10000.
+        progress : function, optional
+            It's the function which receives the number of read records, the
+            number of inserted records and the elapsed seconds after each batch.
+            The default is None.
+
+        Raises
+        ------
+        InvalidQuery
+            If the provided query is not a non-empty string or is not one of the insert queries.
+        InvalidQueryValues
+            If the provided values or batch size are not valid or the records
+            couldn't be inserted.
+
+        Returns
+        -------
+        A dict with the number of read records and the number of inserted ones.
+        """
+        # Check the provided query and batch size
+        if (type(query) != str or query not in self.insert_queries):
+            raise InvalidQuery("ERROR. The provided query is not valid.")
+        if (type(batch_size) != int or batch_size <= 0):
+            raise InvalidQueryValues("ERROR. The batch size should be a number greater than 0.")
+        
+        start = time.perf_counter()
+        n_read = 0
+        n_inserted = 0
+        batch = []
+        value_iter = iter(new_values)
+        # The staging table only exists in the connection which created it
+        with self.get_cursor() as cursor:
+            queries = self.get_bulk_load_queries(cursor, query)
+            cursor.execute(queries["create"])
+            while (True):
+                item = next(value_iter, None)
+                if (item != None):
+                    batch.append(item)
+                if (len(batch) == batch_size or (item == None and len(batch) > 0)):
+                    self.check_insert_values(query, batch)
+                    try:
+                        cursor.execute(queries["empty"])
+                        cursor.copy_expert(queries["copy"], self.get_copy_rows(batch))
+                        cursor.execute(queries["merge"])
+                        n_inserted += cursor.rowcount
+                        cursor.connection.commit()
+                    except Exception:
+                        raise InvalidQueryValues("ERROR. The new data couldn't be inserted.")
+                    n_read += len(batch)
+                    batch = []
+                    if (progress != None):
+                        progress(n_read, n_inserted, time.perf_counter()-start)
+                if (item == None):
+                    break
+        
+        return {"read":n_read, "inserted":n_inserted}
+    
+    def update_data(self, query, values):
+        """
+        Makes a predefined update query in order to modify some existing records.
+        In order to prevent SQL injection, non-predefined queries will not be allowed.
+
+        Parameters
+        ----------
+        query : str
+            It's the predefined update query to make.
+        values : dict
+            It's the dict which contains the values to make the provided query.
+
+        Raises
+        ------
+        InvalidQuery
+            If the provided query is not a non-empty string or is not one of the update queries.
+        InvalidQueryValues
+            If the provided values for the update query are not valid.
+
+        Returns
+        -------
+        An integer which is the number of updated records.
+        """
+        # Check the provided query
+        if (type(query) != str or query == ""):
+            raise InvalidQuery("ERROR. The provided query should be a non-empty string.")
+        # Check if the provided query exists
+        if (query not in self.update_queries):
+            raise InvalidQuery("ERROR. The provided query is not valid.")
+        # Check the provided values
+        if (type(values) != dict or list(values.keys()) != self.update_queries[query]['fields']):
+            raise InvalidQueryValues("ERROR. Some of the required values are missing or are wrong.")
+        
+        def update(cursor):
+            self.execute_query(cursor, "update_"+query, self.update_queries[query]['query'],
+                               list(values.values()))
+            return cursor.rowcount
+        try:
+            return self.run_operation(update)
+        except Exception: 
+            raise InvalidQueryValues("ERROR. The data couldn't be updated.")
+    
+    def refresh_views(self, mode):
+        """
+        Refreshes the materialized views of the daily metrics of the users with
+        the stored profiles and medias. They're refreshed concurrently, so they
+        could be read while they're being refreshed.
+
+        Parameters
+        ----------
+        mode : str
+            It's the type of views to refresh, 'test' or 'real'.
+
+        Raises
+        ------
+        InvalidTableName
+            If the provided mode is not valid.
+
+        Returns
+        -------
+        A list with the names of the refreshed views.
+        """
+        # Check the provided mode
+        if (mode not in self.materialized_views):
+            raise InvalidTableName("ERROR. The mode of the views should be 'test' or 'real'.")
+        # Refresh each view in its own transaction, so its lock is released as
+        # soon as it's refreshed and a failure doesn't undo the previous views
+        connection = self.get_healthy_connection()
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                for view in self.materialized_views[mode]:
+                    cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY "+view)
+        finally:
+            if (connection.closed == 0):
+                connection.autocommit = False
+            self.pool.putconn(connection, close=connection.closed != 0)
+            self.pool_semaphore.release()
+        return self.materialized_views[mode]
+    
+    def maintain_partitions(self, mode, months_ahead=3, retention_months=None):
+        """
+        Creates the monthly partitions of the posts and comments up to some
+        months ahead of the current one, so the new records never fall into
+        their default partitions. If a retention period is provided, the
+        partitions older than it are detached from their tables, without their
+        foreign keys, in order to archive them. The partitions are created and
+        detached in different transactions.
+
+        Parameters
+        ----------
+        mode : str
+            It's the type of tables to maintain, 'test' or 'real'.
+        months_ahead : int
+            It's the number of months after the current one with a partition.
+        retention_months : int, optional
+            It's the number of months before the current one which are kept.
+
+        Raises
+        ------
+        InvalidTableName
+            If the provided mode is not valid.
+        InvalidQueryValues
+            If the number of months are not numbers greater than or equal to 0.
+
+        Returns
+        -------
+        A dict with the names of the created and the detached partitions.
+        """
+        # Check the provided mode
+        if (mode not in self.partitioned_tables):
+            raise InvalidTableName("ERROR. The mode of the tables should be 'test' or 'real'.")
+        # Check the number of months
+        if (type(months_ahead) != int or months_ahead < 0 or
+            (retention_months != None and (type(retention_months) != int or retention_months < 0))):
+            raise InvalidQueryValues("ERROR. The number of months should be a number greater than or equal to 0.")
+        def create(cursor):
+            created = []
+            for table in self.partitioned_tables[mode]:
+                cursor.execute("SELECT public.create_month_partitions(%s, CURRENT_DATE, %s)", (table, months_ahead))
+                created.extend([row[0] for row in cursor.fetchall()])
+            return created
+        def detach(cursor):
+            detached = []
+            # The comments are detached before the posts which they reference
+            for table in self.partitioned_tables[mode]:
+                cursor.execute("SELECT public.detach_old_partitions(%s, %s)", (table, retention_months))
+                detached.extend([row[0] for row in cursor.fetchall()])
+            return detached
+        # The new partitions are kept even if the old ones can't be detached
+        partitions = {"created":self.run_operation(create), "detached":[]}
+        # Check the retention period
+        if (retention_months != None):
+            partitions["detached"] = self.run_operation(detach)
+        return partitions
+    
     def empty_table(self, table):
         """
         Deletes all the records stored in a specific table without removing it.
@@ -829,5 +1833,5 @@ class PostgreDB:
         
         # Deletes all records from the table
         query = "DELETE FROM "+table
-        self.cursor.execute(query)
+        self.run_operation(lambda cursor: cursor.execute(query))
         return self.get_table_size(table) == 0
\ No newline at end of file
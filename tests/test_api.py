@@ -167,6 +167,30 @@ def test5_get_levpasha_instagram_posts_comments():
     except MaxRequestsExceed:
         print("Max requests exceed. Please wait to send more.")
 
+def test6_get_levpasha_instagram_posts_comments():
+    """
+    Test to check the method which gets the comments of the posts of a specific
+    user without providing a valid budget of comments. It will raise an exception.
+    """
+    with pytest.raises(InvalidLimit):
+        api.get_levpasha_instagram_posts_comments(search_user, [{'id_media':1}], max_comments=0)
+
+def test7_get_levpasha_instagram_posts_comments():
+    """
+    Test to check that the comments of the posts of a specific user are paginated
+    without exceeding the budgets of comments per post and per user.
+    """
+    try:
+        global posts
+        if (type(posts) == list and len(posts) > 0):
+            api_comments = Api()
+            comments = api_comments.get_levpasha_instagram_posts_comments(search_user, posts,
+                            max_comments_per_post=5, max_comments=10)
+            assert all(len(comment['texts']) <= 5 for comment in comments)
+            assert sum(len(comment['texts']) for comment in comments) <= 10
+    except MaxRequestsExceed:
+        print("Max requests exceed. Please wait to send more.")
+
 def test1_get_levpasha_instagram_data():
     """
     Test to check the method which gets Instagram data of a specific user account 
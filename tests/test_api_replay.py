@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests to check the right behaviour of the classes which record and replay the
+responses of the LevPasha Instagram API.
+
+@author: Lidia Sánchez Mérida
+"""
+import json
+import sys
+import tempfile
+import pytest
+sys.path.append("src")
+sys.path.append("src/data")
+from api import Api
+from api_replay import ReplayInstagramAPI, RecordingInstagramAPI, get_record_filename
+from exceptions import InvalidLimit, RecordNotFound
+
+# Directory with the recorded responses to test the classes with.
+record_dir = tempfile.mkdtemp()
+# Recorded responses of a user with one media and one comment
+responses = {
+    ("searchUsername", ("test_user",)):{"status":"ok", "user":{"pk":1, "username":"test_user",
+        "full_name":"Test User", "biography":"", "profile_pic_url":"", "follower_count":10,
+        "following_count":5, "media_count":1}},
+    ("getUserFeed", (1, "")):{"status":"ok", "more_available":False, "items":[{"id":"1_1",
+        "caption":{"text":"title"}, "taken_at":1603584000, "like_count":3, "comment_count":1}]},
+    ("getMediaComments", ("1_1", "")):{"status":"ok", "has_more_comments":False,
+        "comments":[{"user":{"username":"user1"}, "text":"nice"}]}
+    }
+for (request, args), response in responses.items():
+    with open(get_record_filename(record_dir, request, args), "w") as record_file:
+        json.dump(response, record_file)
+
+def test1_constructor():
+    """
+    Test to check the constructor without providing a valid error rate. It
+    will raise an exception.
+    """
+    with pytest.raises(InvalidLimit):
+        ReplayInstagramAPI(record_dir, error_rate=2)
+
+def test1_replay():
+    """
+    Test to check the method which replays a request which has not been recorded.
+    It will raise an exception.
+    """
+    with pytest.raises(RecordNotFound):
+        ReplayInstagramAPI(record_dir).searchUsername("unknown_user")
+
+def test2_replay():
+    """
+    Test to check that the requests fail once the limit of requests is reached.
+    """
+    replay_api = ReplayInstagramAPI(record_dir, max_requests=1)
+    assert replay_api.searchUsername("test_user") == True
+    assert replay_api.searchUsername("test_user") == False
+    assert replay_api.LastJson["status"] == "fail"
+
+def test3_replay():
+    """
+    Test to check that every request fails if the error rate is 1.
+    """
+    replay_api = ReplayInstagramAPI(record_dir, error_rate=1)
+    assert replay_api.searchUsername("test_user") == False
+
+def test1_record():
+    """
+    Test to check that the recorder stores the responses which could be replayed later.
+    """
+    new_record_dir = tempfile.mkdtemp()
+    recorder = RecordingInstagramAPI(ReplayInstagramAPI(record_dir), new_record_dir)
+    recorder.searchUsername("test_user")
+    assert recorder.LastJson["user"]["username"] == "test_user"
+    replay_api = ReplayInstagramAPI(new_record_dir)
+    replay_api.searchUsername("test_user")
+    assert replay_api.LastJson == recorder.LastJson
+
+def test1_get_levpasha_instagram_data():
+    """
+    Test to download the Instagram data of a user replaying the recorded responses.
+    """
+    api = Api()
+    api.connection = ReplayInstagramAPI(record_dir)
+    api.request_delay = 0
+    api.section_delay = 0
+    user_data = api.get_levpasha_instagram_data("test_user")
+    assert len(user_data["medias"]) == 1 and len(user_data["comments"][0]["texts"]) == 1
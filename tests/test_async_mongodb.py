@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests to check the right behaviour of the asynchronous operations with the
+Mongo database included in the class AsyncMongoDB.
+
+@author: Lidia Sánchez Mérida.
+"""
+import asyncio
+from datetime import datetime
+import sys
+sys.path.append("src")
+import pytest
+from exceptions import ConnectionNotFound, NewItemNotFound, InvalidQuery, CollectionNotFound
+from async_mongodb import AsyncMongoDB
+
+# Event loop of the tests and the asynchronous connection to a test collection.
+# The connection is created inside the loop, so the client is bound to it.
+loop = asyncio.new_event_loop()
+
+async def create_test_connection():
+    return AsyncMongoDB('test_async')
+test_connection = loop.run_until_complete(create_test_connection())
+
+def test1_insert_item():
+    """
+    Test to check the method which inserts a new item without providing it.
+    An exception will be raised.
+    """
+    with pytest.raises(NewItemNotFound):
+        loop.run_until_complete(test_connection.insert_item(None))
+
+def test2_insert_item():
+    """
+    Test to check the method which inserts a new item without the connection
+    to the database. An exception will be raised.
+    """
+    invalid_mongodb = AsyncMongoDB('test_async')
+    invalid_mongodb.connection = None
+    with pytest.raises(ConnectionNotFound):
+        loop.run_until_complete(invalid_mongodb.insert_item({"username":"user"}))
+
+def test1_bulk_upsert():
+    """
+    Test to insert the data of several users at the same time in the same
+    event loop. The items which already exist won't be inserted again.
+    """
+    async def insert_users():
+        items = [{"username":"user "+str(i), "date":datetime.strptime("25-10-2020", "%d-%m-%Y"),
+                  "social_media":"Instagram"} for i in range(0, 5)]
+        return await asyncio.gather(test_connection.bulk_upsert(items[:3]),
+                                    test_connection.bulk_upsert(items[2:]))
+    results = loop.run_until_complete(insert_users())
+    assert sum(result["inserted"] for result in results) == 5
+
+def test1_iter_records():
+    """
+    Test to check the method which gets the records one by one without
+    providing a valid query. An exception will be raised.
+    """
+    with pytest.raises(InvalidQuery):
+        test_connection.iter_records("invalid_query")
+
+def test2_iter_records():
+    """
+    Test to get the records of a user as an asynchronous iterator.
+    """
+    async def get_user_records():
+        values = {"username":"user 1", "social_media":"Instagram",
+                  "date_ini":"25-10-2020", "date_fin":"25-10-2020"}
+        return [record async for record in test_connection.iter_records("get_item", values)]
+    records = loop.run_until_complete(get_user_records())
+    assert len(records) == 1 and "_id" not in records[0]
+
+def test3_iter_records():
+    """
+    Test to get the records of a collection grouped by user and month, which
+    can't be used asynchronously, so an exception will be raised.
+    """
+    bucket_connection = loop.run_until_complete(create_test_connection())
+    bucket_connection.bucketed_collections = ["test"]
+    with pytest.raises(CollectionNotFound):
+        bucket_connection.iter_records("get_dates", collection="test")
+
+def test1_delete_records():
+    """
+    Test to delete every record of the test collection.
+    """
+    loop.run_until_complete(test_connection.delete_records("delete_all"))
+    assert loop.run_until_complete(test_connection.collection_size()) == 0
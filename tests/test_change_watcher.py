@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests to check the right behaviour of the methods included in the class
+AnalysisWatcher.
+
+@author: Lidia Sánchez Mérida
+"""
+import sys
+sys.path.append("src")
+import pytest
+from datetime import datetime
+from exceptions import InvalidMongoDbObject, InvalidLimit
+from mongodb import MongoDB
+from change_watcher import AnalysisWatcher
+
+# Analyses enqueued by the watcher of the test collections.
+enqueued_analyses = []
+def enqueue_analysis(username, analysis, social_media, date_ini, date_fin, delay):
+    enqueued_analyses.append((username, analysis, social_media, date_ini, date_fin))
+
+watcher = AnalysisWatcher(MongoDB('test'), enqueue_analysis, mode="test")
+
+def test1_constructor():
+    """
+    Test to check the constructor without providing a valid MongoDB object.
+    It will raise an exception.
+    """
+    with pytest.raises(InvalidMongoDbObject):
+        AnalysisWatcher(None)
+
+def test2_constructor():
+    """
+    Test to check the constructor without providing a valid number of days.
+    It will raise an exception.
+    """
+    with pytest.raises(InvalidLimit):
+        AnalysisWatcher(MongoDB('test'), window_days=0)
+
+def test3_constructor():
+    """
+    Test to check the constructor with several numbers of days, one of them
+    not valid. It will raise an exception.
+    """
+    with pytest.raises(InvalidLimit):
+        AnalysisWatcher(MongoDB('test'), window_days=[7, -1])
+
+def test1_handle_change():
+    """
+    Test to check that the changes of the collections which are not watched
+    are not gathered.
+    """
+    change = {"ns":{"coll":"available_dates"}, "fullDocument":{"collection":"test"}}
+    assert watcher.handle_change(change) == False
+
+def test2_handle_change():
+    """
+    Test to check that the snapshots of the same download are gathered and
+    their analyses are not enqueued until no more snapshots arrive during
+    the delay, even if the download lasts longer than the delay.
+    """
+    change = {"ns":{"coll":"test"}, "fullDocument":{"username":"first user",
+              "social_media":"Instagram", "date":datetime.strptime("25-10-2020", "%d-%m-%Y")}}
+    assert watcher.handle_change(change, now=0) == True
+    assert watcher.flush_pending_users(now=200) == []
+    assert watcher.handle_change(change, now=200) == True
+    assert watcher.flush_pending_users(now=400) == []
+    enqueued = watcher.flush_pending_users(now=500)
+    assert enqueued == [("first user", "test_profile_evolution", "18-10-2020", "25-10-2020"),
+                        ("first user", "test_profile_activity", "18-10-2020", "25-10-2020")]
+    assert watcher.flush_pending_users(now=1000) == []
+    assert len(enqueued_analyses) == 2
+
+def test1_flush_pending_users():
+    """
+    Test to check that a new snapshot enqueues the analyses of the periods of
+    every window and, incrementally, since the last analysed date.
+    """
+    windows_watcher = AnalysisWatcher(MongoDB('test'), enqueue_analysis, mode="test",
+                                      window_days=[7, 30], delay=0)
+    windows_watcher.analysed_dates[("first user", "Instagram", "test_profile_activity")] = \
+        datetime.strptime("20-10-2020", "%d-%m-%Y")
+    change = {"ns":{"coll":"test"}, "fullDocument":{"username":"first user",
+              "social_media":"Instagram", "date":datetime.strptime("25-10-2020", "%d-%m-%Y")}}
+    windows_watcher.handle_change(change, now=0)
+    enqueued = windows_watcher.flush_pending_users(now=0)
+    assert enqueued == [("first user", "test_profile_evolution", "18-10-2020", "25-10-2020"),
+                        ("first user", "test_profile_evolution", "25-09-2020", "25-10-2020"),
+                        ("first user", "test_profile_activity", "20-10-2020", "25-10-2020"),
+                        ("first user", "test_profile_activity", "18-10-2020", "25-10-2020"),
+                        ("first user", "test_profile_activity", "25-09-2020", "25-10-2020")]
+    assert windows_watcher.analysed_dates[("first user", "Instagram", "test_profile_evolution")] == \
+        datetime.strptime("25-10-2020", "%d-%m-%Y")
+
+def test1_save_resume_token():
+    """
+    Test to check that the token of the last processed change is stored.
+    """
+    watcher.save_resume_token({"_data":"token"})
+    assert watcher.load_resume_token() == {"_data":"token"}
@@ -441,6 +441,19 @@ def test5_insert_user_data():
     result = data.insert_user_data(values, 'test')
     assert type(result) == str 
 
+def test6_insert_user_data():
+    """
+    Test to check the method which inserts a list of user data into a specific
+    collection in the Mongo database in a single bulk operation. In this test,
+    one item already exists so only the other one will be inserted.
+    """
+    data = commondata.CommonData(test_collection)
+    today = datetime.strptime((date.today()).strftime("%d-%m-%Y"),'%d-%m-%Y')
+    values = [{"username":"username", "field_one":"anything", "date":today, "social_media":"Instagram"},
+              {"username":"other username", "field_one":"anything", "date":today, "social_media":"Instagram"}]
+    result = data.insert_user_data(values, 'test')
+    assert result == {"inserted":1, "matched":1}
+
 def test1_get_user_data():
     """
     Test to check the method which gets user data from a specific collection
@@ -8,6 +8,7 @@ in the class DataAnalyzer. Each one performs a different type of data analysis.
 """
 import sys
 import pytest
+from decimal import Decimal
 sys.path.append("src")
 sys.path.append("src/data")
 import data_analyzer 
@@ -297,6 +298,20 @@ def test5_post_evolution():
                     ("31/10/2020", "278", "289")]
     result = da.post_evolution("lidiasm", post_interactions)
     assert type(result) == dict and len(result["date"]) == 2
+
+def test6_post_evolution():
+    """
+    Test to check that the unrounded daily averages of the posts, as the ones
+    of the materialized views, are rounded as the interactions of each post.
+    In this test, the average of the first day is halfway between two numbers.
+    """
+    post_interactions = [("20/10/2020", "2", "35"), ("20/10/2020", "3", "36"),
+                         ("21/10/2020", "7", "4")]
+    daily_averages = [("20/10/2020", Decimal("2.5000000000000000"), Decimal("35.5000000000000000")),
+                      ("21/10/2020", Decimal("7.0000000000000000"), Decimal("4.0000000000000000"))]
+    result = da.post_evolution("lidiasm", daily_averages)
+    assert result == da.post_evolution("lidiasm", post_interactions)
+    assert result["like_count"] == [2, 7] and result["comment_count"] == [36, 4]
     
 def test1_post_popularity():
     """
@@ -450,4 +465,26 @@ def test6_user_behaviours():
                   {"date":"31/10/2020", "author":"user1", "sentiment":"neg"}, {"date":"31/10/2020", "author":"user1", "sentiment":"neg"},
                   {"date":"32/10/2020", "author":"user1", "sentiment":"pos"}, {"date":"32/10/2020", "author":"user1", "sentiment":"neg"}]
     result = da.user_behaviours("lidia.96.sm", user_list)
-    assert type(result) == dict
\ No newline at end of file
+    assert type(result) == dict
+
+def test1_count_user_sentiments():
+    """
+    Test to check the method which counts the sentiments of each author per
+    date. In this test, the sentiments are counted in two batches, so the
+    counts will be the same as counting all of them at the same time.
+    """
+    user_list = [{"date":"24/10/2020", "author":"user1", "sentiment":"pos"},
+                 {"date":"24/10/2020", "author":"user2", "sentiment":"neg"},
+                 {"date":"25/10/2020", "author":"user1", "sentiment":"neu"},
+                 {"date":"25/10/2020", "author":"user3", "sentiment":"none"}]
+    user_patterns = da.count_user_sentiments(user_list[:2])
+    assert da.count_user_sentiments(user_list[2:], user_patterns) == da.count_user_sentiments(user_list)
+
+def test1_get_user_behaviours():
+    """
+    Test to check the method which computes the evolution of the number of
+    haters and friends from the counts of sentiments. In this test, there are
+    not counts so an exception will be raised.
+    """
+    with pytest.raises(SentimentNotFound):
+        da.get_user_behaviours("lidia.96.sm", {})
@@ -36,6 +36,23 @@ def test2_set_user_to_study():
     set_user = main_ops_object.set_user_to_study(username)
     assert set_user == username
         
+def test1_track_user():
+    """
+    Test to check the method which adds a user to the registry of tracked users
+    without providing a valid mode. It will raise an exception.
+    """
+    with pytest.raises(InvalidMode):
+        main_ops_object.track_user(username, "Instagram", "invalid_mode")
+
+def test2_track_user():
+    """
+    Test to check the method which adds a user to the registry of tracked users.
+    The second time the user won't be inserted because they're already tracked.
+    """
+    main_ops_object.postgresdb_object.empty_table("testtrackedusers")
+    assert len(main_ops_object.track_user(username, "Instagram", "test")) == 1
+    assert len(main_ops_object.track_user(username, "Instagram", "test")) == 0
+
 def test1_get_user_instagram_common_data():
     """
     Test to check the method which gets, preprocesses and stores user data using the
@@ -130,6 +147,40 @@ def test6_preprocess_and_store_common_data():
     result = mo.preprocess_and_store_common_data(user_data, 'Instagram', 'test')
     assert type(result) == dict
 
+def test1_store_user_data_pages():
+    """
+    Test to check the method which stores the pages of user data as soon as
+    they are downloaded without providing a valid type of user data. An
+    exception will be raised.
+    """
+    with pytest.raises(UserDataNotFound):
+        main_ops_object.store_user_data_pages([], 'profiles', 'Instagram', 'stream_user', 'test')
+
+def test2_store_user_data_pages():
+    """
+    Test to store the pages of medias and comments of a user in the Mongo
+    database using a small buffer, so they will be stored in several steps.
+    """
+    media_pages = [[{'id_media': '1', "taken_at":"24/10/2020", "title":None, 'like_count': 29, 'comment_count': 2}],
+                   [{'id_media': '2', "taken_at":"24/10/2020", "title":None,'like_count': 18, 'comment_count': 2}]]
+    comment_pages = [[{'id_media': '1', 'texts': [{'user': 'user1', 'text': 'aa'}, {'user': 'user2', 'text': 'ee'}]}],
+                     [{'id_media': '2', 'texts': [{'user': 'user3', 'text': 'ii'}, {'user': 'user2', 'text': 'oo'}]}]]
+    mo = main_ops.MainOperations()
+    mo.stream_buffer_size = 1
+    assert mo.store_user_data_pages(media_pages, 'medias', 'Instagram', 'stream_user', 'test') == 2
+    assert mo.store_user_data_pages(comment_pages, 'comments', 'Instagram', 'stream_user', 'test') == 4
+    # The media downloaded again the same day is stored once with its new counts
+    media_pages = [[{'id_media': '1', "taken_at":"24/10/2020", "title":None, 'like_count': 35, 'comment_count': 2}]]
+    assert mo.store_user_data_pages(media_pages, 'medias', 'Instagram', 'stream_user', 'test') == 1
+    today = datetime.now().strftime("%d-%m-%Y")
+    document = mo.mongodb_object.client[mo.mongodb_object.db]["test_medias"].find_one(
+        {"username":"stream_user", "date":datetime.strptime(today, "%d-%m-%Y"), "social_media":"Instagram"})
+    assert sorted((media['id_media'], media['like_count']) for media in document['medias']) == [('1', '35'), ('2', '18')]
+    # Delete the stored pages
+    values = {"username":"stream_user", "date":today, "social_media":"Instagram"}
+    mo.mongodb_object.delete_records("delete_item", values, "test_medias")
+    mo.mongodb_object.delete_records("delete_item", values, "test_comments")
+
 def test1_get_data_from_mongodb():
     """
     Test to check the method which gets user data from the Mongo database depending on
@@ -890,6 +941,24 @@ def test24_perform_analysis():
               "Instagram", "31-10-2020", "01-11-2020")
     assert type(result) == dict
     
+def test1_get_comment_sentiments_and_authors():
+    """
+    Test to check the predefined query which gets the authors of the analysed
+    comments as well as their sentiments in a single query. The results should
+    be the same as getting the sentiment of each recovered comment.
+    """
+    query_values = {"comment_date_ini":"31-10-2020", "comment_date_fin":"01-11-2020",
+                    "media_date_ini":"31-10-2020", "media_date_fin":"01-11-2020",
+                    "username":"audispain", "social_media":"Instagram"}
+    postgresdb_object = main_ops_object.postgresdb_object
+    expected = []
+    for comment in postgresdb_object.get_data("test_get_comments_and_authors", query_values):
+        sentiment = postgresdb_object.get_data("test_get_comment_sentiment", {"original_text":comment[2]})
+        if (len(sentiment) > 0):
+            expected.append((comment[0], comment[1], sentiment[0][0]))
+    result = postgresdb_object.get_data("test_get_comment_sentiments_and_authors", query_values)
+    assert sorted(result) == sorted(expected)
+
 def test25_perform_analysis():
     """
     Test to check the method which performs a specific analysis on the selected
@@ -913,3 +982,79 @@ def test26_perform_analysis():
     result = main_ops_object.perform_analysis("audispain", "test_user_behaviours",
                 "Instagram", "31-10-2020", "01-11-2020")
     assert type(result) == dict and len(result["date"]) == 2
+
+def test1_get_profile_aggregates():
+    """
+    Test to check the method which computes the Profiles Evolution analysis in
+    the Mongo database on a set of three-days user data. The values of each
+    day will be returned.
+    """
+    result = main_ops_object.get_profile_aggregates("audispain", "test_profile_evolution",
+              "Instagram", "05-11-2020", "07-11-2020")
+    assert list(result.keys()) == ['date', 'n_posts', 'n_followers', 'n_followings']
+    assert result["n_followers"] == [217094, 217178, 217299]
+
+def test2_get_profile_aggregates():
+    """
+    Test to check the method which computes the Profiles Activity analysis in
+    the Mongo database on a set of more than 7 days of user data. The averages
+    per week will be returned.
+    """
+    result = main_ops_object.get_profile_aggregates("audispain", "test_profile_activity",
+              "Instagram", "31-10-2020", "07-11-2020")
+    assert result["date"] == ["Semana 1", "Semana 2"] and len(result["n_posts"]) == 2
+
+def test1_update_metric_views():
+    """
+    Test to check the method which copies the user data and refreshes the
+    materialized views of the daily metrics with an invalid mode, so an
+    exception will be raised.
+    """
+    with pytest.raises(InvalidMode):
+        main_ops_object.update_metric_views("audispain", "Instagram", "invalid", "05-11-2020", "07-11-2020")
+
+def test2_update_metric_views():
+    """
+    Test to check the method which copies the user data and refreshes the
+    materialized views of the daily metrics. Then, the daily metrics of the
+    three days will be recovered from the view of the profiles.
+    """
+    views = main_ops_object.update_metric_views("audispain", "Instagram", "test", "05-11-2020", "07-11-2020")
+    assert views == ["testprofilesdaily", "testmediasdaily"]
+    required_data = main_ops_object.postgresdb_object.get_data("test_get_profiles_daily",
+                        {"username":"audispain", "social_media":"Instagram",
+                         "date_ini":"05-11-2020", "date_fin":"07-11-2020"})
+    assert len(required_data) == 3
+
+def test3_update_metric_views():
+    """
+    Test to check the method which copies the user data without refreshing
+    the materialized views, as it's made after each download, so there won't
+    be refreshed views.
+    """
+    views = main_ops_object.update_metric_views("audispain", "Instagram", "test", "05-11-2020", "07-11-2020",
+                                                refresh=False)
+    assert views == []
+
+def test1_backfill_metric_views():
+    """
+    Test to check the method which loads every stored profile and media in the
+    views of the daily metrics with an invalid mode, so an exception will be raised.
+    """
+    with pytest.raises(InvalidMode):
+        main_ops_object.backfill_metric_views("invalid")
+
+def test2_backfill_metric_views():
+    """
+    Test to check the method which loads every stored profile and media in the
+    views of the daily metrics. The profiles copied before are skipped, so
+    every profile of the user is in the view of the profiles.
+    """
+    result = main_ops_object.backfill_metric_views("test", batch_size=100)
+    assert result["views"] == ["testprofilesdaily", "testmediasdaily"]
+    assert result["profiles"]["read"] >= result["profiles"]["inserted"]
+    assert result["medias"]["read"] >= result["medias"]["inserted"]
+    required_data = main_ops_object.postgresdb_object.get_data("test_get_profiles_daily",
+                        {"username":"audispain", "social_media":"Instagram",
+                         "date_ini":"01-01-2020", "date_fin":"31-12-2021"})
+    assert len(required_data) >= 3
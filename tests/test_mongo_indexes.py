@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests to check the right behaviour of the methods included in the class
+MongoIndexManager.
+
+@author: Lidia Sánchez Mérida
+"""
+import sys
+sys.path.append("src")
+import pytest
+from exceptions import InvalidMongoDbObject, CollectionNotFound
+from mongodb import MongoDB
+from mongo_indexes import MongoIndexManager
+
+# Index manager of the test collections.
+index_manager = MongoIndexManager(MongoDB('test'))
+test_collections = ["test", "test_medias", "test_comments"]
+
+def test1_constructor():
+    """
+    Test to check the constructor without providing a valid MongoDB object.
+    It will raise an exception.
+    """
+    with pytest.raises(InvalidMongoDbObject):
+        MongoIndexManager(None)
+
+def test1_apply_indexes():
+    """
+    Test to check the method which creates the indexes of the collections without
+    providing a valid collection. It will raise an exception.
+    """
+    with pytest.raises(CollectionNotFound):
+        index_manager.apply_indexes(["invalid_collection"])
+
+def test2_apply_indexes():
+    """
+    Test to check that the indexes are not created twice.
+    """
+    index_manager.apply_indexes(test_collections)
+    new_indexes = index_manager.apply_indexes(test_collections)
+    assert all(len(indexes) == 0 for indexes in new_indexes.values())
+
+def test3_apply_indexes():
+    """
+    Test to check that the unique index of a collection with duplicated
+    documents is skipped and its error is kept, while the rest of indexes are
+    created.
+    """
+    index_manager.collection_indexes["test_duplicates"] = index_manager.collection_indexes["test"]
+    connection = index_manager.mongodb.client[index_manager.mongodb.db]["test_duplicates"]
+    connection.drop()
+    item = {"username":"user", "social_media":"Instagram", "date":"25-10-2020"}
+    connection.insert_many([dict(item), dict(item)])
+    new_indexes = index_manager.apply_indexes(["test_duplicates"])
+    connection.drop()
+    del index_manager.collection_indexes["test_duplicates"]
+    assert len(new_indexes["test_duplicates"]) == 1 and "test_duplicates" in index_manager.index_errors
+
+def test1_verify_indexes():
+    """
+    Test to check that the frequent queries of the test collections are solved
+    with the indexes and the query of the dates is covered by the index.
+    """
+    results = index_manager.verify_indexes(test_collections)
+    for collection in test_collections:
+        assert results[collection]["get_item"]["collection_scan"] == False
+        assert results[collection]["get_dates"]["covered"] == True
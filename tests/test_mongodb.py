@@ -13,7 +13,7 @@ sys.path.append("src")
 import pytest
 from exceptions import ConnectionNotFound, CollectionNotFound \
     , InvalidDatabaseCredentials, InvalidQuery, InvalidQueryValues, NewItemNotFound
-from mongodb import MongoDB
+from mongodb import MongoDB, get_mongo_client
 
 # Connection to a test database with a test collection.
 test_connection = MongoDB('test')
@@ -40,6 +40,15 @@ def test2_constructor():
     with pytest.raises(InvalidDatabaseCredentials):
         MongoDB(1234)
 
+def test3_constructor():
+    """
+    Test to check that every MongoDB object of the process shares the same
+    client of the Mongo database.
+    """
+    other_connection = MongoDB('test_medias')
+    assert other_connection.client is test_connection.client
+    assert test_connection.client is get_mongo_client(os.environ.get("MONGODB_URI"))
+    
 def test1_set_collection():
     """
     Test to check the method which connects to the specified collection in the
@@ -102,6 +111,77 @@ def test4_insert_item():
     result = test_connection.insert_item(values)
     assert result == None
     
+def test1_bulk_upsert():
+    """
+    Test to check the method which inserts a list of new items in a single bulk
+    operation. In this test, the items have not the required keys so an
+    exception will be raised.
+    """
+    with pytest.raises(NewItemNotFound):
+        test_connection.bulk_upsert([{"username" : "first user"}])
+
+def test2_bulk_upsert():
+    """
+    Test to check the method which inserts a list of new items in a single bulk
+    operation. In this test, the first item already exists so only the second
+    one will be inserted.
+    """
+    values = [{"username" : "first user", "field_one" : "anything", 
+               "date" : datetime.strptime("25-10-2020", "%d-%m-%Y"), "social_media" : "Instagram"},
+              {"username" : "third user", "field_one" : "anything", 
+               "date" : datetime.strptime("25-10-2020", "%d-%m-%Y"), "social_media" : "Instagram"}]
+    result = test_connection.bulk_upsert(values)
+    assert result == {"inserted":1, "matched":1}
+
+def test1_append_items():
+    """
+    Test to check the method which appends a list of items to a field of a
+    specific document. In this test, the provided item has not the field to
+    append so an exception will be raised.
+    """
+    values = {"username" : "second user", "date" : "25-10-2020",
+              "social_media" : "Instagram"}
+    with pytest.raises(NewItemNotFound):
+        test_connection.append_items(values, "comments")
+
+def test2_append_items():
+    """
+    Test to check the method which appends a list of items to a field of a
+    specific document. In this test, the document doesn't exist so it will be
+    created and the items appended twice will be stored only once.
+    """
+    values = {"username" : "second user", "date" : "25-10-2020",
+              "social_media" : "Instagram", "comments" : [{"id_media":1, "texts":["hi"]}]}
+    assert test_connection.append_items(values, "comments") == 1
+    values["comments"] = [{"id_media":1, "texts":["hi"]}, {"id_media":2, "texts":["bye"]}]
+    assert test_connection.append_items(values, "comments") == 2
+    document = test_connection.connection.find_one({"username":"second user"})
+    assert len(document["comments"]) == 2
+
+def test3_append_items():
+    """
+    Test to check the method which appends a list of items to a field of a
+    specific document. In this test, a media is appended again with new counts,
+    so it's replaced, and a new page of comments of a media is merged with the
+    stored one.
+    """
+    values = {"username" : "append user", "date" : datetime.strptime("25-10-2020", "%d-%m-%Y"),
+              "social_media" : "Instagram",
+              "medias" : [{"id_media":"1", "like_count":"3"}, {"id_media":"2", "like_count":"5"}]}
+    test_connection.append_items(values, "medias")
+    values["medias"] = [{"id_media":"1", "like_count":"4"}]
+    test_connection.append_items(values, "medias")
+    values["comments"] = [{"id_media":"1", "texts":[{"user":"user1", "text":"$hi"}]}]
+    test_connection.append_items(values, "comments")
+    values["comments"] = [{"id_media":"1", "texts":[{"user":"user1", "text":"$hi"}, {"user":"user2", "text":"bye"}]}]
+    test_connection.append_items(values, "comments")
+    document = test_connection.connection.find_one({"username":"append user"})
+    assert sorted((media["id_media"], media["like_count"]) for media in document["medias"]) == [("1", "4"), ("2", "5")]
+    assert document["comments"] == [{"id_media":"1", "texts":[{"user":"user1", "text":"$hi"},
+                                                             {"user":"user2", "text":"bye"}]}]
+    test_connection.delete_records("delete_item", {"username":"append user", "date":"25-10-2020",
+                                                   "social_media":"Instagram"})
+    
 def test1_get_records():
     """
     Test to check the method which gets data from a specific collection in the
@@ -179,6 +259,218 @@ def test7_get_records():
     records = test_connection.get_records("get_test", values)
     assert type(records) == list and len(records) == 1
 
+def test8_get_records():
+    """
+    Test to check that the predefined queries are not modified when they are
+    made, so the same object could be shared between several threads.
+    """
+    values = {"username":"first user", "date_ini":"25-10-2020", 
+              "date_fin":"27-10-2020", "social_media":"Instagram"}
+    test_connection.get_records("get_test", values, collection="test")
+    assert test_connection.get_queries["get_test"]["query"]["username"] == None
+    assert test_connection.get_queries["get_test"]["query"]["date"]["$gte"] == None
+
+def test1_iter_records():
+    """
+    Test to check the method which gets the matched records one by one without
+    providing a valid batch size. An exception will be raised.
+    """
+    with pytest.raises(InvalidQueryValues):
+        test_connection.iter_records("get_dates", batch_size=0)
+
+def test2_iter_records():
+    """
+    Test to check the method which gets the matched records one by one getting
+    only the required fields.
+    """
+    values = {"username":"first user", "date_ini":"25-10-2020", 
+              "date_fin":"27-10-2020", "social_media":"Instagram"}
+    records = test_connection.iter_records("get_test", values, fields=["username"], batch_size=1)
+    assert all(list(record.keys()) == ["username"] for record in records)
+
+def test3_iter_records():
+    """
+    Test to check that the records of several ranges of dates are got with the
+    values of each range, even if the records are read after making all the
+    queries.
+    """
+    values = {"username":"first user", "date_ini":"25-10-2020", 
+              "date_fin":"27-10-2020", "social_media":"Instagram"}
+    first_records = test_connection.iter_records("get_test", values)
+    second_records = test_connection.iter_records("get_test", dict(values, date_ini="01-01-2000",
+                                                                   date_fin="02-01-2000"))
+    assert len(list(first_records)) == 1 and len(list(second_records)) == 0
+
+def test1_get_available_dates():
+    """
+    Test to check the method which gets the dates in which a collection has data
+    without providing a valid username. An exception will be raised.
+    """
+    with pytest.raises(InvalidQueryValues):
+        test_connection.get_available_dates("test", username="")
+
+def test2_get_available_dates():
+    """
+    Test to check the method which gets the sorted dates in which a collection
+    has data of a specific user from the summary of dates.
+    """
+    test_connection.rebuild_available_dates("test")
+    dates = test_connection.get_available_dates("test", "first user", "Instagram")
+    assert datetime.strptime("25-10-2020", "%d-%m-%Y") in dates
+
+def test3_get_available_dates():
+    """
+    Test to check that the summary of dates is built from the stored records
+    even if a new date has been added to it before the first read, as it
+    happens with the first download after deploying the summary.
+    """
+    summary = test_connection.client[test_connection.db][test_connection.available_dates_collection]
+    summary.delete_many({"collection":"test"})
+    test_connection.add_available_dates([{"username":"new user", "social_media":"Instagram",
+                                          "date":datetime.strptime("01-01-2021", "%d-%m-%Y")}], "test")
+    dates = test_connection.get_available_dates("test")
+    assert datetime.strptime("25-10-2020", "%d-%m-%Y") in dates
+    assert datetime.strptime("01-01-2021", "%d-%m-%Y") not in dates
+
+def test1_get_date_aggregates():
+    """
+    Test to check the method which computes the averages per day and week in
+    the Mongo database. In this test, the fields to average are not provided
+    so an exception will be raised.
+    """
+    values = {"username":"first user", "social_media":"Instagram", "date_ini":"01-10-2020",
+              "date_fin":"31-10-2020"}
+    with pytest.raises(InvalidQueryValues):
+        test_connection.get_date_aggregates(values, [])
+
+def test2_get_date_aggregates():
+    """
+    Test to check that the weeks are groups of 7 consecutive days with data,
+    as the ones of the DataAnalyzer object, even if there are days without data.
+    """
+    days = [1, 2, 3, 5, 6, 8, 9, 10, 12]
+    items = [{"username":"aggregated user", "n_followers":day, "date":datetime(2020, 10, day),
+              "social_media":"Instagram"} for day in days]
+    test_connection.bulk_upsert(items)
+    values = {"username":"aggregated user", "social_media":"Instagram", "date_ini":"01-10-2020",
+              "date_fin":"31-10-2020"}
+    result = test_connection.get_date_aggregates(values, ["n_followers"])
+    assert len(result["days"]) == 9
+    assert result["weeks"] == [{"week":0, "n_followers":sum(days[:7])/7},
+                               {"week":1, "n_followers":sum(days[7:])/2}]
+    for day in days:
+        values = {"username":"aggregated user", "date":datetime(2020, 10, day).strftime("%d-%m-%Y"),
+                  "social_media":"Instagram"}
+        test_connection.delete_records("delete_item", values)
+
+def test1_insert_bucket_item():
+    """
+    Test to check the method which adds a daily snapshot to the document of its
+    user and month in a monthly collection. In this test, the second snapshot
+    has the same date so it won't be added.
+    """
+    bucket_connection = MongoDB('test')
+    bucket_connection.bucketed_collections = ["test"]
+    bucket = bucket_connection.get_bucket_collection(bucket_connection.get_collection())
+    values = {"username" : "bucket user", "n_followers" : 10, "biography" : "anything",
+              "date" : datetime.strptime("25-10-2020", "%d-%m-%Y"), "social_media" : "Instagram"}
+    assert type(bucket_connection.insert_bucket_item(values, "test", bucket)) == str
+    assert bucket_connection.insert_bucket_item(values, "test", bucket) == None
+
+def test1_iter_bucket_records():
+    """
+    Test to check that the daily snapshots stored in a monthly collection are
+    returned with the same fields as the daily documents and deleted one by one.
+    """
+    bucket_connection = MongoDB('test')
+    bucket_connection.bucketed_collections = ["test"]
+    values = {"username":"bucket user", "social_media":"Instagram", "date_ini":"01-10-2020",
+              "date_fin":"31-10-2020"}
+    result = list(bucket_connection.iter_records("get_item", values, fields=["biography", "n_followers"]))
+    assert result == [{"biography":"anything", "n_followers":10}]
+    values = {"username":"bucket user", "date":"25-10-2020", "social_media":"Instagram"}
+    assert bucket_connection.delete_records("delete_item", values) == 1
+
+def test2_iter_bucket_records():
+    """
+    Test to check that the timeout of the cursors of a monthly collection
+    can't be disabled because they're aggregations, so an exception will be raised.
+    """
+    bucket_connection = MongoDB('test')
+    bucket_connection.bucketed_collections = ["test"]
+    values = {"username":"bucket user", "social_media":"Instagram", "date_ini":"01-10-2020",
+              "date_fin":"31-10-2020"}
+    with pytest.raises(InvalidQueryValues):
+        bucket_connection.iter_records("get_item", values, no_cursor_timeout=True)
+
+def test1_bulk_upsert_bucket():
+    """
+    Test to add several daily snapshots to a monthly collection in bulk
+    operations. In this test, two snapshots belong to the same month and
+    the last one has the same date as the first one, so it won't be added.
+    """
+    bucket_connection = MongoDB('test')
+    bucket_connection.bucketed_collections = ["test"]
+    items = [{"username":"bucket user", "n_followers":day, "date":datetime(2020, 10, day),
+              "social_media":"Instagram"} for day in [25, 26, 25]]
+    assert bucket_connection.bulk_upsert(items) == {"inserted":2, "matched":1}
+    values = {"username":"bucket user", "social_media":"Instagram", "date_ini":"01-10-2020",
+              "date_fin":"31-10-2020"}
+    result = list(bucket_connection.iter_records("get_item", values, fields=["n_followers"]))
+    assert sorted(record["n_followers"] for record in result) == [25, 26]
+    for date in ["25-10-2020", "26-10-2020"]:
+        values = {"username":"bucket user", "date":date, "social_media":"Instagram"}
+        assert bucket_connection.delete_records("delete_item", values) == 1
+
+def test4_get_available_dates():
+    """
+    Test to check that the summary of dates of a monthly collection is built
+    from its daily snapshots when it has not been summarized yet.
+    """
+    bucket_connection = MongoDB('test')
+    bucket_connection.bucketed_collections = ["test"]
+    items = [{"username":"bucket user", "n_followers":10, "date":datetime(2020, 10, 20),
+              "social_media":"Instagram"}]
+    bucket_connection.bulk_upsert(items)
+    summary = bucket_connection.client[bucket_connection.db][bucket_connection.available_dates_collection]
+    summary.delete_many({"collection":"test"})
+    dates = bucket_connection.get_available_dates("test", "bucket user", "Instagram")
+    assert dates == [datetime(2020, 10, 20)]
+    values = {"username":"bucket user", "date":"20-10-2020", "social_media":"Instagram"}
+    assert bucket_connection.delete_records("delete_item", values) == 1
+    assert bucket_connection.get_available_dates("test", "bucket user", "Instagram") == []
+    # Summarize again the daily documents for the next tests
+    test_connection.rebuild_available_dates("test")
+
+def test1_migrate_to_buckets():
+    """
+    Test to copy the daily documents of a collection to its monthly collection.
+    In this test, the migration is run twice so the second time the snapshots
+    already exist.
+    """
+    migration_connection = MongoDB('test_migration')
+    migration_connection.bucket_metrics["test_migration"] = ["n_followers"]
+    items = [{"username":"migrated user", "n_followers":day, "date":datetime(2020, 10, day),
+              "social_media":"Instagram"} for day in [25, 26]]
+    migration_connection.bulk_upsert(items)
+    assert migration_connection.migrate_to_buckets("test_migration", batch_size=1) == {"inserted":2, "matched":0}
+    assert migration_connection.migrate_to_buckets("test_migration") == {"inserted":0, "matched":2}
+    migration_connection.bucketed_collections = ["test_migration"]
+    values = {"username":"migrated user", "social_media":"Instagram", "date_ini":"01-10-2020",
+              "date_fin":"31-10-2020"}
+    assert len(list(migration_connection.iter_records("get_item", values))) == 2
+    assert migration_connection.delete_records("delete_all") == 2
+    migration_connection.bucketed_collections = []
+    assert migration_connection.delete_records("delete_all") == 2
+
+def test2_migrate_to_buckets():
+    """
+    Test to migrate a collection which can't be grouped by month, so an
+    exception will be raised.
+    """
+    with pytest.raises(CollectionNotFound):
+        test_connection.migrate_to_buckets("medias")
+
 def test1_collection_size():
     """
     Test to check the method which returns the number of documents which are
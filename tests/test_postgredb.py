@@ -7,8 +7,10 @@ of Truth which has the operations with the PostgreSQL database.
 @author: Lidia Sánchez Mérida
 """
 import os
+import psycopg2
 import pytest
 import sys
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append("src")
 from postgredb import PostgreDB
 from exceptions import InvalidDatabaseCredentials, InvalidTableName, InvalidQuery \
@@ -46,6 +48,59 @@ def test3_connect_to_database():
     os.environ["POSTGRES_PSWD"] = env_pswd
     global test_connection
     test_connection = PostgreDB()
+
+def test1_get_cursor():
+    """
+    Test to check that the PostgreDB objects connected to the same database
+    share the pool of connections and that a connection is reused after an
+    operation with its own cursor.
+    """
+    assert PostgreDB().pool == test_connection.pool
+    with test_connection.get_cursor() as cursor:
+        cursor.execute("SELECT 1")
+        assert cursor.fetchone()[0] == 1
+        connection = cursor.connection
+    assert connection.closed == 0
+
+def test2_get_cursor():
+    """
+    Test to check that the operations of several threads with the same
+    PostgreDB object are made at the same time with different connections.
+    """
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda table: test_connection.get_table_size(table),
+                                    ["testprofiles"]*8))
+    assert len(set(results)) == 1
+
+def test3_get_cursor():
+    """
+    Test to check that an operation whose connection has been lost is run
+    again with another connection of the pool. In this test, the connection
+    of the first try is closed by the database.
+    """
+    connections = []
+    def operation(cursor):
+        connections.append(cursor.connection)
+        if (len(connections) == 1):
+            cursor.execute("SELECT pg_terminate_backend(pg_backend_pid())")
+        cursor.execute("SELECT 1")
+        return cursor.fetchone()[0]
+    assert test_connection.run_operation(operation) == 1
+    assert len(connections) == 2 and connections[0].closed != 0 and connections[1].closed == 0
+
+def test4_get_cursor():
+    """
+    Test to check that an operation which fails without losing its connection,
+    such as a cancelled query, is not run again. An exception will be raised.
+    """
+    tries = []
+    def operation(cursor):
+        tries.append(cursor.connection)
+        cursor.execute("SET LOCAL statement_timeout = 1")
+        cursor.execute("SELECT pg_sleep(1)")
+    with pytest.raises(psycopg2.OperationalError):
+        test_connection.run_operation(operation)
+    assert len(tries) == 1 and tries[0].closed == 0
     
 def test1_empty_table():
     """
@@ -243,6 +298,51 @@ def test13_insert_data():
     ids = test_connection.insert_data('insert_test_fk', new_values, check_values)
     assert len(ids) < len(new_values)
     
+def test1_insert_batch():
+    """
+    Test to check the method which inserts a batch of new data in a specific
+    table without providing a valid page size. An exception will be raised.
+    """
+    new_values = [{"id":"7", "is_parent":True, "name":"Seventh parent"}]
+    with pytest.raises(InvalidQueryValues):
+        test_connection.insert_batch('insert_test_parent', new_values, 0)
+
+def test2_insert_batch():
+    """
+    Test to check the method which inserts a batch of new data in a specific
+    table. In this test, the first and third items are already in the 'TestParent'
+    table so only the ids of the other two will be returned.
+    """
+    new_values = [{"id":"1", "is_parent":True, "name":"First parent"},
+                  {"id":"8", "is_parent":True, "name":"Eighth parent"},
+                  {"id":"3", "is_parent":True, "name":"Third parent"},
+                  {"id":"7", "is_parent":True, "name":"Seventh parent"}]
+    ids = test_connection.insert_batch('insert_test_parent', new_values)
+    assert sorted(ids) == ["7", "8"]
+
+def test1_bulk_load():
+    """
+    Test to check the method which loads a large amount of data through a
+    staging table without providing a valid batch size. An exception will be raised.
+    """
+    with pytest.raises(InvalidQueryValues):
+        test_connection.bulk_load('insert_test_parent', [], 0)
+
+def test2_bulk_load():
+    """
+    Test to check the method which loads a large amount of data through a
+    staging table. In this test, the first item is already in the 'TestParent'
+    table and the last one is repeated, so only two items will be inserted.
+    """
+    new_values = [{"id":"1", "is_parent":True, "name":"First parent"},
+                  {"id":"9", "is_parent":True, "name":"Nineth parent"},
+                  {"id":"10", "is_parent":True, "name":"Tenth parent"},
+                  {"id":"9", "is_parent":True, "name":"Nineth parent"}]
+    progress = []
+    result = test_connection.bulk_load('insert_test_parent', iter(new_values), 3,
+                                       lambda n_read, n_inserted, elapsed: progress.append(n_read))
+    assert result == {"read":4, "inserted":2} and progress == [3, 4]
+
 def test14_insert_data():
     """
     Test to check the method which inserts new data to a specific table in the
@@ -290,6 +390,177 @@ def test4_get_data():
     with pytest.raises(InvalidQueryValues):
         test_connection.get_data('check_test_parent', {'name':'name'})
 
+def test5_get_data():
+    """
+    Test to check the method which gets data from a specific table. In this test,
+    a long analysed comment will be stored and its sentiment will be recovered
+    through the hash of its text, which is computed by the database.
+    """
+    long_text = "A long comment to search by its hash. "*200
+    new_values = [{"original_text":long_text, "sentiment":"pos", "degree":0.9}]
+    check_values = [{"original_text":long_text}]
+    test_connection.insert_data('insert_test_comment_sentiment_analysis', new_values, check_values)
+    assert test_connection.get_data('test_get_comment_sentiment', {"original_text":long_text}) == [("pos",)]
+
+def test1_get_prepared_query():
+    """
+    Test to check the method which replaces the placeholders of a predefined
+    query by the numbered parameters of the prepared statements.
+    """
+    query = test_connection.get_prepared_query("SELECT id FROM testchild WHERE name=%s AND id>%s")
+    assert query == "SELECT id FROM testchild WHERE name=$1 AND id>$2"
+
+def test6_get_data():
+    """
+    Test to check the method which gets data from a specific table. In this test,
+    the query will be prepared the first time it's made in the connection and
+    the same results will be returned by the prepared statement.
+    """
+    test_connection.prepare_queries = True
+    first_result = test_connection.get_data('check_test_parent', {'id':'1'})
+    assert test_connection.get_data('check_test_parent', {'id':'1'}) == first_result
+    with test_connection.get_cursor() as cursor:
+        cursor.execute("SELECT name FROM pg_prepared_statements")
+        assert ("select_check_test_parent",) in cursor.fetchall()
+
+def test1_iter_data():
+    """
+    Test to check the method which gets data from a specific table in batches.
+    In this test, the provided size of the batches is not valid so an exception
+    will be raised.
+    """
+    with pytest.raises(InvalidQueryValues):
+        test_connection.iter_data('check_test_parent', {'id':'1'}, 0)
+
+def test2_iter_data():
+    """
+    Test to check the method which gets data from a specific table in batches.
+    In this test, the matched record will be read in a single batch through a
+    server-side cursor.
+    """
+    batches = list(test_connection.iter_data('check_test_parent', {'id':'1'}, 1))
+    assert len(batches) == 1 and len(batches[0][0]) == 1
+
+def test3_iter_data():
+    """
+    Test to check that the operations made with the cursor of a batch use the
+    connection of the reading, that an operation which fails doesn't stop the
+    reading and that the operations of each batch are committed before
+    reading the next one.
+    """
+    connections = []
+    for batch, cursor in test_connection.iter_data('check_test_parent', {'id':'1'}, 1):
+        with pytest.raises(psycopg2.ProgrammingError):
+            test_connection.run_operation(lambda cursor: cursor.execute("SELECT * FROM missingtable"), cursor)
+        test_connection.run_operation(lambda cursor: connections.append(cursor.connection), cursor)
+        assert test_connection.get_data('check_test_parent', {'id':'1'}, cursor) == batch
+        test_connection.insert_data('insert_test_parent', [{'id':'iter', 'is_parent':True, 'name':'iter'}],
+                                    cursor=cursor)
+    assert connections == [cursor.connection]
+    assert len(test_connection.get_data('check_test_parent', {'id':'iter'})) == 1
+    test_connection.run_operation(lambda cursor: cursor.execute("DELETE FROM testparent WHERE id = 'iter'"))
+
+def test4_iter_data():
+    """
+    Test to check that the operations made with the cursor of the last batch
+    are rolled back if the reading is stopped before reading all the batches.
+    """
+    batches = test_connection.iter_data('check_test_parent', {'id':'1'}, 1)
+    batch, cursor = next(batches)
+    test_connection.insert_data('insert_test_parent', [{'id':'iter', 'is_parent':True, 'name':'iter'}],
+                                cursor=cursor)
+    batches.close()
+    assert test_connection.get_data('check_test_parent', {'id':'iter'}) == []
+
+def test1_explain_data():
+    """
+    Test to check the method which gets the execution plan of a predefined query.
+    In this test, the provided query is not valid so an exception will be raised.
+    """
+    with pytest.raises(InvalidQuery):
+        test_connection.explain_data("invalid_query", None)
+
+def test2_explain_data():
+    """
+    Test to check the method which gets the execution plan of a predefined query.
+    In this test, the plan of the query, which has been run, will be returned.
+    """
+    plan = test_connection.explain_data('check_test_parent', {'id':'1'})
+    assert "Plan" in plan and "Execution Time" in plan
+
+def test1_refresh_views():
+    """
+    Test to check the method which refreshes the materialized views of the daily
+    metrics without providing a valid mode, so an exception will be raised.
+    """
+    with pytest.raises(InvalidTableName):
+        test_connection.refresh_views("invalid")
+
+def test2_refresh_views():
+    """
+    Test to check the method which refreshes the materialized views of the daily
+    metrics of the test tables concurrently.
+    """
+    assert test_connection.refresh_views("test") == ['testprofilesdaily', 'testmediasdaily']
+
+def test1_maintain_partitions():
+    """
+    Test to check the method which creates and detaches the monthly partitions
+    without providing a valid mode, so an exception will be raised.
+    """
+    with pytest.raises(InvalidTableName):
+        test_connection.maintain_partitions("invalid")
+
+def test2_maintain_partitions():
+    """
+    Test to check the method which creates and detaches the monthly partitions
+    providing a negative number of months, so an exception will be raised.
+    """
+    with pytest.raises(InvalidQueryValues):
+        test_connection.maintain_partitions("test", -1)
+
+def test3_maintain_partitions():
+    """
+    Test to check the method which creates the monthly partitions of the test
+    tables. The partitions of the next months have been created with the tables,
+    so there are not new partitions to create or old ones to detach.
+    """
+    partitions = test_connection.maintain_partitions("test", 3, 120)
+    assert partitions == {"created":[], "detached":[]}
+
+def test4_maintain_partitions():
+    """
+    Test to check the method which detaches the monthly partitions older than
+    the retention period. A partition of the test posts and comments is created
+    for an old month with one post and one comment, so both will be detached.
+    """
+    def insert_old_month(cursor):
+        cursor.execute("""INSERT INTO testprofiles (social_media, date, userid, username, name, biography,
+                       gender, profile_pic, location, birthday, date_joined, n_followers, n_followings, n_medias)
+                       VALUES ('Instagram', '2000-01-15', 'partitionuser', 'partitionuser', '', '', '', '',
+                       '', '', '', '0', '0', '1') RETURNING id_profile""")
+        profile_id = cursor.fetchone()[0]
+        cursor.execute("""CREATE TABLE public.testmedias_200001 PARTITION OF public.testmedias
+                       FOR VALUES FROM ('2000-01-01') TO ('2000-02-01')""")
+        cursor.execute("""CREATE TABLE public.testmediacomments_200001 PARTITION OF public.testmediacomments
+                       FOR VALUES FROM ('2000-01-01') TO ('2000-02-01')""")
+        cursor.execute("""INSERT INTO testmedias (id_profile, id_media, like_count, comment_count, date, type)
+                       VALUES (%s, 'old media', 1, 1, '2000-01-15', 'common') RETURNING id_media_aut""", (profile_id,))
+        cursor.execute("""INSERT INTO testmediacomments (id_media_aut, date, original_text, preprocessed_text, author, type)
+                       VALUES (%s, '2000-01-15', 'old comment', 'old comment', 'partitionuser', 'comment')""",
+                       (cursor.fetchone()[0],))
+        return profile_id
+    profile_id = test_connection.run_operation(insert_old_month)
+    partitions = test_connection.maintain_partitions("test", 3, 120)
+    assert partitions == {"created":[], "detached":["testmediacomments_200001", "testmedias_200001"]}
+    def remove_old_month(cursor):
+        cursor.execute("SELECT COUNT(*) FROM public.testmedias_200001")
+        archived = cursor.fetchone()[0]
+        cursor.execute("DROP TABLE public.testmediacomments_200001, public.testmedias_200001")
+        cursor.execute("DELETE FROM testprofiles WHERE id_profile = %s", (profile_id,))
+        return archived
+    assert test_connection.run_operation(remove_old_month) == 1
+
 def test1_get_table_size():
     """
     Test to check the method which counts the number of records of a specific table
@@ -304,4 +575,36 @@ def test2_get_table_size():
     without providing a valid table name, so an exception will be raised.
     """
     with pytest.raises(InvalidTableName):
-        test_connection.get_table_size("InvalidTable")
\ No newline at end of file
+        test_connection.get_table_size("InvalidTable")
+def test1_update_data():
+    """
+    Test to check the method which updates some records of a specific table without
+    providing a valid update query, so an exception will be raised.
+    """
+    with pytest.raises(InvalidQuery):
+        test_connection.update_data("invalid_query", None)
+
+def test2_update_data():
+    """
+    Test to check the method which updates some records of a specific table without
+    providing the required values to make the query, so an exception will be raised.
+    """
+    with pytest.raises(InvalidQueryValues):
+        test_connection.update_data("update_test_tracked_user_crawl", {"username":"user"})
+
+def test3_update_data():
+    """
+    Test to check the method which updates some records of a specific table. In this
+    test, the date of the last download of a tracked user will be updated.
+    """
+    test_connection.empty_table("testtrackedusers")
+    new_user = {"freshness_hours":24, "priority":1, "social_media":"Instagram", "username":"user"}
+    test_connection.insert_data("insert_test_tracked_user", [new_user],
+                                [{"username":"user", "social_media":"Instagram"}])
+    due_users = test_connection.get_data("test_get_due_tracked_users", {"enqueue_timeout":6, "n_users":10})
+    assert len(due_users) == 1
+    n_updated = test_connection.update_data("update_test_tracked_user_crawl",
+                                            {"username":"user", "social_media":"Instagram"})
+    assert n_updated == 1
+    due_users = test_connection.get_data("test_get_due_tracked_users", {"enqueue_timeout":6, "n_users":10})
+    assert len(due_users) == 0
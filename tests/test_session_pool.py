@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests to check the right behaviour of the methods included in the class
+SessionPool.
+
+@author: Lidia Sánchez Mérida
+"""
+import sys
+import pytest
+sys.path.append("src")
+sys.path.append("src/data")
+from session_pool import SessionPool
+from api import Api
+from api_replay import ReplayInstagramAPI, get_record_filename
+from exceptions import InvalidCredentials, MaxRequestsExceed, InvalidLimit
+import json
+import tempfile
+
+# Pool of sessions to test the class with.
+pool = SessionPool(max_requests=2, period=3600, quarantine_time=0)
+# Directory with the recorded profile of a user to replay it offline.
+record_dir = tempfile.mkdtemp()
+with open(get_record_filename(record_dir, "searchUsername", ("test_user",)), "w") as record_file:
+    json.dump({"status":"ok", "user":{"pk":1, "username":"test_user"}}, record_file)
+
+def get_replay_pool(*replay_apis):
+    """
+    Function to create a pool whose sessions replay the recorded responses,
+    so they don't need to be authenticated.
+    """
+    replay_pool = SessionPool(quarantine_time=3600)
+    for i, replay_api in enumerate(replay_apis):
+        replay_pool.sessions["replay_user"+str(i)] = {"connection":replay_api, "pswd":"",
+                                                      "requests":[], "quarantined_until":0}
+    return replay_pool
+
+def test1_constructor():
+    """
+    Test to check the constructor without providing a valid maximum number of
+    requests per session. It will raise an exception.
+    """
+    with pytest.raises(InvalidLimit):
+        SessionPool(max_requests=0)
+
+def test2_constructor():
+    """
+    Test to check the constructor without providing a valid period of time.
+    It will raise an exception.
+    """
+    with pytest.raises(InvalidLimit):
+        SessionPool(period=None)
+
+def test1_acquire():
+    """
+    Test to check the method which assigns a request to a session when the
+    pool is empty. It will raise an exception.
+    """
+    with pytest.raises(MaxRequestsExceed):
+        pool.acquire()
+
+def test1_add_session():
+    """
+    Test to check the method which adds a session to the pool without providing
+    valid credentials. It will raise an exception.
+    """
+    with pytest.raises(InvalidCredentials):
+        pool.add_session("", None)
+
+def test1_get_env_credentials():
+    """
+    Test to check the method which gets the Instagram credentials stored as
+    env variables.
+    """
+    credentials = pool.get_env_credentials()
+    assert type(credentials) == list and len(credentials) > 0
+
+def test1_load_sessions():
+    """
+    Test to authenticate the Instagram accounts stored as env variables.
+    """
+    assert pool.load_sessions() > 0
+
+def test2_acquire():
+    """
+    Test to check that the requests are assigned to the session with the most
+    remaining requests until all of them reach their limit.
+    """
+    for i in range(0, 2*len(pool.sessions)):
+        username, connection = pool.acquire()
+        assert pool.remaining_requests(username) >= 0
+    with pytest.raises(MaxRequestsExceed):
+        pool.acquire()
+
+def test1_reauthenticate():
+    """
+    Test to check that a quarantined session is authenticated again and its
+    budget of requests is restored.
+    """
+    username = list(pool.sessions.keys())[0]
+    assert pool.reauthenticate(username) == True
+    assert pool.remaining_requests(username) == 2
+
+def test1_make_request():
+    """
+    Test to get the profile of a specific user sharing the requests between the
+    sessions of the pool.
+    """
+    try:
+        api = Api(SessionPool())
+        api.session_pool.load_sessions()
+        profile = api.get_levpasha_instagram_profile("pablo_cuevas15")
+        assert type(profile) == dict and api.current_session in api.session_pool.sessions
+    except MaxRequestsExceed:
+        print("Max requests exceed. Please wait to send more.")
+
+def test2_make_request():
+    """
+    Test to check that a failed response which is not caused by the limit of
+    requests is returned without quarantining the session.
+    """
+    api = Api(get_replay_pool(ReplayInstagramAPI(record_dir, error_rate=1)))
+    response = api.make_request('searchUsername', "test_user")
+    assert response["status"] == "fail"
+    assert api.session_pool.remaining_requests(api.current_session) > 0
+
+def test3_make_request():
+    """
+    Test to check that a limited session is quarantined and the request is sent
+    again with another session of the pool.
+    """
+    api = Api(get_replay_pool(ReplayInstagramAPI(record_dir, max_requests=1),
+                              ReplayInstagramAPI(record_dir, max_requests=1)))
+    assert api.make_request('searchUsername', "test_user")["status"] == "ok"
+    assert api.make_request('searchUsername', "test_user")["status"] == "ok"
+    # Both sessions have sent their request, so the next one will be limited
+    with pytest.raises(MaxRequestsExceed):
+        api.make_request('searchUsername', "test_user")
+    assert all(api.session_pool.remaining_requests(username) == 0
+               for username in api.session_pool.sessions)